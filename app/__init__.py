@@ -1,9 +1,26 @@
 # App package initialization
-from . import models, schemas, crud, database
+# Submodules are loaded on first attribute access, so importing one of them
+# (e.g. app.schemas from the Streamlit frontend) doesn't pull in the rest.
+import importlib
 
-# Make common classes available at package level
-from .models import Task
-from .schemas import *
-from .database import SessionLocal, engine, Base
+_SUBMODULES = {"models", "schemas", "crud", "database"}
+_ATTRIBUTES = {
+    "Task": "models",
+    "SessionLocal": "database",
+    "engine": "database",
+    "Base": "database",
+}
 
-__all__ = ["models", "schemas", "crud", "database", "Task", "SessionLocal", "engine", "Base"]
\ No newline at end of file
+__all__ = ["models", "schemas", "crud", "database", "Task", "SessionLocal", "engine", "Base"]
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    if name in _ATTRIBUTES:
+        return getattr(importlib.import_module(f".{_ATTRIBUTES[name]}", __name__), name)
+    # Schemas used to be re-exported with `from .schemas import *`
+    if not name.startswith("_"):
+        schemas = importlib.import_module(".schemas", __name__)
+        if hasattr(schemas, name):
+            return getattr(schemas, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
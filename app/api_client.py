@@ -0,0 +1,86 @@
+"""
+HTTP client the Streamlit frontend uses to talk to the API.
+
+One instance is shared by all reruns and browser sessions of the frontend
+process: its requests.Session keeps connections to the API open, and GET
+responses are cached for a few seconds so a rerun renders from memory.
+Every mutation made through the client bumps `generation` and empties the
+cache, so the next read after a change always goes to the API.
+"""
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class ApiClient:
+    def __init__(self, base_url: str, user_id: Optional[int] = None, ttl: float = 10.0,
+                 pool_size: int = 10, timeout: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.ttl = ttl
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if user_id is not None:
+            self.session.headers["X-User-Id"] = str(user_id)
+        # Bumped by every mutation; callers keeping derived state compare it
+        self.generation = 0
+        # (path, params) -> (expires_at, generation, parsed body)
+        self._cache: Dict[Hashable, Tuple[float, int, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        response = self.session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def get(self, path: str, params: dict = None, ttl: float = None) -> Any:
+        """GET a JSON body, from the cache when it is younger than ttl seconds (0 bypasses it)"""
+        ttl = self.ttl if ttl is None else ttl
+        key = (path, tuple(sorted((params or {}).items())))
+        now = time.monotonic()
+        if ttl > 0:
+            with self._lock:
+                entry = self._cache.get(key)
+            if entry is not None and entry[0] > now and entry[1] == self.generation:
+                return entry[2]
+        generation = self.generation
+        body = self._request("GET", path, params=params).json()
+        if ttl > 0:
+            with self._lock:
+                self._cache[key] = (now + ttl, generation, body)
+        return body
+
+    def invalidate(self):
+        """Forget cached reads, e.g. after a change made outside this client"""
+        with self._lock:
+            self.generation += 1
+            self._cache.clear()
+
+    def _mutate(self, method: str, path: str, **kwargs) -> Any:
+        try:
+            response = self._request(method, path, **kwargs)
+        finally:
+            # Even a failed request may have changed something
+            self.invalidate()
+        return response.json() if response.content else None
+
+    def post(self, path: str, json: Any = None) -> Any:
+        return self._mutate("POST", path, json=json)
+
+    def put(self, path: str, json: Any = None) -> Any:
+        return self._mutate("PUT", path, json=json)
+
+    def delete(self, path: str) -> Any:
+        return self._mutate("DELETE", path)
+
+    def bulk(self, task_ids, action: str, update: dict = None) -> Any:
+        """Update or delete many tasks with one POST /tasks/bulk"""
+        body = {"task_ids": list(task_ids), "action": action}
+        if update is not None:
+            body["update"] = update
+        return self.post("/tasks/bulk", json=body)
@@ -0,0 +1,164 @@
+"""
+Archival of finished tasks.
+
+Moves tasks that were completed or cancelled more than N days ago from tasks
+to tasks_archive, so the scans of the hot table don't pay for old history.
+
+Usage: python -m app.archive [--days N] [--batch-size N] [--pause SECONDS] [--dry-run]
+
+Rows are moved in batches of --batch-size, each in its own short transaction
+(copy, delete the dependency edges, log an `archived` task event, delete), so
+writers are never locked out for long and an interrupted run simply continues
+on the next invocation. Read endpoints see archived tasks with
+?include_archived=true.
+
+Afterwards task events older than --event-days are deleted the same way, so
+the change feed log stays bounded; clients resuming from a pruned event are
+told to reset.
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import takewhile
+from typing import Tuple
+
+from sqlalchemy import delete, func, insert, literal, or_, select
+
+from . import config
+from .database import SessionLocal, init_db
+from .models import Task, TaskArchive, TaskDependency, TaskEvent
+from .task_cache import task_cache
+from .utils.dependency_graph import DONE_STATUSES, dependency_graphs
+
+# Cancelled tasks (and completions from before completed_at existed) have no completion time
+_finished_at = func.coalesce(Task.completed_at, Task.updated_at)
+
+
+def archivable(cutoff: datetime):
+    """Condition for tasks finished before the cutoff"""
+    return Task.status.in_(DONE_STATUSES) & (_finished_at < cutoff)
+
+
+def archive_batch(db, cutoff: datetime, batch_size: int) -> int:
+    """Move one batch of finished tasks to the archive; returns the number moved"""
+    # Archived ids are never handed out again: tasks uses AUTOINCREMENT on
+    # SQLite (see database.init_db) and a sequence elsewhere
+    rows = db.execute(
+        select(Task.id, Task.user_id)
+        .where(archivable(cutoff))
+        .order_by(Task.id).limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+    task_ids = [task_id for task_id, _ in rows]
+
+    try:
+        columns = [column.name for column in Task.__table__.columns]
+        now = datetime.utcnow()
+        db.execute(insert(TaskArchive).from_select(
+            columns + ["archived_at"],
+            select(*(Task.__table__.c[name] for name in columns), literal(now)).where(Task.id.in_(task_ids))
+        ))
+        # A finished task no longer blocks anything, so its edges can go
+        db.execute(delete(TaskDependency).where(
+            or_(TaskDependency.task_id.in_(task_ids), TaskDependency.depends_on_id.in_(task_ids))
+        ))
+        db.add_all([TaskEvent(user_id=user_id, task_id=task_id, event_type="archived") for task_id, user_id in rows])
+        db.execute(delete(Task).where(Task.id.in_(task_ids)))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    for task_id, user_id in rows:
+        task_cache.evict((user_id, task_id))
+        graph = dependency_graphs.loaded(user_id)
+        if graph is not None:
+            graph.remove_task(task_id)
+    return len(rows)
+
+
+def prune_events_batch(db, cutoff: datetime, batch_size: int) -> int:
+    """Delete one batch of the oldest task events logged before the cutoff; returns the number deleted"""
+    rows = db.execute(
+        select(TaskEvent.id, TaskEvent.created_at).order_by(TaskEvent.id).limit(batch_size + 1)
+    ).all()
+    # A newer event always remains, so ids keep increasing (SQLite would
+    # otherwise start again from the highest id left)
+    old = list(takewhile(lambda row: row.created_at is not None and row.created_at < cutoff, rows[:-1]))
+    if not old:
+        return 0
+    db.execute(delete(TaskEvent).where(TaskEvent.id <= old[-1].id))
+    db.commit()
+    return len(old)
+
+
+def run_archive(days: int = None, batch_size: int = None, pause: float = 0.0, dry_run: bool = False,
+                progress=print, event_days: int = None) -> Tuple[int, float]:
+    """
+    Archive every task finished more than `days` ago and delete task events
+    older than `event_days`; returns (tasks moved, seconds)
+    """
+    days = config.ARCHIVE_AFTER_DAYS if days is None else days
+    event_days = config.EVENT_RETENTION_DAYS if event_days is None else event_days
+    batch_size = batch_size or config.ARCHIVE_BATCH_SIZE
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    event_cutoff = datetime.utcnow() - timedelta(days=event_days)
+    init_db()
+    db = SessionLocal()
+    started = time.perf_counter()
+    moved = 0
+    try:
+        if dry_run:
+            count = db.execute(select(func.count()).select_from(Task).where(archivable(cutoff))).scalar()
+            progress(f"{count} tasks finished before {cutoff.isoformat()} would be archived")
+            count = db.execute(
+                select(func.count()).select_from(TaskEvent).where(TaskEvent.created_at < event_cutoff)
+            ).scalar()
+            progress(f"Up to {count} task events logged before {event_cutoff.isoformat()} would be deleted")
+            return 0, time.perf_counter() - started
+        while True:
+            batch = archive_batch(db, cutoff, batch_size)
+            if not batch:
+                break
+            moved += batch
+            progress(f"{moved} tasks archived, {time.perf_counter() - started:.1f}s")
+            if pause:
+                time.sleep(pause)  # let other writers in between batches
+        if not moved:
+            progress(f"No tasks finished before {cutoff.isoformat()}")
+
+        pruned = 0
+        while True:
+            batch = prune_events_batch(db, event_cutoff, batch_size)
+            if not batch:
+                break
+            pruned += batch
+            progress(f"{pruned} task events deleted, {time.perf_counter() - started:.1f}s")
+            if pause:
+                time.sleep(pause)
+    finally:
+        db.close()
+    return moved, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move old completed and cancelled tasks to tasks_archive")
+    parser.add_argument("--days", type=int, default=config.ARCHIVE_AFTER_DAYS,
+                        help="Archive tasks finished more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=config.ARCHIVE_BATCH_SIZE, help="Rows per transaction")
+    parser.add_argument("--event-days", type=int, default=config.EVENT_RETENTION_DAYS,
+                        help="Delete task events logged more than this many days ago")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to wait between batches")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the tasks that would be archived")
+    args = parser.parse_args(argv)
+    if args.days < 0 or args.event_days < 0 or args.batch_size < 1:
+        parser.error("--days and --event-days must be >= 0 and --batch-size >= 1")
+
+    run_archive(args.days, args.batch_size, args.pause, args.dry_run, event_days=args.event_days)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
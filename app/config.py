@@ -0,0 +1,97 @@
+import os
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    """Read a boolean flag from the environment"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Database URL - using SQLite for simplicity
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./smart_task_scheduler.db")
+
+# Owner of requests without an X-User-Id header and of pre-existing tasks
+DEFAULT_USER_ID = int(os.getenv("DEFAULT_USER_ID", "1"))
+
+# Serve list and schedule endpoints through the column-only orjson path
+FAST_JSON_RESPONSES = _env_flag("FAST_JSON_RESPONSES")
+
+# Scale estimated durations in schedules by what similar completed tasks really took
+LEARNED_DURATIONS = _env_flag("LEARNED_DURATIONS")
+
+# Task change feed: log polling interval, per-stream buffer, streams per process
+# and how many missed events a reconnecting client may replay
+EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", "0.5"))
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+EVENT_MAX_SUBSCRIBERS = int(os.getenv("EVENT_MAX_SUBSCRIBERS", "1000"))
+EVENT_REPLAY_LIMIT = int(os.getenv("EVENT_REPLAY_LIMIT", "1000"))
+# Events older than this many days are deleted by `python -m app.archive`;
+# clients resuming from before them are reset instead of replayed
+EVENT_RETENTION_DAYS = int(os.getenv("EVENT_RETENTION_DAYS", "7"))
+
+# Origins allowed to read GET endpoints from a browser (the frontend's Pomodoro
+# widget streams from the API directly); comma separated, * for any
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "*").split(",") if origin.strip()]
+
+# Serialized single-task responses kept per process (0 disables) and their
+# optional lifetime in seconds (0 means until the task changes)
+TASK_CACHE_SIZE = int(os.getenv("TASK_CACHE_SIZE", "1024"))
+TASK_CACHE_TTL = float(os.getenv("TASK_CACHE_TTL", "0"))
+
+# Completed and cancelled tasks older than this many days are moved to
+# tasks_archive by `python -m app.archive`, this many rows per transaction
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+
+# Background jobs (integration imports): worker threads per process, jobs that
+# may wait for a worker, and after how many seconds without progress an active
+# job counts as abandoned (its process died) and no longer blocks a new one
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "20"))
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "600"))
+# Imported tasks committed per transaction
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "100"))
+
+# API processes started by `python -m app.server` and run_app.py (default: 1,
+# since some state is still per process, see app.server) and the seconds a
+# stopping worker gets to finish in-flight requests
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# Run init_db() in every API process at startup; app.server does it once
+# before starting its workers and turns this off
+INIT_DB_ON_STARTUP = _env_flag("INIT_DB_ON_STARTUP", True)
+
+# What-if schedule simulation: worker processes, scenarios per request, and
+# the tasks x scenarios below which scenarios are evaluated in the API process
+SIMULATION_WORKERS = int(os.getenv("SIMULATION_WORKERS") or min(4, os.cpu_count() or 1))
+SIMULATION_MAX_SCENARIOS = int(os.getenv("SIMULATION_MAX_SCENARIOS", "32"))
+SIMULATION_PARALLEL_THRESHOLD = int(os.getenv("SIMULATION_PARALLEL_THRESHOLD", "200000"))
+
+# Load every user's open tasks into the GET /tasks/next index at startup;
+# when off, each user's tasks are loaded on their first request
+TASK_INDEX_PRELOAD = _env_flag("TASK_INDEX_PRELOAD", True)
+
+# Task notifications to one recipient within this many seconds are sent as
+# one digest message (0 sends each notification right away)
+NOTIFICATION_COALESCE_SECONDS = float(os.getenv("NOTIFICATION_COALESCE_SECONDS", "30"))
+
+# Google Calendar clients kept per process (one per account), seconds before
+# expiry at which their tokens are refreshed in the background, and how long
+# an account may go unused before its client is dropped
+GOOGLE_CLIENT_CACHE_SIZE = int(os.getenv("GOOGLE_CLIENT_CACHE_SIZE", "100"))
+GOOGLE_TOKEN_REFRESH_MARGIN = float(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN", "300"))
+GOOGLE_CLIENT_IDLE_SECONDS = float(os.getenv("GOOGLE_CLIENT_IDLE_SECONDS", "3600"))
+
+# Most task ids one POST /tasks/bulk request may act on
+BULK_MAX_TASKS = int(os.getenv("BULK_MAX_TASKS", "500"))
+
+# Debug mode adds per-request SQL statistics as response headers
+DEBUG = _env_flag("DEBUG")
+
+# Statements slower than this are logged with their parameter shapes
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+
+# Identical statement shapes repeated this often in one request are flagged as N+1
+REPEATED_QUERY_THRESHOLD = int(os.getenv("REPEATED_QUERY_THRESHOLD", "5"))
@@ -1,10 +1,57 @@
+import json
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import and_, or_, case, delete, func, insert, literal, select, union_all, update
+from sqlalchemy.exc import IntegrityError
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import List
-from . import models, schemas
+from typing import Dict, List, Optional, Set
+from . import config, models, schemas
+from .config import DEFAULT_USER_ID
+from .serialization import TASK_RESPONSE_FIELDS, dumps
+from .task_cache import task_cache
+from .task_index import task_priority_index
+from .utils.dependency_graph import DONE_STATUSES, DependencyCycleError, dependency_graphs
+from .utils.duration_estimator import duration_estimator
+from .utils.recurrence import Occurrence, iter_occurrences, parse_rrule
+from .utils.scheduler import merge_occurrences, plan_daily_schedule
+from .utils.task_record import TaskRecord
 
-def create_task(db: Session, task: schemas.TaskCreate):
+class TaskVersionConflict(Exception):
+    """Raised when a conditional update finds the task at a different version"""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Task is at version {current_version}")
+        self.current_version = current_version
+
+class OccurrenceArchived(Exception):
+    """Raised when the task of a recurring occurrence has been moved to tasks_archive"""
+
+def task_payload(task) -> bytes:
+    """TaskResponse JSON of a task, byte-identical to the default response path"""
+    return dumps({field: getattr(task, field) for field in TASK_RESPONSE_FIELDS})
+
+def record_task_event(db: Session, event_type: str, task):
+    """Append a change to the task event log; commits with the caller's transaction"""
+    payload = None
+    if event_type != "deleted":
+        payload = task_payload(task).decode()
+    db.add(models.TaskEvent(user_id=task.user_id, task_id=task.id, event_type=event_type, payload=payload))
+
+def record_task_events(db: Session, event_type: str, tasks):
+    """record_task_event for many tasks, as one multi-row INSERT"""
+    rows = [
+        {"user_id": task.user_id, "task_id": task.id, "event_type": event_type,
+         "payload": None if event_type == "deleted" else task_payload(task).decode()}
+        for task in tasks
+    ]
+    if rows:
+        db.execute(insert(models.TaskEvent), rows)
+
+def _cache_task(task):
+    """Write-through: store the task's current payload in the single-task cache"""
+    task_cache.put((task.user_id, task.id), task.updated_at, task_payload(task))
+
+def create_task(db: Session, task: schemas.TaskCreate, user_id: int = DEFAULT_USER_ID):
     """Create a new task in the database"""
     # Calculate urgency based on deadline proximity (within 24 hours)
     urgent = False
@@ -13,6 +60,7 @@ def create_task(db: Session, task: schemas.TaskCreate):
         urgent = time_to_deadline <= timedelta(hours=24)
     
     db_task = models.Task(
+        user_id=user_id,
         title=task.title,
         description=task.description,
         deadline=task.deadline,
@@ -23,121 +71,697 @@ def create_task(db: Session, task: schemas.TaskCreate):
         source=task.source
     )
     db.add(db_task)
+    db.flush()
+    record_task_event(db, "created", db_task)
     db.commit()
     db.refresh(db_task)
+    _cache_task(db_task)
+    task_priority_index.update(db_task)
     return db_task
 
-def get_tasks(db: Session, skip: int = 0, limit: int = 100):
-    """Retrieve all tasks from the database"""
-    return db.query(models.Task).offset(skip).limit(limit).all()
+def _task_table(include_archived: bool = False):
+    """The tasks table, or tasks and tasks_archive combined into one subquery"""
+    tasks = models.Task.__table__
+    if not include_archived:
+        return tasks
+    archive = models.TaskArchive.__table__
+    return union_all(
+        select(*tasks.c),
+        select(*(archive.c[column.name] for column in tasks.c))
+    ).subquery("all_tasks")
 
-def get_task(db: Session, task_id: int):
+def get_tasks(db: Session, skip: int = 0, limit: int = 100, user_id: int = DEFAULT_USER_ID,
+              include_archived: bool = False):
+    """Retrieve all tasks of a user from the database"""
+    if include_archived:
+        return get_task_rows(db, skip, limit, user_id, include_archived=True)
+    return db.query(models.Task).filter(
+        models.Task.user_id == user_id
+    ).order_by(models.Task.id).offset(skip).limit(limit).all()
+
+def get_task_rows(db: Session, skip: int = 0, limit: int = 100, user_id: int = DEFAULT_USER_ID,
+                  include_archived: bool = False):
+    """Retrieve tasks as column-only rows for the fast JSON path"""
+    tasks = _task_table(include_archived)
+    columns = [tasks.c[field] for field in TASK_RESPONSE_FIELDS]
+    return db.execute(
+        select(*columns).where(tasks.c.user_id == user_id)
+        .order_by(tasks.c.id).offset(skip).limit(limit)
+    ).all()
+
+def get_task(db: Session, task_id: int, user_id: int = DEFAULT_USER_ID, include_archived: bool = False):
     """Retrieve a specific task by ID"""
-    return db.query(models.Task).filter(models.Task.id == task_id).first()
+    task = db.query(models.Task).filter(
+        models.Task.id == task_id, models.Task.user_id == user_id
+    ).first()
+    if task is None and include_archived:
+        task = db.query(models.TaskArchive).filter(
+            models.TaskArchive.id == task_id, models.TaskArchive.user_id == user_id
+        ).first()
+    return task
 
-def update_task(db: Session, task_id: int, task_update: schemas.TaskUpdate):
-    """Update a specific task"""
-    db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    if db_task is None:
+def get_task_payload(db: Session, task_id: int, user_id: int = DEFAULT_USER_ID):
+    """
+    Serialized TaskResponse of a task, None if it doesn't exist. Cached
+    payloads are validated with a probe of updated_at, so they stay correct
+    when another worker changed the row.
+    """
+    key = (user_id, task_id)
+    if task_cache.has(key):
+        version = db.execute(
+            select(models.Task.updated_at).where(models.Task.id == task_id, models.Task.user_id == user_id)
+        ).first()
+        if version is None:
+            task_cache.evict(key)
+            return None
+        payload = task_cache.get(key, version[0])
+        if payload is not None:
+            return payload
+    
+    columns = [getattr(models.Task, field) for field in TASK_RESPONSE_FIELDS]
+    row = db.execute(
+        select(*columns).where(models.Task.id == task_id, models.Task.user_id == user_id)
+    ).first()
+    if row is None:
         return None
+    payload = dumps(dict(zip(TASK_RESPONSE_FIELDS, row)))
+    task_cache.put(key, row.updated_at, payload)
+    return payload
+
+def update_task(db: Session, task_id: int, task_update: schemas.TaskUpdate, user_id: int = DEFAULT_USER_ID,
+                expected_version: Optional[int] = None):
+    """
+    Update a specific task with a single UPDATE ... RETURNING and return the
+    updated row. With expected_version the update only applies if the task is
+    still at that version, otherwise TaskVersionConflict is raised.
+    """
+    now = datetime.utcnow()
+    values = _update_values(task_update, now)
+    statement = update(models.Task).where(models.Task.id == task_id, models.Task.user_id == user_id)
+    if expected_version is not None:
+        statement = statement.where(models.Task.version == expected_version)
+    columns = [getattr(models.Task, field) for field in TASK_RESPONSE_FIELDS]
+    row = db.execute(
+        statement.values(**values).returning(*columns, models.Task.source),
+        execution_options={"synchronize_session": False},
+    ).first()
+    if row is None:
+        if expected_version is None:
+            return None
+        current_version = db.execute(
+            select(models.Task.version).where(models.Task.id == task_id, models.Task.user_id == user_id)
+        ).scalar()
+        if current_version is None:
+            return None
+        raise TaskVersionConflict(current_version)
     
-    update_data = task_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_task, field, value)
+    record_task_event(db, "updated", row)
+    db.commit()
+    _after_update(row, user_id, task_update)
+    return row
+
+def _update_values(task_update: schemas.TaskUpdate, now: datetime) -> dict:
+    """SET clause of a task update: the changed fields, a new version and derived columns"""
+    update_data = task_update.model_dump(exclude_unset=True, exclude={"version"})
+    values = dict(update_data, version=models.Task.version + 1, updated_at=now)
+    
+    if 'status' in update_data:
+        if update_data['status'] != "completed":
+            values['completed_at'] = None
+        else:
+            values['completed_at'] = func.coalesce(models.Task.completed_at, now)
     
     # Update urgent status based on new deadline
-    if 'deadline' in update_data and db_task.deadline:
-        time_to_deadline = db_task.deadline - datetime.now()
-        db_task.urgent = time_to_deadline <= timedelta(hours=24)
+    if update_data.get('deadline'):
+        time_to_deadline = update_data['deadline'] - datetime.now()
+        values['urgent'] = time_to_deadline <= timedelta(hours=24)
+    return values
+
+# Fields of a completed task that its actual/estimated ratio depends on
+DURATION_HISTORY_FIELDS = {"actual_duration", "estimated_duration", "priority"}
+
+def _after_update(row, user_id: int, task_update: schemas.TaskUpdate):
+    """In-memory state to refresh once an update of the row is committed"""
+    _cache_task(row)
+    task_priority_index.update(row)
+    
+    # Completions, reverted completions and late actual durations change the
+    # learned durations; the user's history is read again on next use
+    fields = task_update.model_fields_set
+    if "status" in fields or (row.status == "completed" and fields & DURATION_HISTORY_FIELDS):
+        duration_estimator.invalidate(user_id)
+    
+    # Keep the critical path current when a task in the graph changes
+    graph = dependency_graphs.loaded(user_id)
+    if graph is not None and row.id in graph:
+        graph.set_task(row.id, row.estimated_duration, row.status in DONE_STATUSES)
+
+def _after_delete(task_ids: List[int], user_id: int):
+    """In-memory state to clean up once deleting the tasks is committed"""
+    duration_estimator.invalidate(user_id)
+    graph = dependency_graphs.loaded(user_id)
+    for task_id in task_ids:
+        task_cache.evict((user_id, task_id))
+        task_priority_index.remove_task(user_id, task_id)
+        if graph is not None:
+            graph.remove_task(task_id)
+
+def delete_task(db: Session, task_id: int, user_id: int = DEFAULT_USER_ID):
+    """Delete a specific task without reading it first"""
+    deleted = db.execute(
+        delete(models.Task).where(models.Task.id == task_id, models.Task.user_id == user_id)
+        .returning(models.Task.id, models.Task.user_id),
+        execution_options={"synchronize_session": False},
+    ).first()
+    if deleted is None:
+        return False
     
+    record_task_event(db, "deleted", deleted)
+    db.query(models.TaskDependency).filter(
+        or_(models.TaskDependency.task_id == task_id, models.TaskDependency.depends_on_id == task_id)
+    ).delete(synchronize_session=False)
     db.commit()
-    db.refresh(db_task)
-    return db_task
+    _after_delete([task_id], user_id)
+    return True
+
+def bulk_update_tasks(db: Session, task_ids: List[int], task_update: schemas.TaskUpdate,
+                      user_id: int = DEFAULT_USER_ID) -> List:
+    """Apply the same update to many tasks in one UPDATE ... RETURNING; returns the updated rows"""
+    now = datetime.utcnow()
+    columns = [getattr(models.Task, field) for field in TASK_RESPONSE_FIELDS]
+    rows = db.execute(
+        update(models.Task).where(models.Task.id.in_(task_ids), models.Task.user_id == user_id)
+        .values(**_update_values(task_update, now)).returning(*columns, models.Task.source),
+        execution_options={"synchronize_session": False},
+    ).all()
+    record_task_events(db, "updated", rows)
+    db.commit()
+    for row in rows:
+        _after_update(row, user_id, task_update)
+    return sorted(rows, key=lambda row: row.id)
+
+def bulk_delete_tasks(db: Session, task_ids: List[int], user_id: int = DEFAULT_USER_ID) -> List[int]:
+    """Delete many tasks and their dependency edges in one transaction; returns the deleted ids"""
+    deleted = db.execute(
+        delete(models.Task).where(models.Task.id.in_(task_ids), models.Task.user_id == user_id)
+        .returning(models.Task.id, models.Task.user_id),
+        execution_options={"synchronize_session": False},
+    ).all()
+    if not deleted:
+        return []
+    
+    deleted_ids = sorted(row.id for row in deleted)
+    record_task_events(db, "deleted", deleted)
+    db.query(models.TaskDependency).filter(
+        or_(models.TaskDependency.task_id.in_(deleted_ids), models.TaskDependency.depends_on_id.in_(deleted_ids))
+    ).delete(synchronize_session=False)
+    db.commit()
+    _after_delete(deleted_ids, user_id)
+    return deleted_ids
+
+def add_task_dependency(db: Session, task_id: int, depends_on_id: int,
+                        user_id: int = DEFAULT_USER_ID) -> Optional[List[int]]:
+    """
+    Make a task wait for another one; returns the task's dependencies, None if
+    either task doesn't exist. Raises DependencyCycleError for cyclic edges.
+    """
+    rows = db.execute(
+        select(models.Task.id, models.Task.estimated_duration, models.Task.status).where(
+            models.Task.id.in_([task_id, depends_on_id]), models.Task.user_id == user_id
+        )
+    ).all()
+    if len({row.id for row in rows}) != len({task_id, depends_on_id}):
+        return None
+    
+    graph = dependency_graphs.get(db, user_id)
+    if depends_on_id in graph.dependencies(task_id):
+        return graph.dependencies(task_id)
+    
+    # Checked against the table after inserting: the insert holds the write
+    # lock, so edges added concurrently by other workers are checked in turn
+    db.add(models.TaskDependency(task_id=task_id, depends_on_id=depends_on_id, user_id=user_id))
+    try:
+        db.flush()
+        if _reaches(db, depends_on_id, task_id, user_id):
+            raise DependencyCycleError(f"Task {task_id} can't depend on {depends_on_id}: that creates a cycle")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    
+    for row in rows:
+        if row.id not in graph:
+            graph.set_task(row.id, row.estimated_duration, row.status in DONE_STATUSES)
+    try:
+        graph.add_edge(task_id, depends_on_id)
+    except DependencyCycleError:
+        # Only possible if the graph missed a concurrent change; reload it
+        dependency_graphs.discard(user_id)
+        graph = dependency_graphs.get(db, user_id)
+    return graph.dependencies(task_id)
+
+def _reaches(db: Session, start: int, target: int, user_id: int) -> bool:
+    """Whether target is among start's dependencies, direct or transitive, in task_dependencies"""
+    edge = models.TaskDependency
+    upstream = select(literal(start).label("id")).cte("upstream", recursive=True)
+    upstream = upstream.union(
+        select(edge.depends_on_id).join(upstream, edge.task_id == upstream.c.id).where(edge.user_id == user_id)
+    )
+    return db.execute(select(upstream.c.id).where(upstream.c.id == target).limit(1)).first() is not None
+
+def remove_task_dependency(db: Session, task_id: int, depends_on_id: int, user_id: int = DEFAULT_USER_ID):
+    """Remove a dependency edge; False if it didn't exist"""
+    deleted = db.query(models.TaskDependency).filter(
+        models.TaskDependency.task_id == task_id,
+        models.TaskDependency.depends_on_id == depends_on_id,
+        models.TaskDependency.user_id == user_id
+    ).delete(synchronize_session=False)
+    db.commit()
+    if not deleted:
+        return False
+    
+    dependency_graphs.get(db, user_id).remove_edge(task_id, depends_on_id)
+    return True
+
+def get_task_dependencies(db: Session, task_id: int, user_id: int = DEFAULT_USER_ID) -> List[int]:
+    """Ids of the tasks a task depends on"""
+    return dependency_graphs.get(db, user_id).dependencies(task_id)
+
+def get_critical_path(db: Session, user_id: int = DEFAULT_USER_ID):
+    """Longest chain of unfinished dependent work of a user"""
+    task_ids, duration = dependency_graphs.get(db, user_id).critical_path()
+    return schemas.CriticalPath(task_ids=task_ids, duration=duration)
+
+def get_task_events(db: Session, since: int = 0, limit: int = 500, user_id: int = DEFAULT_USER_ID):
+    """
+    Events after `since` for polling clients. If more than `limit` are pending,
+    or events after `since` were already pruned (app.archive), the log is
+    reported as reset and the client should refetch its state.
+    """
+    first_id, last_id = db.query(func.min(models.TaskEvent.id), func.max(models.TaskEvent.id)).one()
+    last_id = last_id or 0
+    events = db.query(models.TaskEvent).filter(
+        models.TaskEvent.user_id == user_id,
+        models.TaskEvent.id > since,
+        models.TaskEvent.id <= last_id
+    ).order_by(models.TaskEvent.id).limit(limit + 1).all()
+    if len(events) > limit or (first_id is not None and since < first_id - 1):
+        return schemas.TaskEventLog(last_id=last_id, reset=True, events=[])
+    return schemas.TaskEventLog(last_id=last_id, reset=False, events=[
+        schemas.TaskEventResponse(
+            id=event.id,
+            type=event.event_type,
+            task_id=event.task_id,
+            created_at=event.created_at,
+            task=json.loads(event.payload) if event.payload else None
+        )
+        for event in events
+    ])
+
+def get_job(db: Session, job_id: int, user_id: int = DEFAULT_USER_ID):
+    """Retrieve a background job of a user"""
+    return db.query(models.Job).filter(models.Job.id == job_id, models.Job.user_id == user_id).first()
+
+def get_blocking_dependencies(db: Session, user_ids: List[int]) -> Dict[int, Dict[int, Set[int]]]:
+    """Unfinished dependencies per task, per user, read straight from the database"""
+    blocker = models.Task
+    rows = db.execute(
+        select(models.TaskDependency.user_id, models.TaskDependency.task_id, models.TaskDependency.depends_on_id)
+        .join(blocker, blocker.id == models.TaskDependency.depends_on_id)
+        .where(models.TaskDependency.user_id.in_(user_ids), blocker.status.not_in(DONE_STATUSES))
+    ).all()
+    blocked = defaultdict(lambda: defaultdict(set))
+    for user_id, task_id, depends_on_id in rows:
+        blocked[user_id][task_id].add(depends_on_id)
+    return blocked
+
+def _is_urgent(deadline: datetime) -> bool:
+    """Urgent means due within 24 hours"""
+    return deadline is not None and deadline - datetime.now() <= timedelta(hours=24)
+
+def create_recurring_task(db: Session, recurring_task: schemas.RecurringTaskCreate, user_id: int = DEFAULT_USER_ID):
+    """Store a recurring task template; occurrences are expanded on demand"""
+    rule = parse_rrule(recurring_task.rrule)
+    db_recurring_task = models.RecurringTask(
+        user_id=user_id,
+        until=rule.until,
+        **recurring_task.model_dump()
+    )
+    db.add(db_recurring_task)
+    db.commit()
+    db.refresh(db_recurring_task)
+    return db_recurring_task
+
+def get_recurring_tasks(db: Session, skip: int = 0, limit: int = 100, user_id: int = DEFAULT_USER_ID):
+    """Retrieve the recurring task templates of a user"""
+    return db.query(models.RecurringTask).filter(
+        models.RecurringTask.user_id == user_id
+    ).order_by(models.RecurringTask.id).offset(skip).limit(limit).all()
+
+def get_recurring_task(db: Session, recurring_task_id: int, user_id: int = DEFAULT_USER_ID):
+    """Retrieve a specific recurring task template"""
+    return db.query(models.RecurringTask).filter(
+        models.RecurringTask.id == recurring_task_id, models.RecurringTask.user_id == user_id
+    ).first()
 
-def delete_task(db: Session, task_id: int):
-    """Delete a specific task"""
-    db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    if db_task is None:
+def delete_recurring_task(db: Session, recurring_task_id: int, user_id: int = DEFAULT_USER_ID):
+    """Delete a template; occurrences that were already materialized are kept"""
+    db_recurring_task = get_recurring_task(db, recurring_task_id, user_id)
+    if db_recurring_task is None:
         return False
     
-    db.delete(db_task)
+    db.delete(db_recurring_task)
     db.commit()
     return True
 
-def generate_daily_schedule(db: Session, target_date: datetime.date):
-    """Generate daily schedule based on Eisenhower matrix and time blocks"""
-    # Get all pending tasks
-    pending_tasks = db.query(models.Task).filter(
-        and_(
-            models.Task.status != "completed",
-            models.Task.deadline >= datetime.combine(target_date, datetime.min.time()),
-            models.Task.deadline <= datetime.combine(target_date, datetime.max.time()) if target_date else True
+def get_recurring_occurrences(db: Session, window_start: datetime, window_end: datetime,
+                              user_ids: List[int]) -> Dict[int, List[Occurrence]]:
+    """Expand the templates of the given users over a window, skipping materialized (or archived) occurrences"""
+    templates = db.query(models.RecurringTask).filter(
+        models.RecurringTask.user_id.in_(user_ids),
+        models.RecurringTask.dtstart <= window_end,
+        or_(models.RecurringTask.until.is_(None), models.RecurringTask.until >= window_start)
+    ).all()
+    if not templates:
+        return {}
+    
+    template_ids = [template.id for template in templates]
+    materialized = set(db.execute(union_all(*(
+        select(table.recurring_task_id, table.occurrence_start).where(
+            table.recurring_task_id.in_(template_ids),
+            table.occurrence_start >= window_start,
+            table.occurrence_start <= window_end
         )
-    ).order_by(models.Task.priority.desc(), models.Task.urgent.desc()).all()
+        for table in (models.Task, models.TaskArchive)
+    ))).all())
     
-    # Simple scheduling algorithm - assign tasks to time slots
-    # Starting from 9 AM to 6 PM with breaks
-    start_time = datetime.combine(target_date, datetime.min.time()).replace(hour=9, minute=0)
-    schedule_items = []
+    occurrences = defaultdict(list)
+    for template in templates:
+        rule = parse_rrule(template.rrule)
+        for occurrence_start in iter_occurrences(rule, template.dtstart, window_start, window_end):
+            if (template.id, occurrence_start) in materialized:
+                continue
+            occurrences[template.user_id].append(Occurrence(
+                recurring_task_id=template.id,
+                user_id=template.user_id,
+                occurrence_start=occurrence_start,
+                title=template.title,
+                description=template.description,
+                priority=template.priority,
+                urgent=_is_urgent(occurrence_start),
+                important=template.important,
+                estimated_duration=template.estimated_duration,
+                source=template.source
+            ))
+    return occurrences
+
+def get_tasks_in_range(db: Session, start: datetime, end: datetime, user_id: int = DEFAULT_USER_ID,
+                       include_archived: bool = False):
+    """Tasks due in [start, end] and the recurring occurrences without a row"""
+    if include_archived:
+        table = _task_table(True)
+        tasks = db.execute(
+            select(*(table.c[field] for field in TASK_RESPONSE_FIELDS))
+            .where(table.c.user_id == user_id, table.c.deadline >= start, table.c.deadline <= end)
+            .order_by(table.c.deadline, table.c.id)
+        ).all()
+    else:
+        tasks = db.query(models.Task).filter(
+            models.Task.user_id == user_id,
+            models.Task.deadline >= start,
+            models.Task.deadline <= end
+        ).order_by(models.Task.deadline, models.Task.id).all()
+    occurrences = get_recurring_occurrences(db, start, end, [user_id]).get(user_id, [])
+    occurrences.sort(key=lambda occurrence: (occurrence.occurrence_start, occurrence.recurring_task_id))
+    return tasks, occurrences
+
+def materialize_occurrence(db: Session, recurring_task_id: int, occurrence_start: datetime,
+                           user_id: int = DEFAULT_USER_ID):
+    """
+    Create (or fetch) the task row of one occurrence; None if it isn't an
+    occurrence. Raises OccurrenceArchived if its task was archived.
+    """
+    template = get_recurring_task(db, recurring_task_id, user_id)
+    if template is None:
+        return None
+    if occurrence_start not in iter_occurrences(parse_rrule(template.rrule), template.dtstart,
+                                                occurrence_start, occurrence_start):
+        return None
     
-    for i, task in enumerate(pending_tasks):
-        # Calculate slot duration (minimum 15 minutes, rounded to 15-min intervals)
-        duration = max(15, ((task.estimated_duration + 14) // 15) * 15)  # Round up to nearest 15 min
-        
-        # Add some buffer time between tasks
-        if i > 0:
-            start_time += timedelta(minutes=5)  # 5-minute break between tasks
-        
-        end_time = start_time + timedelta(minutes=duration)
-        
-        # Skip if we go beyond 6 PM
-        if end_time.hour > 18:
-            break
-            
-        schedule_items.append(schemas.DailyScheduleItem(
+    existing = db.query(models.Task).filter(
+        models.Task.recurring_task_id == recurring_task_id,
+        models.Task.occurrence_start == occurrence_start
+    ).first()
+    if existing is not None:
+        return existing
+    if db.query(models.TaskArchive.id).filter(
+        models.TaskArchive.recurring_task_id == recurring_task_id,
+        models.TaskArchive.occurrence_start == occurrence_start
+    ).first() is not None:
+        raise OccurrenceArchived()
+    
+    db_task = models.Task(
+        user_id=user_id,
+        title=template.title,
+        description=template.description,
+        deadline=occurrence_start,
+        priority=template.priority,
+        urgent=_is_urgent(occurrence_start),
+        important=template.important,
+        estimated_duration=template.estimated_duration,
+        source=template.source,
+        recurring_task_id=recurring_task_id,
+        occurrence_start=occurrence_start
+    )
+    db.add(db_task)
+    try:
+        db.flush()
+        record_task_event(db, "created", db_task)
+        db.commit()
+    except IntegrityError:
+        # Another request materialized the same occurrence first
+        db.rollback()
+        return db.query(models.Task).filter(
+            models.Task.recurring_task_id == recurring_task_id,
+            models.Task.occurrence_start == occurrence_start
+        ).first()
+    db.refresh(db_task)
+    task_priority_index.update(db_task)
+    return db_task
+
+def daily_schedule_conditions(target_date: datetime.date):
+    """Filter for tasks that belong in the schedule of the target date"""
+    return and_(
+        models.Task.status != "completed",
+        models.Task.deadline >= datetime.combine(target_date, datetime.min.time()),
+        models.Task.deadline <= datetime.combine(target_date, datetime.max.time()) if target_date else True
+    )
+
+# Highest priority first; id breaks ties so every caller gets the same order
+DAILY_SCHEDULE_ORDER = (models.Task.priority.desc(), models.Task.urgent.desc(), models.Task.id)
+
+# Columns of a TaskRecord, for read-only paths that don't need Task objects
+TASK_RECORD_COLUMNS = tuple(getattr(models.Task, field) for field in TaskRecord._fields)
+
+def load_task_records(db: Session, *conditions, order_by=()) -> List[TaskRecord]:
+    """Tasks matching the conditions as TaskRecords, loaded column-only"""
+    rows = db.execute(select(*TASK_RECORD_COLUMNS).where(*conditions).order_by(*order_by))
+    return list(map(TaskRecord._make, rows))
+
+def _daily_schedule_records(db: Session, target_date: datetime.date, user_id: int) -> List[TaskRecord]:
+    """Pending tasks of a user due on the target date, highest priority first"""
+    return load_task_records(
+        db, models.Task.user_id == user_id, daily_schedule_conditions(target_date),
+        order_by=DAILY_SCHEDULE_ORDER
+    )
+
+def _blocked_by(db: Session, tasks, user_id: int) -> Dict[int, Set[int]]:
+    """Unfinished dependencies of the given tasks, from the in-memory graph"""
+    return dependency_graphs.get(db, user_id).unfinished_predecessors(task.id for task in tasks)
+
+def learned_durations(db: Session, user_id: int):
+    """Duration lookup for plan_daily_schedule, None when learned durations are off"""
+    if not config.LEARNED_DURATIONS:
+        return None
+    duration_estimator.load(db, [user_id])
+    return lambda task: duration_estimator.estimate(user_id, task)
+
+def get_duration_estimates(db: Session, user_id: int = DEFAULT_USER_ID):
+    """Learned actual/estimated duration ratios of a user, per bucket"""
+    duration_estimator.load(db, [user_id])
+    return [schemas.DurationEstimateBucket(**bucket) for bucket in duration_estimator.summary(user_id)]
+
+def _day_window(target_date: datetime.date):
+    return datetime.combine(target_date, datetime.min.time()), datetime.combine(target_date, datetime.max.time())
+
+def daily_schedule_inputs(db: Session, target_date: datetime.date, user_id: int = DEFAULT_USER_ID):
+    """Arguments of plan_daily_schedule for a user's day: (tasks, blocked_by, duration_of)"""
+    # Get all pending tasks, plus recurring occurrences that have no row yet
+    pending_tasks = _daily_schedule_records(db, target_date, user_id)
+    occurrences = get_recurring_occurrences(db, *_day_window(target_date), [user_id]).get(user_id, [])
+    return (merge_occurrences(pending_tasks, occurrences), _blocked_by(db, pending_tasks, user_id),
+            learned_durations(db, user_id))
+
+def _plan_day(db: Session, target_date: datetime.date, user_id: int):
+    """Schedule slots of a user's day: (task or occurrence, start, end, duration)"""
+    tasks, blocked_by, duration_of = daily_schedule_inputs(db, target_date, user_id)
+    return plan_daily_schedule(tasks, target_date, blocked_by, duration_of)
+
+def generate_daily_schedule(db: Session, target_date: datetime.date, user_id: int = DEFAULT_USER_ID):
+    """Generate daily schedule based on Eisenhower matrix and time blocks"""
+    schedule_items = [
+        schemas.DailyScheduleItem(
             task_id=task.id,
             title=task.title,
             start_time=start_time,
             end_time=end_time,
-            duration=duration
-        ))
-        
-        start_time = end_time
+            duration=duration,
+            recurring_task_id=task.recurring_task_id,
+            occurrence_start=task.occurrence_start
+        )
+        for task, start_time, end_time, duration in _plan_day(db, target_date, user_id)
+    ]
     
     return schemas.DailySchedule(
         date=target_date.isoformat(),
         schedule=schedule_items
     )
 
-def get_productivity_report(db: Session, days: int = 7):
+def generate_daily_schedule_rows(db: Session, target_date: datetime.date, user_id: int = DEFAULT_USER_ID):
+    """Generate the daily schedule as plain dicts for the fast JSON path"""
+    return {
+        "date": target_date.isoformat(),
+        "schedule": [
+            {
+                "task_id": task.id,
+                "title": task.title,
+                "start_time": start_time,
+                "end_time": end_time,
+                "duration": duration,
+                "recurring_task_id": task.recurring_task_id,
+                "occurrence_start": task.occurrence_start
+            }
+            for task, start_time, end_time, duration in _plan_day(db, target_date, user_id)
+        ]
+    }
+
+TIMESERIES_BUCKETS = ("day", "week")
+# Metrics bucketed by created_at and by completion time
+CREATED_METRICS = ("created",)
+COMPLETED_METRICS = ("completed", "on_time_rate", "estimated_minutes", "actual_minutes")
+TIMESERIES_METRICS = CREATED_METRICS + COMPLETED_METRICS
+
+def _bucket_start(column, bucket: str, dialect: str):
+    """SQL expression truncating a timestamp to the start of its day or ISO week"""
+    if dialect == "sqlite":
+        if bucket == "week":
+            return func.date(column, "weekday 0", "-6 days")  # Monday of that week
+        return func.date(column)
+    return func.date(func.date_trunc(bucket, column))
+
+def _utc_as_local(column, dialect: str):
+    """SQL expression reading a naive UTC timestamp on the server's local clock, which deadlines use"""
+    if dialect == "sqlite":
+        return func.datetime(column, "localtime")
+    offset_minutes = round((datetime.now() - datetime.utcnow()).total_seconds() / 60)
+    return column + timedelta(minutes=offset_minutes)
+
+def get_productivity_timeseries(db: Session, bucket: str = "day", days: int = 30,
+                                metrics: List[str] = TIMESERIES_METRICS, user_id: int = DEFAULT_USER_ID,
+                                include_archived: bool = False):
+    """Per-bucket task metrics as parallel arrays, computed with one grouped query"""
+    end = datetime.utcnow()
+    start = datetime.combine((end - timedelta(days=days - 1)).date(), datetime.min.time())
+    if bucket == "week":
+        start -= timedelta(days=start.weekday())
+    dialect = db.get_bind().dialect.name
+    tasks = _task_table(include_archived).c
+    
+    # Completed tasks from before completed_at was recorded fall back to updated_at
+    completed_at = func.coalesce(tasks.completed_at, tasks.updated_at)
+    zero = literal(0)
+    arms = []
+    if any(metric in CREATED_METRICS for metric in metrics):
+        arms.append(select(
+            _bucket_start(tasks.created_at, bucket, dialect).label("bucket"),
+            literal(1).label("created"), zero.label("completed"), zero.label("with_deadline"),
+            zero.label("on_time"), zero.label("estimated_minutes"), zero.label("actual_minutes")
+        ).where(tasks.user_id == user_id, tasks.created_at >= start))
+    if any(metric in COMPLETED_METRICS for metric in metrics):
+        arms.append(select(
+            _bucket_start(completed_at, bucket, dialect).label("bucket"),
+            zero.label("created"), literal(1).label("completed"),
+            case((tasks.deadline.is_not(None), 1), else_=0).label("with_deadline"),
+            # completed_at is UTC, deadlines are local time
+            case((_utc_as_local(completed_at, dialect) <= tasks.deadline, 1), else_=0).label("on_time"),
+            func.coalesce(tasks.estimated_duration, 0).label("estimated_minutes"),
+            func.coalesce(tasks.actual_duration, 0).label("actual_minutes")
+        ).where(tasks.user_id == user_id, tasks.status == "completed", completed_at >= start))
+    
+    rows = {}
+    if arms:
+        events = (union_all(*arms) if len(arms) > 1 else arms[0]).subquery()
+        for row in db.execute(
+            select(
+                events.c.bucket, func.sum(events.c.created), func.sum(events.c.completed),
+                func.sum(events.c.with_deadline), func.sum(events.c.on_time),
+                func.sum(events.c.estimated_minutes), func.sum(events.c.actual_minutes)
+            ).group_by(events.c.bucket)
+        ).all():
+            rows[str(row[0])[:10]] = row[1:]
+    
+    # Dense bucket labels so every array lines up, with empty buckets as zeros
+    step = timedelta(days=7 if bucket == "week" else 1)
+    labels = []
+    current = start
+    while current <= end:
+        labels.append(current.date().isoformat())
+        current += step
+    
+    empty = (0, 0, 0, 0, 0, 0)
+    columns = list(zip(*(rows.get(label, empty) for label in labels))) or [()] * 6
+    created, completed, with_deadline, on_time, estimated_minutes, actual_minutes = columns
+    series = {
+        "created": list(created),
+        "completed": list(completed),
+        "on_time_rate": [round(hit / total, 4) if total else None for hit, total in zip(on_time, with_deadline)],
+        "estimated_minutes": list(estimated_minutes),
+        "actual_minutes": list(actual_minutes),
+    }
+    return schemas.TimeSeries(
+        bucket=bucket,
+        start=labels[0] if labels else start.date().isoformat(),
+        end=end.date().isoformat(),
+        buckets=labels,
+        series={metric: series[metric] for metric in metrics}
+    )
+
+def get_productivity_report(db: Session, days: int = 7, user_id: int = DEFAULT_USER_ID,
+                            include_archived: bool = False):
     """Generate productivity analytics report"""
     start_date = datetime.now() - timedelta(days=days)
+    tasks = _task_table(include_archived)
+    
+    def count(*conditions):
+        return db.execute(
+            select(func.count()).select_from(tasks)
+            .where(tasks.c.user_id == user_id, tasks.c.created_at >= start_date, *conditions)
+        ).scalar()
     
     # Total tasks in the period
-    total_tasks_query = db.query(models.Task).filter(models.Task.created_at >= start_date)
-    total_tasks = total_tasks_query.count()
+    total_tasks = count()
     
     # Completed tasks in the period
-    completed_tasks_query = db.query(models.Task).filter(
-        and_(
-            models.Task.created_at >= start_date,
-            models.Task.status == "completed"
-        )
-    )
-    completed_tasks = completed_tasks_query.count()
+    completed_tasks = count(tasks.c.status == "completed")
     
     # Calculate productivity percentage
     productivity_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
     
     # Generate insights
     insights = []
+    low_priority_tasks = 0
     if total_tasks > 0:
-        low_priority_tasks = db.query(models.Task).filter(
-            and_(
-                models.Task.created_at >= start_date,
-                models.Task.priority <= 2  # Low priority tasks (1-2)
-            )
-        ).count()
+        low_priority_tasks = count(tasks.c.priority <= 2)  # Low priority tasks (1-2)
         
         low_priority_percentage = (low_priority_tasks / total_tasks * 100) if total_tasks > 0 else 0
         insights.append(f"You spent {low_priority_percentage:.0f}% of your time on low-priority tasks.")
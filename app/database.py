@@ -1,15 +1,15 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func, inspect, text, update
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float, Index
 from datetime import datetime
+from . import config
 
-# Database URL - using SQLite for simplicity
-SQLALCHEMY_DATABASE_URL = "sqlite:///./smart_task_scheduler.db"
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # Needed for SQLite
+    connect_args={"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}  # Needed for SQLite
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -18,8 +18,22 @@ Base = declarative_base()
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Every query is scoped by owner, so user_id leads each composite index
+        Index("ix_tasks_user_status_deadline", "user_id", "status", "deadline"),
+        Index("ix_tasks_user_deadline", "user_id", "deadline"),
+        Index("ix_tasks_user_created_at", "user_id", "created_at"),
+        # Keyset pages of the snapshot export (app.export)
+        Index("ix_tasks_user_updated_at", "user_id", "updated_at", "id"),
+        # One row per materialized occurrence of a recurring task
+        Index("ix_tasks_recurring_occurrence", "recurring_task_id", "occurrence_start", unique=True),
+        # Never reuse ids on SQLite: archived tasks keep theirs in tasks_archive
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True, default=config.DEFAULT_USER_ID,
+                     server_default=text(str(config.DEFAULT_USER_ID)))  # Owner of the task
     title = Column(String, index=True, nullable=False)
     description = Column(Text, nullable=True)
     deadline = Column(DateTime, nullable=True)
@@ -33,8 +47,128 @@ class Task(Base):
     scheduled_end = Column(DateTime, nullable=True)  # When it's scheduled to end
     completed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     source = Column(String, default="manual")  # manual, google_calendar, todoist
+    recurring_task_id = Column(Integer, nullable=True)  # Template this occurrence was materialized from
+    occurrence_start = Column(DateTime, nullable=True)  # Which occurrence of the template this is
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))  # Bumped by every update
+
+class TaskArchive(Base):
+    """Completed and cancelled tasks moved out of the tasks table by app.archive"""
+    __tablename__ = "tasks_archive"
+    __table_args__ = (
+        Index("ix_tasks_archive_user_created_at", "user_id", "created_at"),
+        Index("ix_tasks_archive_user_completed_at", "user_id", "completed_at"),
+        # Archived occurrences of recurring tasks are not expanded again
+        Index("ix_tasks_archive_recurring_occurrence", "recurring_task_id", "occurrence_start"),
+    )
+
+    # Same columns as Task (keep them in sync), plus when the row was archived
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Id the task had in tasks
+    user_id = Column(Integer, nullable=False)
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    deadline = Column(DateTime, nullable=True)
+    priority = Column(Integer)
+    urgent = Column(Boolean)
+    important = Column(Boolean)
+    status = Column(String)
+    estimated_duration = Column(Integer)
+    actual_duration = Column(Integer, nullable=True)
+    scheduled_start = Column(DateTime, nullable=True)
+    scheduled_end = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    source = Column(String)
+    recurring_task_id = Column(Integer, nullable=True)
+    occurrence_start = Column(DateTime, nullable=True)
+    version = Column(Integer, nullable=False, server_default=text("1"))
+    archived_at = Column(DateTime, nullable=False)
+
+class RecurringTask(Base):
+    """Template for a repeating task, expanded into occurrences on demand"""
+    __tablename__ = "recurring_tasks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True, default=config.DEFAULT_USER_ID)
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    priority = Column(Integer, default=3)  # 1-5 scale
+    important = Column(Boolean, default=False)
+    estimated_duration = Column(Integer, default=30)  # in minutes
+    source = Column(String, default="manual")
+    rrule = Column(String, nullable=False)  # e.g. FREQ=WEEKLY;BYDAY=MO,WE
+    dtstart = Column(DateTime, nullable=False)  # First occurrence, also sets the time of day
+    until = Column(DateTime, nullable=True)  # Last possible occurrence, copied from the rule for filtering
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PomodoroState(Base):
+    """The Pomodoro timer, one row shared by every API process"""
+    __tablename__ = "pomodoro_state"
+
+    id = Column(Integer, primary_key=True)
+    is_working = Column(Boolean, nullable=False, default=True)
+    current_session = Column(Integer, nullable=False, default=1)
+    remaining_time = Column(Integer, nullable=False, default=0)  # Seconds left while not running
+    ends_at = Column(DateTime, nullable=True)  # When the running session ends (UTC), NULL unless running
+    version = Column(Integer, nullable=False, default=1)  # Bumped by every change; streams poll it
+
+class PlannerCheckpoint(Base):
+    """Users whose schedule for a date has been written by the batch planner"""
+    __tablename__ = "planner_checkpoints"
+
+    plan_date = Column(String, primary_key=True)  # YYYY-MM-DD
+    user_id = Column(Integer, primary_key=True)
+    planned_at = Column(DateTime, default=datetime.utcnow)
+
+class TaskDependency(Base):
+    """Edge of the task dependency graph: task_id can't start before depends_on_id is done"""
+    __tablename__ = "task_dependencies"
+
+    task_id = Column(Integer, primary_key=True)
+    depends_on_id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True, default=config.DEFAULT_USER_ID)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class TaskEvent(Base):
+    """Append-only log of task changes, streamed to clients as a change feed"""
+    __tablename__ = "task_events"
+    __table_args__ = (
+        Index("ix_task_events_user_id_id", "user_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)  # Increasing; clients resume from the last id they saw
+    user_id = Column(Integer, nullable=False)
+    task_id = Column(Integer, nullable=False)
+    event_type = Column(String, nullable=False)  # created, updated, deleted, archived
+    payload = Column(Text, nullable=True)  # TaskResponse JSON after the change, empty for deletes
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Job(Base):
+    """Background job such as an integration import, run by the worker pool in app.jobs"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # At most one queued or running job per account; a second request joins it
+        Index("ux_jobs_active_dedup_key", "dedup_key", unique=True,
+              sqlite_where=text("status IN ('queued', 'running')"),
+              postgresql_where=text("status IN ('queued', 'running')")),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    kind = Column(String, nullable=False)  # todoist_import, google_calendar_import
+    dedup_key = Column(String, nullable=False)  # Hash of kind, user and account credential
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    progress = Column(Integer, nullable=False, default=0)  # Items done so far
+    total = Column(Integer, nullable=True)  # Items to do, once known
+    result = Column(Text, nullable=True)  # JSON summary when succeeded
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Doubles as heartbeat
 
 def get_db():
     db = SessionLocal()
@@ -43,5 +177,67 @@ def get_db():
     finally:
         db.close()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+def _add_missing_columns():
+    """Add columns introduced after a table was first created (additive changes only)"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg.text}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+                conn.execute(text(ddl))
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+def _backfill_updated_at():
+    """Give tasks from before updated_at was always set one, so the export can page on it"""
+    with engine.begin() as conn:
+        conn.execute(
+            update(Task).where(Task.updated_at.is_(None))
+            .values(updated_at=func.coalesce(Task.created_at, datetime.utcnow()))
+        )
+
+def _autoincrement_task_ids():
+    """
+    Rebuild a SQLite tasks table created without AUTOINCREMENT, which would
+    hand out ids of deleted rows again, and start its sequence above every
+    id in tasks_archive.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect() as conn:
+        ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tasks'")).scalar()
+        if ddl is None or "AUTOINCREMENT" in ddl.upper():
+            return
+        # pysqlite doesn't open transactions for DDL on its own
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        conn.execute(text("ALTER TABLE tasks RENAME TO tasks_old"))
+        for (index,) in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tasks_old' AND sql IS NOT NULL"
+        )).all():
+            conn.execute(text(f"DROP INDEX {index}"))
+        Task.__table__.create(bind=conn)
+        columns = ", ".join(column.name for column in Task.__table__.columns)
+        conn.execute(text(f"INSERT INTO tasks ({columns}) SELECT {columns} FROM tasks_old"))
+        conn.execute(text("DROP TABLE tasks_old"))
+        high_water = conn.execute(text(
+            "SELECT max(coalesce((SELECT max(id) FROM tasks), 0), coalesce((SELECT max(id) FROM tasks_archive), 0))"
+        )).scalar()
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'tasks'"))
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('tasks', :seq)"), {"seq": high_water})
+        conn.commit()
+
+def init_db():
+    """Create missing tables; run once at startup rather than on import"""
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    _backfill_updated_at()
+    _autoincrement_task_ids()
@@ -0,0 +1,273 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from starlette.concurrency import run_in_threadpool
+
+from . import config
+from .database import SessionLocal
+from .metrics import registry
+from .models import TaskEvent
+from .query_stats import stop_tracking
+from .utils.pomodoro_timer import pomodoro_manager
+
+logger = logging.getLogger(__name__)
+
+# Sent to a subscriber that fell too far behind; it should reconnect with Last-Event-ID
+RESET = object()
+# Comment line sent on idle streams so proxies don't close them
+HEARTBEAT_SECONDS = 15
+# Reconnect delay suggested to EventSource clients
+RETRY_MS = 3000
+# Pomodoro streams resync the client's local countdown this often while running
+POMODORO_TICK_SECONDS = 5
+
+
+class SubscriberLimitReached(Exception):
+    """Raised when the process already serves the maximum number of streams"""
+
+
+def format_sse(event_id: int, event_type: str, task_id: int, payload: Optional[str]) -> str:
+    """Render one task event as a Server-Sent Events message"""
+    data = f'{{"id":{event_id},"type":"{event_type}","task_id":{task_id},"task":{payload or "null"}}}'
+    return f"id: {event_id}\nevent: task\ndata: {data}\n\n"
+
+
+class Subscription:
+    """Bounded queue of (event id, pre-rendered message) for one connected client"""
+
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def push(self, message: Tuple[int, str]):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Don't let one slow client grow memory: drop its backlog and tell
+            # it to resume from the log instead
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+
+
+class TaskEventBroker:
+    """
+    Tails the task_events table once per process and fans new events out to
+    the subscribed streams of the event's user. The poller only runs while
+    somebody is subscribed.
+    """
+
+    def __init__(self, session_factory=SessionLocal, poll_interval: float = None,
+                 queue_size: int = None, max_subscribers: int = None):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval or config.EVENT_POLL_INTERVAL
+        self.queue_size = queue_size or config.EVENT_QUEUE_SIZE
+        self.max_subscribers = max_subscribers or config.EVENT_MAX_SUBSCRIBERS
+        self.last_id = 0
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._count = 0
+        self._poller: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        return self._count >= self.max_subscribers
+
+    def _query(self, statement):
+        db = self.session_factory()
+        try:
+            return db.execute(statement).all()
+        finally:
+            db.close()
+
+    async def subscribe(self, user_id: int) -> Subscription:
+        if self.full:
+            raise SubscriberLimitReached()
+        if self._poller is None or self._poller.done():
+            # Start tailing from the current end of the log before anyone replays,
+            # so nothing falls between a replay and the first poll
+            rows = await run_in_threadpool(self._query, select(func.max(TaskEvent.id)))
+            self.last_id = max(self.last_id, rows[0][0] or 0)
+            self._poller = asyncio.create_task(self._poll())
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscribers[user_id].add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers and subscription in subscribers:
+            subscribers.discard(subscription)
+            self._count -= 1
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+
+    async def _poll(self):
+        # The task was started from a request; its queries aren't that request's
+        stop_tracking()
+        while self._count:
+            try:
+                rows = await run_in_threadpool(
+                    self._query,
+                    select(TaskEvent.id, TaskEvent.user_id, TaskEvent.task_id, TaskEvent.event_type, TaskEvent.payload)
+                    .where(TaskEvent.id > self.last_id).order_by(TaskEvent.id).limit(1000)
+                )
+            except Exception:
+                logger.exception("Polling task events failed")
+                rows = []
+            for event_id, user_id, task_id, event_type, payload in rows:
+                self.last_id = event_id
+                subscribers = self._subscribers.get(user_id)
+                if not subscribers:
+                    continue
+                # Rendered once and shared by every stream of the user
+                message = (event_id, format_sse(event_id, event_type, task_id, payload))
+                for subscription in list(subscribers):
+                    subscription.push(message)
+            if len(rows) < 1000:
+                await asyncio.sleep(self.poll_interval)
+
+    def replay(self, user_id: int, since: int, limit: int) -> Optional[List[Tuple[int, str]]]:
+        """Messages after `since` from the log, None if there are more than `limit` or they were pruned"""
+        first_id = self._query(select(func.min(TaskEvent.id)))[0][0]
+        if first_id is not None and since < first_id - 1:
+            return None
+        rows = self._query(
+            select(TaskEvent.id, TaskEvent.task_id, TaskEvent.event_type, TaskEvent.payload)
+            .where(TaskEvent.user_id == user_id, TaskEvent.id > since)
+            .order_by(TaskEvent.id).limit(limit + 1)
+        )
+        if len(rows) > limit:
+            return None
+        return [(event_id, format_sse(event_id, event_type, task_id, payload))
+                for event_id, task_id, event_type, payload in rows]
+
+
+async def stream_task_events(broker: TaskEventBroker, user_id: int, since: Optional[int]):
+    """SSE body: replay from the log after `since`, then live events and heartbeats"""
+    # Subscribed inside the body so a client gone before streaming starts leaves nothing behind
+    try:
+        subscription = await broker.subscribe(user_id)
+    except SubscriberLimitReached:
+        yield f"retry: {RETRY_MS}\n\n"
+        return
+    try:
+        last_sent = since if since is not None else broker.last_id
+        yield f"retry: {RETRY_MS}\n\n"
+        if since is not None:
+            replayed = await run_in_threadpool(broker.replay, subscription.user_id, since, config.EVENT_REPLAY_LIMIT)
+            if replayed is None:
+                # Too far behind to replay: the client should reload its state
+                last_sent = broker.last_id
+                yield f'id: {last_sent}\nevent: reset\ndata: {{"last_id":{last_sent}}}\n\n'
+            else:
+                for event_id, message in replayed:
+                    last_sent = event_id
+                    yield message
+
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if message is RESET:
+                yield f'event: reset\ndata: {{"last_id":{last_sent}}}\n\n'
+                return
+            event_id, text = message
+            if event_id <= last_sent:
+                continue  # already sent during the replay
+            last_sent = event_id
+            yield text
+    finally:
+        broker.unsubscribe(subscription)
+
+
+class PomodoroBroadcaster:
+    """
+    Pushes Pomodoro state transitions to SSE streams. The timer is shared
+    through the database, so while anybody is subscribed the process polls it
+    for changes made by other processes (and for sessions that have ended).
+    Only the latest state matters, so each stream buffers at most a few.
+    """
+
+    def __init__(self, manager, max_subscribers: int = None, poll_interval: float = None):
+        self.manager = manager
+        self.max_subscribers = max_subscribers or config.EVENT_MAX_SUBSCRIBERS
+        self.poll_interval = poll_interval or config.EVENT_POLL_INTERVAL
+        self._queues: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+        self._poller: Optional[asyncio.Task] = None
+        manager.add_listener(self._on_change)
+
+    @property
+    def full(self) -> bool:
+        return len(self._queues) >= self.max_subscribers
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._queues)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, state: dict):
+        if queue.full():
+            queue.get_nowait()  # superseded by the newer state
+        queue.put_nowait(state)
+
+    def _on_change(self, state: dict):
+        # Called on the poller's or a request's thread, never on the event loop
+        for loop, queue in list(self._queues):
+            loop.call_soon_threadsafe(self._offer, queue, state)
+
+    async def _poll(self):
+        # The task was started from a request; its queries aren't that request's
+        stop_tracking()
+        while self._queues:
+            try:
+                await run_in_threadpool(self.manager.refresh)  # listeners hear about new states
+            except Exception:
+                logger.exception("Polling the Pomodoro timer failed")
+            await asyncio.sleep(self.poll_interval)
+
+    async def stream(self):
+        """SSE body: current state, then every transition plus periodic ticks"""
+        entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=4))
+        self._queues.add(entry)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll())
+        try:
+            state = await run_in_threadpool(self.manager.snapshot)
+            yield f"retry: {RETRY_MS}\nevent: state\ndata: {json.dumps(state, separators=(',', ':'))}\n\n"
+            while True:
+                timeout = POMODORO_TICK_SECONDS if state["active"] else HEARTBEAT_SECONDS
+                try:
+                    state = await asyncio.wait_for(entry[1].get(), timeout)
+                    yield f"event: state\ndata: {json.dumps(state, separators=(',', ':'))}\n\n"
+                except asyncio.TimeoutError:
+                    state = self.manager.snapshot(refresh=False)  # kept current by the poller
+                    if state["active"]:
+                        yield f"event: tick\ndata: {state['remaining']}\n\n"
+                    else:
+                        yield ": keep-alive\n\n"
+        finally:
+            self._queues.discard(entry)
+
+
+# Global instances for use throughout the application
+task_event_broker = TaskEventBroker()
+pomodoro_broadcaster = PomodoroBroadcaster(pomodoro_manager)
+
+registry.gauge(
+    "task_event_subscribers", "Clients streaming task events from this process",
+    lambda: task_event_broker.subscriber_count
+)
+registry.gauge(
+    "pomodoro_stream_subscribers", "Clients streaming Pomodoro updates from this process",
+    lambda: pomodoro_broadcaster.subscriber_count
+)
@@ -0,0 +1,258 @@
+"""
+Columnar snapshot export of the tasks table for analytics.
+
+Usage: python -m app.export [--out DIR] [--format parquet|arrow] [--chunk-size N] [--full] [--database-url URL]
+
+Each run appends one part file with the rows changed since the previous run
+(keyed on updated_at, then id) and records it in DIR/manifest.json. Rows are
+read user by user in keyset-paginated chunks, which the (user_id, updated_at,
+id) index serves directly, and written as one row group / record batch per
+chunk, so memory stays bounded. status and source are dictionary-encoded.
+
+A task updated after an export appears again in a later part; read_snapshot()
+keeps the latest version of each task. Deleted tasks are not tracked.
+Arrow IPC parts (.arrow) can be memory-mapped directly.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, create_engine, or_, select
+from sqlalchemy.orm import sessionmaker
+
+from . import config
+from .models import Task
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+MANIFEST = "manifest.json"
+# Rows changed in the last few seconds may belong to transactions that haven't
+# committed yet, so they are left for the next run
+SAFETY_LAG = timedelta(seconds=5)
+
+# Exported columns; status and source are dictionary-encoded
+COLUMNS = (
+    "id", "user_id", "title", "description", "deadline", "priority", "urgent", "important",
+    "status", "estimated_duration", "actual_duration", "scheduled_start", "scheduled_end",
+    "completed_at", "created_at", "updated_at", "source", "recurring_task_id", "occurrence_start",
+)
+DICTIONARY_COLUMNS = ("status", "source")
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError("The snapshot export needs pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def arrow_schema():
+    pa = _require_pyarrow()
+    timestamp = pa.timestamp("us")
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    types = {
+        "id": pa.int64(), "user_id": pa.int64(), "title": pa.string(), "description": pa.string(),
+        "deadline": timestamp, "priority": pa.int32(), "urgent": pa.bool_(), "important": pa.bool_(),
+        "status": dictionary, "estimated_duration": pa.int32(), "actual_duration": pa.int32(),
+        "scheduled_start": timestamp, "scheduled_end": timestamp, "completed_at": timestamp,
+        "created_at": timestamp, "updated_at": timestamp, "source": dictionary,
+        "recurring_task_id": pa.int64(), "occurrence_start": timestamp,
+    }
+    return pa.schema([(name, types[name]) for name in COLUMNS])
+
+
+class _DictionaryEncoder:
+    """
+    Dictionary that only ever grows, so each batch's dictionary extends the
+    previous one and the IPC file writer can emit deltas instead of replacements.
+    """
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def encode(self, values):
+        pa = _require_pyarrow()
+        codes = []
+        for value in values:
+            if value is None:
+                codes.append(None)
+                continue
+            code = self._codes.get(value)
+            if code is None:
+                code = self._codes[value] = len(self.values)
+                self.values.append(value)
+            codes.append(code)
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, type=pa.int32()), pa.array(self.values, type=pa.string())
+        )
+
+
+def read_manifest(directory: str) -> dict:
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return {"format": None, "parts": [], "high_watermark": None}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_atomic(path: str, content: str):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def _iter_chunks(db, watermark: Optional[dict], until: datetime, chunk_size: int):
+    """Rows changed after the watermark and before `until`, per user in keyset-paginated chunks"""
+    columns = [getattr(Task, name) for name in COLUMNS]
+    start = (datetime.fromisoformat(watermark["changed_at"]), watermark["id"]) if watermark else None
+    user_ids = db.execute(select(Task.user_id).distinct().order_by(Task.user_id)).scalars().all()
+    for user_id in user_ids:
+        last = start
+        while True:
+            query = select(*columns, Task.updated_at.label("changed_at")).where(
+                Task.user_id == user_id, Task.updated_at <= until
+            )
+            if last is not None:
+                query = query.where(or_(Task.updated_at > last[0], and_(Task.updated_at == last[0], Task.id > last[1])))
+            rows = db.execute(query.order_by(Task.updated_at, Task.id).limit(chunk_size)).all()
+            if not rows:
+                break
+            yield rows
+            last = (rows[-1].changed_at, rows[-1].id)
+
+
+def _to_batch(rows, schema, encoders: Dict[str, _DictionaryEncoder]):
+    pa = _require_pyarrow()
+    arrays = []
+    for field in schema:
+        values = [getattr(row, field.name) for row in rows]
+        if field.name in encoders:
+            arrays.append(encoders[field.name].encode(values))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def export_snapshot(db, directory: str, fmt: str = "parquet", chunk_size: int = 50000,
+                    full: bool = False, progress=print) -> int:
+    """Append the rows changed since the last export as a new part; returns the row count"""
+    pa = _require_pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    manifest = read_manifest(directory)
+    if full:
+        for part in manifest["parts"]:
+            path = os.path.join(directory, part["file"])
+            if os.path.exists(path):
+                os.remove(path)
+        manifest = {"format": None, "parts": [], "high_watermark": None}
+    if manifest["format"] and manifest["format"] != fmt:
+        raise ValueError(f"{directory} holds {manifest['format']} parts; use --format {manifest['format']} or --full")
+
+    schema = arrow_schema()
+    encoders = {name: _DictionaryEncoder() for name in DICTIONARY_COLUMNS}
+    file_name = f"part-{len(manifest['parts']):05d}{FORMATS[fmt]}"
+    path = os.path.join(directory, file_name)
+    tmp_path = path + ".tmp"
+
+    writer = None
+    rows_written = 0
+    # Users are read one after another, so the bounds are tracked across all of them
+    first_row = last_row = None
+    try:
+        for rows in _iter_chunks(db, manifest["high_watermark"], datetime.utcnow() - SAFETY_LAG, chunk_size):
+            if writer is None:
+                if fmt == "parquet":
+                    import pyarrow.parquet as pq
+                    writer = pq.ParquetWriter(tmp_path, schema)
+                else:
+                    writer = pa.ipc.new_file(tmp_path, schema,
+                                             options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+            writer.write_batch(_to_batch(rows, schema, encoders))
+            rows_written += len(rows)
+            if first_row is None or (rows[0].changed_at, rows[0].id) < (first_row.changed_at, first_row.id):
+                first_row = rows[0]
+            if last_row is None or (rows[-1].changed_at, rows[-1].id) > (last_row.changed_at, last_row.id):
+                last_row = rows[-1]
+            progress(f"{rows_written} rows exported")
+    except Exception:
+        if writer is not None:
+            writer.close()
+            os.remove(tmp_path)
+        raise
+
+    if writer is None:
+        progress("No changes since the last export")
+        return 0
+    writer.close()
+    os.replace(tmp_path, path)
+
+    manifest["format"] = fmt
+    manifest["parts"].append({
+        "file": file_name,
+        "rows": rows_written,
+        "min_changed_at": first_row.changed_at.isoformat(),
+        "max_changed_at": last_row.changed_at.isoformat(),
+        "exported_at": datetime.utcnow().isoformat(),
+    })
+    manifest["high_watermark"] = {"changed_at": last_row.changed_at.isoformat(), "id": last_row.id}
+    _write_atomic(os.path.join(directory, MANIFEST), json.dumps(manifest, indent=2))
+    progress(f"Wrote {rows_written} rows to {path}")
+    return rows_written
+
+
+def read_snapshot(directory: str, latest_only: bool = True):
+    """
+    Load all parts as one pyarrow Table (Arrow parts are memory-mapped).
+    With latest_only, rows superseded by a later export of the same task are dropped.
+    """
+    pa = _require_pyarrow()
+    manifest = read_manifest(directory)
+    tables = []
+    for part in manifest["parts"]:
+        path = os.path.join(directory, part["file"])
+        if manifest["format"] == "arrow":
+            tables.append(pa.ipc.open_file(pa.memory_map(path)).read_all())
+        else:
+            import pyarrow.parquet as pq
+            tables.append(pq.read_table(path, memory_map=True))
+    if not tables:
+        return arrow_schema().empty_table()
+
+    table = pa.concat_tables(tables)
+    if not latest_only or len(tables) == 1:
+        return table
+    # Parts are in export order, so the last row of each id is its latest version
+    positions = table.select(["id"]).append_column("_position", pa.array(range(table.num_rows), type=pa.int64()))
+    latest = positions.group_by("id").aggregate([("_position", "max")])["_position_max"]
+    return table.take(latest.sort())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the tasks table as a columnar snapshot")
+    parser.add_argument("--out", default="exports/tasks", help="Snapshot directory")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows per row group / record batch")
+    parser.add_argument("--full", action="store_true", help="Drop existing parts and export everything again")
+    parser.add_argument("--database-url", default=config.DATABASE_URL,
+                        help="Database to read, e.g. a replica (defaults to DATABASE_URL)")
+    args = parser.parse_args(argv)
+
+    connect_args = {"check_same_thread": False} if args.database_url.startswith("sqlite") else {}
+    engine = create_engine(args.database_url, connect_args=connect_args)
+    db = sessionmaker(bind=engine)()
+    try:
+        export_snapshot(db, args.out, args.format, args.chunk_size, args.full)
+    except (RuntimeError, ValueError) as e:
+        print(f"Export failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,9 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import requests
 import plotly.express as px
 import pandas as pd
+import time
 from datetime import datetime, timedelta
 
 # Import using absolute paths since Streamlit runs the script directly
@@ -9,12 +11,116 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.utils.pomodoro_timer import pomodoro_manager
+from app.api_client import ApiClient
 from app.schemas import TaskCreate, TaskUpdate, TaskStatus
 
 # Configuration
 st.set_page_config(page_title="Smart Task Scheduler", layout="wide")
-API_BASE_URL = "http://localhost:8000"
+API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+# Address of the API as seen from the browser, for widgets that connect directly
+PUBLIC_API_URL = os.getenv("PUBLIC_API_URL", "http://localhost:8000")
+# Sent as X-User-Id; unset uses the API's default user
+API_USER_ID = os.getenv("API_USER_ID")
+# Seconds a rerun may render API reads from memory; changes made here refresh them at once
+API_CACHE_TTL = float(os.getenv("API_CACHE_TTL", "10"))
+
+# Countdown rendered in the browser from the API's Pomodoro stream: state
+# events on transitions, a tick every few seconds to resync the local clock
+POMODORO_WIDGET = """
+<div id="pomodoro" style="font-family: sans-serif; text-align: center;">
+  <h1 id="clock" style="margin: 0.2em 0;">--:--</h1>
+  <div style="background: #eee; height: 10px; border-radius: 5px;">
+    <div id="bar" style="background: red; height: 10px; width: 0; border-radius: 5px;"></div>
+  </div>
+  <p id="info" style="color: #555;">Connecting...</p>
+</div>
+<script>
+  let state = null;
+  let deadline = 0;
+  const pad = (n) => String(n).padStart(2, "0");
+
+  function remaining() {
+    if (!state) return 0;
+    if (!state.active) return state.remaining;
+    return Math.max(0, Math.round((deadline - Date.now()) / 1000));
+  }
+
+  function render() {
+    if (!state) return;
+    const left = remaining();
+    const color = state.working ? "red" : "green";
+    document.getElementById("clock").textContent =
+      (state.working ? "WORK: " : "BREAK: ") + pad(Math.floor(left / 60)) + ":" + pad(left % 60);
+    document.getElementById("clock").style.color = color;
+    const bar = document.getElementById("bar");
+    bar.style.background = color;
+    bar.style.width = (100 * (state.phase_seconds - left) / state.phase_seconds) + "%";
+    document.getElementById("info").textContent =
+      "Session " + state.session + "/" + state.sessions_before_long_break +
+      " \u00b7 " + (state.active ? "Active" : "Inactive");
+  }
+
+  function sync(seconds) {
+    state.remaining = seconds;
+    deadline = Date.now() + seconds * 1000;
+  }
+
+  const source = new EventSource("__STREAM_URL__");
+  source.addEventListener("state", (e) => { state = JSON.parse(e.data); sync(state.remaining); render(); });
+  source.addEventListener("tick", (e) => { if (state) { sync(Number(e.data)); render(); } });
+  source.onerror = () => { document.getElementById("info").textContent = "Reconnecting..."; };
+  setInterval(render, 1000);
+</script>
+"""
+
+@st.cache_resource
+def get_api_client() -> ApiClient:
+    """One pooled, caching client for all sessions of this frontend process"""
+    return ApiClient(API_BASE_URL, int(API_USER_ID) if API_USER_ID else None, ttl=API_CACHE_TTL)
+
+api = get_api_client()
+
+def fetch_tasks():
+    """Tasks kept in the session and updated from the change feed instead of refetched"""
+    cache = st.session_state.get("task_cache")
+    if cache is not None:
+        # Within the TTL and with no change made through the client, render from memory
+        if cache["generation"] == api.generation and time.monotonic() - cache["checked_at"] < api.ttl:
+            return [cache["tasks"][task_id] for task_id in sorted(cache["tasks"])]
+        generation = api.generation
+        log = api.get("/events/tasks", {"since": cache["last_id"]}, ttl=0)
+        if not log["reset"]:
+            for event in log["events"]:
+                if event["type"] in ("deleted", "archived"):
+                    cache["tasks"].pop(event["task_id"], None)
+                else:
+                    cache["tasks"][event["task_id"]] = event["task"]
+            cache.update(last_id=log["last_id"], checked_at=time.monotonic(), generation=generation)
+            return [cache["tasks"][task_id] for task_id in sorted(cache["tasks"])]
+
+    # First load or too many changes: take the log position first so nothing is missed
+    generation = api.generation
+    last_id = api.get("/events/tasks", {"limit": 0}, ttl=0)["last_id"]
+    tasks = api.get("/tasks/", ttl=0)
+    st.session_state["task_cache"] = {"last_id": last_id, "tasks": {task["id"]: task for task in tasks},
+                                      "checked_at": time.monotonic(), "generation": generation}
+    return tasks
+
+def run_action(action, *args):
+    """Button callback: runs before the rerun, so the page renders the result without another one"""
+    try:
+        action(*args)
+    except requests.HTTPError as e:
+        st.session_state["action_error"] = f"Request failed: {e.response.text}"
+    except Exception as e:
+        st.session_state["action_error"] = f"Error connecting to API: {str(e)}"
+
+def bulk_action(action: str, update: dict = None):
+    """Apply an action to the selected tasks with one POST /tasks/bulk"""
+    selected = st.session_state.get("bulk_selection", [])
+    if selected:
+        api.bulk(selected, action, update)
+    st.session_state["bulk_selection"] = []
 
 # Title
 st.title("🧠 Smart Task Scheduler")
@@ -27,19 +133,17 @@ if page == "Dashboard":
     
     # Fetch tasks stats
     try:
-        tasks_response = requests.get(f"{API_BASE_URL}/tasks/")
-        if tasks_response.status_code == 200:
-            tasks = tasks_response.json()
-            total_tasks = len(tasks)
-            completed_tasks = len([t for t in tasks if t['status'] == 'completed'])
-            
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Total Tasks", total_tasks)
-            col2.metric("Completed", completed_tasks)
-            col3.metric("Pending", total_tasks - completed_tasks if total_tasks > 0 else 0)
-        else:
-            st.error(f"Failed to fetch tasks: {tasks_response.status_code}")
-            tasks = []
+        tasks = fetch_tasks()
+        total_tasks = len(tasks)
+        completed_tasks = len([t for t in tasks if t['status'] == 'completed'])
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total Tasks", total_tasks)
+        col2.metric("Completed", completed_tasks)
+        col3.metric("Pending", total_tasks - completed_tasks if total_tasks > 0 else 0)
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch tasks: {e.response.status_code}")
+        tasks = []
     except:
         st.warning("Could not connect to API. Make sure the backend is running.")
         tasks = []
@@ -96,91 +200,81 @@ elif page == "Tasks":
                     if task_dict.get('deadline'):
                         task_dict['deadline'] = task_dict['deadline'].isoformat()
                     
-                    response = requests.post(f"{API_BASE_URL}/tasks/", json=task_dict)
-                    if response.status_code == 200:
-                        st.success("Task created successfully!")
-                        st.rerun()
-                    else:
-                        st.error(f"Failed to create task: {response.text}")
+                    api.post("/tasks/", json=task_dict)
+                    st.success("Task created successfully!")
+                except requests.HTTPError as e:
+                    st.error(f"Failed to create task: {e.response.text}")
                 except Exception as e:
                     st.error(f"Error connecting to API: {str(e)}")
     
     # Display existing tasks
     try:
-        response = requests.get(f"{API_BASE_URL}/tasks/")
-        if response.status_code == 200:
-            tasks = response.json()
+        tasks = fetch_tasks()
+        
+        if "action_error" in st.session_state:
+            st.error(st.session_state.pop("action_error"))
+        
+        if tasks:
+            # Acting on many tasks at once is a single request
+            st.subheader("Bulk Actions")
+            titles = {task['id']: f"{task['title']} (#{task['id']})" for task in tasks}
+            st.multiselect("Select tasks", options=list(titles), format_func=titles.get, key="bulk_selection")
+            bulk_col1, bulk_col2, bulk_col3 = st.columns(3)
+            nothing_selected = not st.session_state.get("bulk_selection")
+            bulk_col1.button("Start selected", disabled=nothing_selected, on_click=run_action,
+                             args=(bulk_action, "update", {"status": "in_progress"}))
+            bulk_col2.button("Complete selected", disabled=nothing_selected, on_click=run_action,
+                             args=(bulk_action, "update", {"status": "completed"}))
+            bulk_col3.button("❌ Delete selected", disabled=nothing_selected, on_click=run_action,
+                             args=(bulk_action, "delete"))
             
-            if tasks:
-                st.subheader("All Tasks")
+            st.subheader("All Tasks")
+            
+            for task in tasks:
+                status_color = {
+                    'pending': 'gray',
+                    'in_progress': 'blue', 
+                    'completed': 'green',
+                    'cancelled': 'red'
+                }.get(task['status'], 'gray')
                 
-                for task in tasks:
-                    status_color = {
-                        'pending': 'gray',
-                        'in_progress': 'blue', 
-                        'completed': 'green',
-                        'cancelled': 'red'
-                    }.get(task['status'], 'gray')
-                    
-                    urgency_importance = "🔴 Urgent & Important" if task['urgent'] and task['important'] else \
-                                        "🟡 Important" if task['important'] and not task['urgent'] else \
-                                        "🟠 Urgent" if task['urgent'] and not task['important'] else \
-                                        "⚪ Not Urgent/Important"
-                    
-                    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
-                    
-                    with col1:
-                        st.markdown(f"**{task['title']}**")
-                        if task['description']:
-                            st.caption(task['description'][:100] + ("..." if len(task['description']) > 100 else ""))
-                    
-                    with col2:
-                        st.markdown(f"📅 Deadline: {task['deadline'] or 'None'}")
-                        st.markdown(f"⏱️ Duration: {task['estimated_duration']} min")
-                        st.markdown(f"⭐ Priority: {task['priority']}/5 - {urgency_importance}")
-                    
-                    with col3:
-                        st.markdown(f"<span style='color:{status_color}; font-weight:bold;'>{task['status'].replace('_', ' ').title()}</span>", unsafe_allow_html=True)
-                        
-                        # Status update buttons
-                        if task['status'] == 'pending':
-                            if st.button(f"Start##{task['id']}"):
-                                update_data = {'status': 'in_progress'}
-                                # Convert datetime fields to ISO format strings
-                                for key, value in update_data.items():
-                                    if isinstance(value, datetime):
-                                        update_data[key] = value.isoformat()
-                                resp = requests.put(f"{API_BASE_URL}/tasks/{task['id']}", json=update_data)
-                                if resp.status_code == 200:
-                                    st.rerun()
-                                else:
-                                    st.error(f"Failed to update task: {resp.text}")
-                        elif task['status'] == 'in_progress':
-                            if st.button(f"Complete##{task['id']}"):
-                                update_data = {'status': 'completed'}
-                                # Convert datetime fields to ISO format strings
-                                for key, value in update_data.items():
-                                    if isinstance(value, datetime):
-                                        update_data[key] = value.isoformat()
-                                resp = requests.put(f"{API_BASE_URL}/tasks/{task['id']}", json=update_data)
-                                if resp.status_code == 200:
-                                    st.rerun()
-                                else:
-                                    st.error(f"Failed to update task: {resp.text}")
-                    
-                    with col4:
-                        if st.button(f"❌ Delete##{task['id']}"):
-                            resp = requests.delete(f"{API_BASE_URL}/tasks/{task['id']}")
-                            if resp.status_code == 200:
-                                st.rerun()
-                            else:
-                                st.error(f"Failed to delete task: {resp.text}")
+                urgency_importance = "🔴 Urgent & Important" if task['urgent'] and task['important'] else \
+                                    "🟡 Important" if task['important'] and not task['urgent'] else \
+                                    "🟠 Urgent" if task['urgent'] and not task['important'] else \
+                                    "⚪ Not Urgent/Important"
+                
+                col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+                
+                with col1:
+                    st.markdown(f"**{task['title']}**")
+                    if task['description']:
+                        st.caption(task['description'][:100] + ("..." if len(task['description']) > 100 else ""))
+                
+                with col2:
+                    st.markdown(f"📅 Deadline: {task['deadline'] or 'None'}")
+                    st.markdown(f"⏱️ Duration: {task['estimated_duration']} min")
+                    st.markdown(f"⭐ Priority: {task['priority']}/5 - {urgency_importance}")
+                
+                with col3:
+                    st.markdown(f"<span style='color:{status_color}; font-weight:bold;'>{task['status'].replace('_', ' ').title()}</span>", unsafe_allow_html=True)
                     
-                    st.divider()
-            else:
-                st.info("No tasks found. Create your first task above!")
+                    # Status update buttons
+                    if task['status'] == 'pending':
+                        st.button(f"Start##{task['id']}", on_click=run_action,
+                                  args=(api.put, f"/tasks/{task['id']}", {'status': 'in_progress'}))
+                    elif task['status'] == 'in_progress':
+                        st.button(f"Complete##{task['id']}", on_click=run_action,
+                                  args=(api.put, f"/tasks/{task['id']}", {'status': 'completed'}))
+                
+                with col4:
+                    st.button(f"❌ Delete##{task['id']}", on_click=run_action,
+                              args=(api.delete, f"/tasks/{task['id']}"))
+                
+                st.divider()
         else:
-            st.error(f"Failed to fetch tasks: {response.status_code}")
+            st.info("No tasks found. Create your first task above!")
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch tasks: {e.response.status_code}")
     except Exception as e:
         st.error(f"Error connecting to API: {str(e)}")
 
@@ -190,37 +284,35 @@ elif page == "Schedule":
     selected_date = st.date_input("Select Date", value=datetime.today())
     
     try:
-        response = requests.get(f"{API_BASE_URL}/schedule/daily?date={selected_date}")
-        if response.status_code == 200:
-            schedule = response.json()
+        schedule = api.get("/schedule/daily", {"date": str(selected_date)})
+        
+        if schedule['schedule']:
+            st.subheader(f"Schedule for {schedule['date']}")
+            
+            # Create a timeline visualization
+            schedule_items = schedule['schedule']
+            df_schedule = pd.DataFrame(schedule_items)
             
-            if schedule['schedule']:
-                st.subheader(f"Schedule for {schedule['date']}")
+            if not df_schedule.empty:
+                df_schedule['start_time'] = pd.to_datetime(df_schedule['start_time'])
+                df_schedule['end_time'] = pd.to_datetime(df_schedule['end_time'])
                 
-                # Create a timeline visualization
-                schedule_items = schedule['schedule']
-                df_schedule = pd.DataFrame(schedule_items)
+                # Format times for display
+                df_schedule['time_range'] = df_schedule.apply(
+                    lambda x: f"{x['start_time'].strftime('%H:%M')} - {x['end_time'].strftime('%H:%M')}", axis=1)
                 
-                if not df_schedule.empty:
-                    df_schedule['start_time'] = pd.to_datetime(df_schedule['start_time'])
-                    df_schedule['end_time'] = pd.to_datetime(df_schedule['end_time'])
-                    
-                    # Format times for display
-                    df_schedule['time_range'] = df_schedule.apply(
-                        lambda x: f"{x['start_time'].strftime('%H:%M')} - {x['end_time'].strftime('%H:%M')}", axis=1)
-                    
-                    for idx, item in df_schedule.iterrows():
-                        with st.container():
-                            st.markdown(f"### 📅 {item['title']}")
-                            st.markdown(f"**Time:** {item['time_range']} | **Duration:** {item['duration']} min")
-                            st.progress(min(item['duration']/60, 1.0))  # Progress bar based on duration
-                            st.divider()
-                else:
-                    st.info("No scheduled tasks for this day.")
+                for idx, item in df_schedule.iterrows():
+                    with st.container():
+                        st.markdown(f"### 📅 {item['title']}")
+                        st.markdown(f"**Time:** {item['time_range']} | **Duration:** {item['duration']} min")
+                        st.progress(min(item['duration']/60, 1.0))  # Progress bar based on duration
+                        st.divider()
             else:
                 st.info("No scheduled tasks for this day.")
         else:
-            st.error(f"Failed to fetch schedule: {response.status_code}")
+            st.info("No scheduled tasks for this day.")
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch schedule: {e.response.status_code}")
     except Exception as e:
         st.error(f"Error connecting to API: {str(e)}")
 
@@ -230,92 +322,92 @@ elif page == "Analytics":
     days = st.slider("Days to analyze", 1, 30, 7)
     
     try:
-        response = requests.get(f"{API_BASE_URL}/analytics/productivity?days={days}")
-        if response.status_code == 200:
-            report = response.json()
-            
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Period", report['period'])
-            col2.metric("Total Tasks", report['total_tasks'])
-            col3.metric("Completion Rate", f"{report['productivity_percentage']:.1f}%")
-            
-            # Insights
-            if report['insights']:
-                st.subheader("Insights")
-                for insight in report['insights']:
-                    st.info(insight)
-            
-            # Recommendations
-            if report['recommendations']:
-                st.subheader("Recommendations")
-                for rec in report['recommendations']:
-                    st.success(rec)
+        report = api.get("/analytics/productivity", {"days": days})
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Period", report['period'])
+        col2.metric("Total Tasks", report['total_tasks'])
+        col3.metric("Completion Rate", f"{report['productivity_percentage']:.1f}%")
+        
+        # Insights
+        if report['insights']:
+            st.subheader("Insights")
+            for insight in report['insights']:
+                st.info(insight)
+        
+        # Recommendations
+        if report['recommendations']:
+            st.subheader("Recommendations")
+            for rec in report['recommendations']:
+                st.success(rec)
+        
+        # If we have tasks, show a chart
+        if report['total_tasks'] > 0:
+            # Create a simple bar chart showing completed vs pending
+            data = {
+                'Status': ['Completed', 'Pending'],
+                'Count': [report['completed_tasks'], report['total_tasks'] - report['completed_tasks']]
+            }
+            df = pd.DataFrame(data)
             
-            # If we have tasks, show a chart
-            if report['total_tasks'] > 0:
-                # Create a simple bar chart showing completed vs pending
-                data = {
-                    'Status': ['Completed', 'Pending'],
-                    'Count': [report['completed_tasks'], report['total_tasks'] - report['completed_tasks']]
-                }
-                df = pd.DataFrame(data)
-                
-                fig = px.bar(df, x='Status', y='Count', color='Status',
-                           title='Task Completion Overview',
-                           color_discrete_map={'Completed': '#00FF00', 'Pending': '#FFA500'})
-                st.plotly_chart(fig, use_container_width=True)
+            fig = px.bar(df, x='Status', y='Count', color='Status',
+                       title='Task Completion Overview',
+                       color_discrete_map={'Completed': '#00FF00', 'Pending': '#FFA500'})
+            st.plotly_chart(fig, use_container_width=True)
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch analytics: {e.response.status_code}")
+    except Exception as e:
+        st.error(f"Error connecting to API: {str(e)}")
+
+    # Trends are bucketed by the API, so only a few values per day are transferred
+    st.subheader("Trends")
+    col1, col2 = st.columns(2)
+    trend_days = col1.slider("Days to chart", 7, 180, 90)
+    bucket = col2.selectbox("Group by", ["day", "week"])
+
+    try:
+        timeseries = api.get("/analytics/timeseries", {"bucket": bucket, "days": trend_days})
+        df_trend = pd.DataFrame(timeseries['series'], index=pd.to_datetime(timeseries['buckets']))
+
+        if df_trend[['created', 'completed']].to_numpy().sum() > 0:
+            fig = px.line(df_trend, y=['created', 'completed'], title='Tasks Created vs Completed',
+                          labels={'index': bucket.title(), 'value': 'Tasks', 'variable': ''})
+            st.plotly_chart(fig, use_container_width=True)
+
+            fig = px.line(df_trend, y='on_time_rate', title='On-time Completion Rate',
+                          labels={'index': bucket.title(), 'on_time_rate': 'On time'})
+            fig.update_yaxes(tickformat='.0%', range=[0, 1])
+            st.plotly_chart(fig, use_container_width=True)
+
+            fig = px.bar(df_trend, y=['estimated_minutes', 'actual_minutes'], barmode='group',
+                         title='Estimated vs Actual Minutes',
+                         labels={'index': bucket.title(), 'value': 'Minutes', 'variable': ''})
+            st.plotly_chart(fig, use_container_width=True)
         else:
-            st.error(f"Failed to fetch analytics: {response.status_code}")
+            st.info("No task activity in this period.")
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch trends: {e.response.status_code}")
     except Exception as e:
         st.error(f"Error connecting to API: {str(e)}")
 
 elif page == "Pomodoro":
     st.header("🍅 Pomodoro Timer")
     
-    # Timer controls
+    # The timer runs in the API; buttons send commands and the widget below
+    # receives updates over SSE, so the countdown doesn't rerun this script
     col1, col2, col3, col4 = st.columns(4)
+    for column, label, action in ((col1, "▶️ Start", "start"), (col2, "⏸️ Pause", "pause"),
+                                  (col3, "⏹️ Stop", "stop"), (col4, "🔄 Reset", "reset")):
+        with column:
+            if st.button(label):
+                try:
+                    api.post(f"/pomodoro/{action}")
+                except requests.HTTPError as e:
+                    st.error(f"Failed to {action} timer: {e.response.text}")
+                except Exception as e:
+                    st.error(f"Error connecting to API: {str(e)}")
     
-    with col1:
-        if st.button("▶️ Start"):
-            pomodoro_manager.start_timer()
-            st.rerun()
-    
-    with col2:
-        if st.button("⏸️ Pause"):
-            pomodoro_manager.pause_timer()
-            st.rerun()
-    
-    with col3:
-        if st.button("⏹️ Stop"):
-            pomodoro_manager.stop_timer()
-            st.rerun()
-    
-    with col4:
-        if st.button("🔄 Reset"):
-            pomodoro_manager.reset_timer()
-            st.rerun()
-    
-    # Display timer
-    timer_status = pomodoro_manager.get_status()
-    
-    # Calculate minutes and seconds
-    minutes = timer_status.remaining_time // 60
-    seconds = timer_status.remaining_time % 60
-    
-    # Display large timer
-    timer_display = f"{minutes:02d}:{seconds:02d}"
-    
-    if timer_status.is_working:
-        st.markdown(f"<h1 style='text-align: center; color: red;'>WORK: {timer_display}</h1>", unsafe_allow_html=True)
-        st.progress((timer_status.work_duration * 60 - timer_status.remaining_time) / (timer_status.work_duration * 60))
-    else:
-        st.markdown(f"<h1 style='text-align: center; color: green;'>BREAK: {timer_display}</h1>", unsafe_allow_html=True)
-        if timer_status.current_session % timer_status.sessions_before_long_break == 0:
-            st.progress((timer_status.long_break_duration * 60 - timer_status.remaining_time) / (timer_status.long_break_duration * 60))
-        else:
-            st.progress((timer_status.break_duration * 60 - timer_status.remaining_time) / (timer_status.break_duration * 60))
-    
-    # Show session info
-    st.write(f"Session: {timer_status.current_session}/{timer_status.sessions_before_long_break}")
-    st.write(f"Mode: {'Working' if timer_status.is_working else 'Break'}")
-    st.write(f"Status: {'Active' if timer_status.is_active else 'Inactive'}")
\ No newline at end of file
+    components.html(
+        POMODORO_WIDGET.replace("__STREAM_URL__", f"{PUBLIC_API_URL}/pomodoro/stream"),
+        height=240
+    )
@@ -1,12 +1,13 @@
+import json
 import os
+from contextlib import nullcontext
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
+from ..config import DEFAULT_USER_ID, IMPORT_BATCH_SIZE
+from ..crud import record_task_event
 from ..models import Task
 from ..schemas import TaskCreate
+from .google_client import google_clients
 
 class GoogleCalendarIntegration:
     def __init__(self, credentials_path: str = None, token_path: str = None):
@@ -14,40 +15,76 @@ class GoogleCalendarIntegration:
         self.token_path = token_path or "token.json"
         self.scopes = ['https://www.googleapis.com/auth/calendar.readonly']
         self.service = None
+        self._client = None
 
     def authenticate(self):
         """Authenticate with Google Calendar API"""
+        self._use(google_clients.get(("token_file", os.path.abspath(self.token_path)),
+                                     self._load_token_file, self._save_token))
+        return self._client.credentials
+
+    def _load_token_file(self):
+        # The Google client libraries are slow to import, load them on first use
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import Flow
+        
         creds = None
         
-        # Load existing token
+        # Load existing token; an expired one is refreshed by the client cache
         if os.path.exists(self.token_path):
             creds = Credentials.from_authorized_user_file(self.token_path, self.scopes)
         
-        # If no valid credentials, initiate OAuth flow
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = Flow.from_client_secrets_file(
-                    self.credentials_path,
-                    scopes=self.scopes,
-                    redirect_uri='urn:ietf:wg:oauth:2.0:oob'
-                )
-                auth_url, _ = flow.authorization_url(prompt='consent')
-                
-                print(f'Please visit this URL to authorize the application: {auth_url}')
-                code = input('Enter the authorization code: ')
-                
-                flow.fetch_token(code=code)
-                creds = flow.credentials
+        # If no usable credentials, initiate OAuth flow
+        if not creds or not (creds.valid or creds.refresh_token):
+            flow = Flow.from_client_secrets_file(
+                self.credentials_path,
+                scopes=self.scopes,
+                redirect_uri='urn:ietf:wg:oauth:2.0:oob'
+            )
+            auth_url, _ = flow.authorization_url(prompt='consent')
             
-            # Save credentials for next run
-            with open(self.token_path, 'w') as token:
-                token.write(creds.to_json())
-        
-        self.service = build('calendar', 'v3', credentials=creds)
+            print(f'Please visit this URL to authorize the application: {auth_url}')
+            code = input('Enter the authorization code: ')
+            
+            flow.fetch_token(code=code)
+            creds = flow.credentials
+            self._save_token(creds)
         return creds
 
+    def _save_token(self, creds):
+        # Save credentials for next run, only when they changed
+        with open(self.token_path, 'w') as token:
+            token.write(creds.to_json())
+
+    def authenticate_with_tokens(self, access_token: str, refresh_token: str):
+        """Authenticate with tokens obtained elsewhere, e.g. passed to the import endpoint"""
+        self._use(google_clients.get(("tokens", refresh_token),
+                                     lambda: self._credentials_from_tokens(access_token, refresh_token)))
+        return self._client.credentials
+
+    def _credentials_from_tokens(self, access_token: str, refresh_token: str):
+        from google.oauth2.credentials import Credentials
+        
+        # The client id and secret from credentials.json let the library refresh the access token
+        client = {}
+        if os.path.exists(self.credentials_path):
+            with open(self.credentials_path) as f:
+                secrets = json.load(f)
+            client = secrets.get("installed") or secrets.get("web") or {}
+        
+        return Credentials(
+            token=access_token,
+            refresh_token=refresh_token,
+            token_uri=client.get("token_uri", "https://oauth2.googleapis.com/token"),
+            client_id=client.get("client_id"),
+            client_secret=client.get("client_secret"),
+            scopes=self.scopes
+        )
+
+    def _use(self, client):
+        self._client = client
+        self.service = client.service
+
     def get_events(self, calendar_id: str = 'primary', time_min: datetime = None, time_max: datetime = None) -> List[Dict[str, Any]]:
         """Get events from Google Calendar"""
         if not self.service:
@@ -63,13 +100,15 @@ class GoogleCalendarIntegration:
         time_min_rfc3339 = time_min.isoformat() + 'Z'
         time_max_rfc3339 = time_max.isoformat() + 'Z'
         
-        events_result = self.service.events().list(
-            calendarId=calendar_id,
-            timeMin=time_min_rfc3339,
-            timeMax=time_max_rfc3339,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
+        # A cached client is shared by every sync of the account, one call at a time
+        with self._client.lock if self._client else nullcontext():
+            events_result = self.service.events().list(
+                calendarId=calendar_id,
+                timeMin=time_min_rfc3339,
+                timeMax=time_max_rfc3339,
+                singleEvents=True,
+                orderBy='startTime'
+            ).execute()
         
         events = events_result.get('items', [])
         return events
@@ -118,25 +157,34 @@ class GoogleCalendarIntegration:
         
         return tasks
 
-    def import_events_as_tasks(self, db, calendar_id: str = 'primary') -> List[Task]:
-        """Import events from Google Calendar as tasks in the database"""
+    def import_events_as_tasks(self, db, calendar_id: str = 'primary', user_id: int = DEFAULT_USER_ID,
+                               batch_size: int = IMPORT_BATCH_SIZE, progress=None) -> List[Task]:
+        """Import events from Google Calendar as tasks, committing batch_size tasks at a time"""
         events = self.get_events(calendar_id=calendar_id)
         task_objects = self.events_to_tasks(events)
         
         imported_tasks = []
-        for task_obj in task_objects:
-            # Create task in database
-            db_task = Task(
-                title=task_obj.title,
-                description=task_obj.description,
-                deadline=task_obj.deadline,
-                priority=task_obj.priority,
-                estimated_duration=task_obj.estimated_duration,
-                source=task_obj.source
-            )
-            db.add(db_task)
+        for start in range(0, len(task_objects), batch_size):
+            # Create tasks in database
+            batch = [
+                Task(
+                    user_id=user_id,
+                    title=task_obj.title,
+                    description=task_obj.description,
+                    deadline=task_obj.deadline,
+                    priority=task_obj.priority,
+                    estimated_duration=task_obj.estimated_duration,
+                    source=task_obj.source
+                )
+                for task_obj in task_objects[start:start + batch_size]
+            ]
+            db.add_all(batch)
+            db.flush()
+            for db_task in batch:
+                record_task_event(db, "created", db_task)
             db.commit()
-            db.refresh(db_task)
-            imported_tasks.append(db_task)
+            imported_tasks.extend(batch)
+            if progress:
+                progress(len(imported_tasks), len(task_objects))
         
         return imported_tasks
\ No newline at end of file
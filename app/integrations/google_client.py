@@ -0,0 +1,139 @@
+"""
+Per-account cache of Google Calendar API clients.
+
+Building a client means parsing the Calendar discovery document and, with
+an expired token, a refresh round trip to Google. Here the discovery
+document bundled with google-api-python-client is parsed once per process,
+each account keeps its credentials and service object, and a background
+thread refreshes tokens shortly before they expire. All refreshes and API
+calls of one account hold that account's lock, so concurrent syncs never
+refresh the same token twice or share the (not thread-safe) HTTP client.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Hashable, Optional
+
+from .. import config
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def calendar_discovery_document() -> dict:
+    """The Calendar v3 discovery document shipped with the client library, parsed once"""
+    from googleapiclient.discovery_cache import get_static_doc
+
+    return json.loads(get_static_doc("calendar", "v3"))
+
+
+class GoogleAccountClient:
+    """Credentials and Calendar service of one account; use `with client.lock` around API calls"""
+
+    def __init__(self, credentials, on_refresh: Optional[Callable] = None):
+        from googleapiclient.discovery import build_from_document
+
+        self.credentials = credentials
+        self.on_refresh = on_refresh
+        self.service = build_from_document(calendar_discovery_document(), credentials=credentials)
+        self.lock = threading.RLock()
+        self.last_used = time.monotonic()
+
+    def needs_refresh(self, margin: float) -> bool:
+        """Whether the token is missing or expires within margin seconds"""
+        credentials = self.credentials
+        if not credentials.token:
+            return True
+        if credentials.expiry is None:
+            return False  # unknown lifetime: refreshed by the library on a 401
+        return credentials.expiry - timedelta(seconds=margin) <= datetime.utcnow()
+
+    def refresh(self, margin: float = 0):
+        """Refresh the token unless another thread just did"""
+        from google.auth.transport.requests import Request
+
+        with self.lock:
+            if not self.needs_refresh(margin) or not self.credentials.refresh_token:
+                return
+            self.credentials.refresh(Request())
+            if self.on_refresh:
+                self.on_refresh(self.credentials)
+
+
+class GoogleClientCache:
+    """LRU of GoogleAccountClients with a background token refresher"""
+
+    def __init__(self, max_size: int = None, refresh_margin: float = None, idle_seconds: float = None):
+        self.max_size = config.GOOGLE_CLIENT_CACHE_SIZE if max_size is None else max_size
+        self.refresh_margin = config.GOOGLE_TOKEN_REFRESH_MARGIN if refresh_margin is None else refresh_margin
+        self.idle_seconds = config.GOOGLE_CLIENT_IDLE_SECONDS if idle_seconds is None else idle_seconds
+        self._clients: "OrderedDict[Hashable, GoogleAccountClient]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def get(self, account: Hashable, load_credentials: Callable, on_refresh: Optional[Callable] = None
+            ) -> GoogleAccountClient:
+        """The account's client, created from load_credentials() on first use and fresh for the next call"""
+        with self._lock:
+            client = self._clients.get(account)
+            if client is not None:
+                self._clients.move_to_end(account)
+        if client is None:
+            client = GoogleAccountClient(load_credentials(), on_refresh)
+            with self._lock:
+                # Another thread may have built one meanwhile; keep the first
+                client = self._clients.setdefault(account, client)
+                self._clients.move_to_end(account)
+                while len(self._clients) > self.max_size:
+                    self._clients.popitem(last=False)
+                self._start_refresher()
+        client.last_used = time.monotonic()
+        # Normally the refresher got here first and this is a no-op
+        client.refresh()
+        return client
+
+    def evict(self, account: Hashable):
+        with self._lock:
+            self._clients.pop(account, None)
+
+    def _start_refresher(self):
+        if self._refresher is None or not self._refresher.is_alive():
+            self._stop.clear()
+            self._refresher = threading.Thread(target=self._refresh_loop, name="google-token-refresh", daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        interval = max(1.0, min(60.0, self.refresh_margin / 2))
+        while not self._stop.wait(interval):
+            with self._lock:
+                clients = list(self._clients.items())
+            for account, client in clients:
+                if time.monotonic() - client.last_used > self.idle_seconds:
+                    # Nobody synced this account lately, don't keep its token alive
+                    self.evict(account)
+                    continue
+                if not client.needs_refresh(self.refresh_margin):
+                    continue
+                try:
+                    client.refresh(self.refresh_margin)
+                except Exception:
+                    logger.exception("Refreshing a Google token failed, dropping the cached client")
+                    self.evict(account)
+
+    def shutdown(self):
+        """Stop the refresher and forget all clients"""
+        self._stop.set()
+        with self._lock:
+            self._clients.clear()
+
+
+# Global instance for use throughout the application
+google_clients = GoogleClientCache()
@@ -1,6 +1,8 @@
 import requests
 from typing import List, Dict, Any
 from datetime import datetime
+from ..config import DEFAULT_USER_ID, IMPORT_BATCH_SIZE
+from ..crud import record_task_event
 from ..models import Task
 from ..schemas import TaskCreate
 
@@ -77,29 +79,37 @@ class TodoistIntegration:
             source='todoist'
         )
 
-    def import_tasks(self, db) -> List[Task]:
-        """Import tasks from Todoist to the database"""
+    def import_tasks(self, db, user_id: int = DEFAULT_USER_ID, batch_size: int = IMPORT_BATCH_SIZE,
+                     progress=None) -> List[Task]:
+        """Import tasks from Todoist to the database, committing batch_size tasks at a time"""
         todoist_tasks = self.get_tasks()
         imported_tasks = []
         
-        for todoist_task in todoist_tasks:
-            smart_task = self.todoist_task_to_smart_task(todoist_task)
+        for start in range(0, len(todoist_tasks), batch_size):
+            batch = []
+            for todoist_task in todoist_tasks[start:start + batch_size]:
+                smart_task = self.todoist_task_to_smart_task(todoist_task)
+                
+                # Create task in database
+                batch.append(Task(
+                    user_id=user_id,
+                    title=smart_task.title,
+                    description=smart_task.description,
+                    deadline=smart_task.deadline,
+                    priority=smart_task.priority,
+                    important=smart_task.important,
+                    estimated_duration=smart_task.estimated_duration,
+                    source=smart_task.source
+                ))
             
-            # Create task in database
-            db_task = Task(
-                title=smart_task.title,
-                description=smart_task.description,
-                deadline=smart_task.deadline,
-                priority=smart_task.priority,
-                important=smart_task.important,
-                estimated_duration=smart_task.estimated_duration,
-                source=smart_task.source
-            )
-            
-            db.add(db_task)
+            db.add_all(batch)
+            db.flush()
+            for db_task in batch:
+                record_task_event(db, "created", db_task)
             db.commit()
-            db.refresh(db_task)
-            imported_tasks.append(db_task)
+            imported_tasks.extend(batch)
+            if progress:
+                progress(len(imported_tasks), len(todoist_tasks))
         
         return imported_tasks
 
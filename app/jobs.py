@@ -0,0 +1,172 @@
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from . import config, schemas
+from .config import DEFAULT_USER_ID
+from .database import SessionLocal
+from .metrics import registry
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# fn(db, progress) -> JSON-serializable summary; progress(done, total=None)
+JobFunction = Callable[[Any, Callable[..., None]], Dict[str, Any]]
+
+
+class JobQueueFull(Exception):
+    """Raised when every worker is busy and the wait queue is full"""
+
+
+def dedup_key(kind: str, user_id: int, account: str) -> str:
+    """Identify the account a job works on without storing its credential"""
+    return hashlib.sha256(f"{kind}:{user_id}:{account}".encode()).hexdigest()
+
+
+class JobRunner:
+    """
+    Runs background jobs on a bounded thread pool, off the request path.
+
+    Jobs are persisted in the jobs table, so their progress can be read from
+    any worker process. A unique index on the dedup key of active jobs makes a
+    second request for the same account join the job that is already queued
+    or running, also across processes.
+    """
+
+    def __init__(self, session_factory=SessionLocal, workers: int = None, queue_size: int = None,
+                 stale_seconds: int = None):
+        self.session_factory = session_factory
+        self.workers = workers or config.JOB_WORKERS
+        self.queue_size = config.JOB_QUEUE_SIZE if queue_size is None else queue_size
+        self.stale_after = timedelta(seconds=stale_seconds or config.JOB_STALE_SECONDS)
+        self._executor = None
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active_count(self) -> int:
+        """Jobs of this process that are queued or running"""
+        return self._active
+
+    def _active_job(self, db, key: str):
+        job = db.query(Job).filter(Job.dedup_key == key, Job.status.in_(ACTIVE_STATUSES)).first()
+        if job is not None and job.updated_at < datetime.utcnow() - self.stale_after:
+            # Its process died before finishing; don't let it block new imports forever
+            job.status = "failed"
+            job.error = "Abandoned: no progress reported"
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            return None
+        return job
+
+    def submit(self, kind: str, account: str, fn: JobFunction,
+               user_id: int = DEFAULT_USER_ID) -> Tuple[schemas.JobResponse, bool]:
+        """Queue fn for the account unless a job for it is active; returns (job, joined)"""
+        key = dedup_key(kind, user_id, account)
+        db = self.session_factory()
+        try:
+            job = self._active_job(db, key)
+            if job is not None:
+                return schemas.JobResponse.model_validate(job), True
+            with self._lock:
+                if self._active >= self.workers + self.queue_size:
+                    raise JobQueueFull()
+                self._active += 1
+            try:
+                job = Job(user_id=user_id, kind=kind, dedup_key=key, status="queued")
+                db.add(job)
+                db.commit()
+            except IntegrityError:
+                # Another request or process queued the same account first
+                db.rollback()
+                with self._lock:
+                    self._active -= 1
+                job = self._active_job(db, key)
+                if job is None:
+                    raise
+                return schemas.JobResponse.model_validate(job), True
+            except Exception:
+                with self._lock:
+                    self._active -= 1
+                raise
+            response = schemas.JobResponse.model_validate(job)
+        finally:
+            db.close()
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._executor.submit(self._run, response.id, fn)
+        return response, False
+
+    def _update(self, db, job_id: int, **values):
+        db.query(Job).filter(Job.id == job_id).update(values, synchronize_session=False)
+        db.commit()
+
+    def _run(self, job_id: int, fn: JobFunction):
+        # Job bookkeeping and the job's own work use separate transactions
+        jobs_db = self.session_factory()
+        work_db = self.session_factory()
+        try:
+            self._update(jobs_db, job_id, status="running", started_at=datetime.utcnow())
+
+            def progress(done: int, total: int = None):
+                values = {"progress": done}
+                if total is not None:
+                    values["total"] = total
+                self._update(jobs_db, job_id, **values)
+
+            result = fn(work_db, progress)
+            self._update(jobs_db, job_id, status="succeeded", result=json.dumps(result),
+                         finished_at=datetime.utcnow())
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            work_db.rollback()
+            jobs_db.rollback()
+            self._update(jobs_db, job_id, status="failed", error=str(e)[:1000], finished_at=datetime.utcnow())
+        finally:
+            work_db.close()
+            jobs_db.close()
+            with self._lock:
+                self._active -= 1
+
+    def shutdown(self):
+        """Stop taking work; jobs still waiting are left queued and expire as abandoned"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def todoist_import(token: str, user_id: int) -> JobFunction:
+    def run(db, progress):
+        from .integrations.todoist import TodoistIntegration
+
+        imported = TodoistIntegration(token).import_tasks(db, user_id, progress=progress)
+        return {"imported": len(imported)}
+    return run
+
+
+def google_calendar_import(credentials: schemas.GoogleCalendarCredentials, user_id: int) -> JobFunction:
+    def run(db, progress):
+        from .integrations.google_calendar import GoogleCalendarIntegration
+
+        integration = GoogleCalendarIntegration()
+        integration.authenticate_with_tokens(credentials.access_token, credentials.refresh_token)
+        imported = integration.import_events_as_tasks(db, credentials.calendar_id, user_id, progress=progress)
+        return {"imported": len(imported)}
+    return run
+
+
+# Global instance for use throughout the application
+job_runner = JobRunner()
+
+registry.gauge("jobs_active", "Background jobs queued or running in this process", lambda: job_runner.active_count)
@@ -1,55 +1,263 @@
-from fastapi import FastAPI, Depends, HTTPException
-from typing import List
-import uvicorn
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Header, Query
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from typing import List, Optional
 from datetime import datetime, timedelta
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
-from .database import get_db
-from . import models, schemas, crud
+from .database import SessionLocal, get_db, engine, init_db
+from . import models, schemas, crud, config
+from . import notifications  # noqa: F401 - registers the notification counters before /metrics renders
+from .events import pomodoro_broadcaster, stream_task_events, task_event_broker
+from .integrations.google_client import google_clients
+from .jobs import JobQueueFull, google_calendar_import, job_runner, todoist_import
+from .metrics import MetricsMiddleware, register_app_gauges, registry
+from .query_stats import QueryStatsMiddleware, install_query_hooks
+from .serialization import FastJSONResponse, rows_to_dicts
+from .simulation import schedule_simulator, simulate_schedule
+from .task_cache import task_cache
+from .task_index import task_priority_index
+from .utils.dependency_graph import DependencyCycleError
+from .utils.pomodoro_timer import pomodoro_manager
 
-app = FastAPI(title="Smart Task Scheduler", description="An intelligent task scheduling system")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Explicit startup steps, kept out of module import"""
+    if config.INIT_DB_ON_STARTUP:
+        init_db()
+    if config.TASK_INDEX_PRELOAD:
+        db = SessionLocal()
+        try:
+            task_priority_index.rebuild(db)
+        finally:
+            db.close()
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    job_runner.shutdown()
+    schedule_simulator.shutdown()
+    google_clients.shutdown()
+
+app = FastAPI(title="Smart Task Scheduler", description="An intelligent task scheduling system", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+# Read-only cross-origin access, for EventSource clients such as the Pomodoro widget
+app.add_middleware(CORSMiddleware, allow_origins=config.CORS_ORIGINS, allow_methods=["GET"])
+register_app_gauges(engine)
+install_query_hooks(engine)
+
+def get_user_id(x_user_id: int = Header(default=config.DEFAULT_USER_ID)) -> int:
+    """Owner of the request; authentication is expected to happen upstream"""
+    return x_user_id
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Smart Task Scheduler API"}
 
+@app.get("/health", include_in_schema=False)
+def health(db: Session = Depends(get_db)):
+    """Readiness probe: startup has finished and the database answers"""
+    if not getattr(app.state, "ready", False):
+        raise HTTPException(status_code=503, detail="Starting")
+    try:
+        db.execute(text("SELECT 1"))
+    except Exception:
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    return {"status": "ok"}
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Expose request and process metrics in Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/tasks/", response_model=schemas.TaskResponse)
-def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
+def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
     """Create a new task"""
-    return crud.create_task(db=db, task=task)
+    return crud.create_task(db=db, task=task, user_id=user_id)
+
+@app.post("/tasks/bulk", response_model=schemas.TaskBulkResult)
+def bulk_task_action(bulk: schemas.TaskBulkAction, db: Session = Depends(get_db),
+                     user_id: int = Depends(get_user_id)):
+    """Update or delete many tasks in one request and one transaction"""
+    task_ids = list(dict.fromkeys(bulk.task_ids))
+    if not task_ids:
+        raise HTTPException(status_code=400, detail="No task ids given")
+    if len(task_ids) > config.BULK_MAX_TASKS:
+        raise HTTPException(status_code=400, detail=f"At most {config.BULK_MAX_TASKS} tasks per request")
+    
+    if bulk.action == "delete":
+        deleted = crud.bulk_delete_tasks(db, task_ids, user_id=user_id)
+        done = set(deleted)
+        return schemas.TaskBulkResult(deleted=deleted, not_found=[i for i in task_ids if i not in done])
+    if bulk.update is None:
+        raise HTTPException(status_code=400, detail="An update is required for action 'update'")
+    updated = crud.bulk_update_tasks(db, task_ids, bulk.update, user_id=user_id)
+    done = {row.id for row in updated}
+    return schemas.TaskBulkResult(
+        updated=[schemas.TaskResponse.model_validate(row) for row in updated],
+        not_found=[i for i in task_ids if i not in done]
+    )
 
 @app.get("/tasks/", response_model=List[schemas.TaskResponse])
-def read_tasks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_tasks(skip: int = 0, limit: int = 100, include_archived: bool = False,
+               db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
     """Get all tasks"""
-    tasks = crud.get_tasks(db, skip=skip, limit=limit)
+    if config.FAST_JSON_RESPONSES:
+        return FastJSONResponse(rows_to_dicts(crud.get_task_rows(db, skip=skip, limit=limit, user_id=user_id,
+                                                                 include_archived=include_archived)))
+    tasks = crud.get_tasks(db, skip=skip, limit=limit, user_id=user_id, include_archived=include_archived)
     return tasks
 
+@app.get("/tasks/range", response_model=schemas.TaskRange)
+def read_tasks_in_range(start: datetime, end: datetime, include_archived: bool = False,
+                        db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
+    """Get tasks due in a time range, including unsaved recurring occurrences"""
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if end - start > timedelta(days=366):
+        raise HTTPException(status_code=400, detail="Range is limited to 366 days")
+    tasks, occurrences = crud.get_tasks_in_range(db, start, end, user_id=user_id, include_archived=include_archived)
+    return schemas.TaskRange(start=start, end=end, tasks=tasks, occurrences=occurrences)
+
+@app.get("/tasks/critical-path", response_model=schemas.CriticalPath)
+def read_critical_path(db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
+    """Get the longest chain of unfinished dependent tasks"""
+    return crud.get_critical_path(db, user_id=user_id)
+
+@app.get("/events/tasks", response_model=schemas.TaskEventLog)
+def read_task_events(since: int = 0, limit: int = Query(500, ge=0, le=1000),
+                     db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
+    """Get task changes after an event id, for clients that poll"""
+    return crud.get_task_events(db, since=since, limit=limit, user_id=user_id)
+
+@app.get("/events/tasks/stream")
+async def stream_events(since: Optional[int] = None, last_event_id: Optional[int] = Header(default=None),
+                        user_id: int = Depends(get_user_id)):
+    """Stream task changes as Server-Sent Events, resuming after `since` or Last-Event-ID"""
+    if task_event_broker.full:
+        raise HTTPException(status_code=503, detail="Too many event streams, retry later")
+    resume_from = last_event_id if last_event_id is not None else since
+    return StreamingResponse(
+        stream_task_events(task_event_broker, user_id, resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/tasks/next", response_model=schemas.TaskResponse)
+def read_next_task(db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
+    """The open task to work on next, by Eisenhower quadrant, deadline and priority"""
+    task_id = task_priority_index.next_task_id(db, user_id)
+    if task_id is None:
+        raise HTTPException(status_code=404, detail="No open tasks")
+    payload = crud.get_task_payload(db, task_id=task_id, user_id=user_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return Response(payload, media_type="application/json")
+
 @app.get("/tasks/{task_id}", response_model=schemas.TaskResponse)
-def read_task(task_id: int, db: Session = Depends(get_db)):
+def read_task(task_id: int, include_archived: bool = False,
+              db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
     """Get a specific task"""
-    task = crud.get_task(db, task_id=task_id)
+    if task_cache.enabled:
+        payload = crud.get_task_payload(db, task_id=task_id, user_id=user_id)
+        if payload is not None:
+            return Response(payload, media_type="application/json")
+        if not include_archived:
+            raise HTTPException(status_code=404, detail="Task not found")
+    task = crud.get_task(db, task_id=task_id, user_id=user_id, include_archived=include_archived)
     if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     return task
 
 @app.put("/tasks/{task_id}", response_model=schemas.TaskResponse)
-def update_task(task_id: int, task_update: schemas.TaskUpdate, db: Session = Depends(get_db)):
+def update_task(task_id: int, task_update: schemas.TaskUpdate, db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
     """Update a specific task"""
-    updated_task = crud.update_task(db=db, task_id=task_id, task_update=task_update)
+    updated_task = crud.update_task(db=db, task_id=task_id, task_update=task_update, user_id=user_id)
+    if updated_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return updated_task
+
+@app.patch("/tasks/{task_id}", response_model=schemas.TaskResponse)
+def patch_task(task_id: int, task_patch: schemas.TaskPatch, db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
+    """Update some fields of a task, optionally only if it is still at the given version"""
+    try:
+        updated_task = crud.update_task(db=db, task_id=task_id, task_update=task_patch, user_id=user_id,
+                                        expected_version=task_patch.version)
+    except crud.TaskVersionConflict as e:
+        raise HTTPException(status_code=409, detail=f"Task was modified concurrently; current version is {e.current_version}")
     if updated_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     return updated_task
 
 @app.delete("/tasks/{task_id}")
-def delete_task(task_id: int, db: Session = Depends(get_db)):
+def delete_task(task_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
     """Delete a specific task"""
-    deleted = crud.delete_task(db=db, task_id=task_id)
+    deleted = crud.delete_task(db=db, task_id=task_id, user_id=user_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Task not found")
     return {"message": "Task deleted successfully"}
 
+@app.get("/tasks/{task_id}/dependencies", response_model=schemas.TaskDependencies)
+def read_task_dependencies(task_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
+    """Get the tasks a task depends on"""
+    if crud.get_task(db, task_id=task_id, user_id=user_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return schemas.TaskDependencies(task_id=task_id, depends_on=crud.get_task_dependencies(db, task_id, user_id=user_id))
+
+@app.post("/tasks/{task_id}/dependencies", response_model=schemas.TaskDependencies)
+def add_task_dependency(task_id: int, dependency: schemas.TaskDependencyCreate,
+                        db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
+    """Make a task wait until another task is done"""
+    try:
+        depends_on = crud.add_task_dependency(db, task_id, dependency.depends_on_id, user_id=user_id)
+    except DependencyCycleError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if depends_on is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return schemas.TaskDependencies(task_id=task_id, depends_on=depends_on)
+
+@app.delete("/tasks/{task_id}/dependencies/{depends_on_id}")
+def remove_task_dependency(task_id: int, depends_on_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
+    """Remove a dependency between two tasks"""
+    removed = crud.remove_task_dependency(db, task_id, depends_on_id, user_id=user_id)
+    if not removed:
+        raise HTTPException(status_code=404, detail="Dependency not found")
+    return {"message": "Dependency removed successfully"}
+
+@app.post("/recurring-tasks/", response_model=schemas.RecurringTaskResponse)
+def create_recurring_task(recurring_task: schemas.RecurringTaskCreate, db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
+    """Create a recurring task template"""
+    return crud.create_recurring_task(db=db, recurring_task=recurring_task, user_id=user_id)
+
+@app.get("/recurring-tasks/", response_model=List[schemas.RecurringTaskResponse])
+def read_recurring_tasks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
+    """Get all recurring task templates"""
+    return crud.get_recurring_tasks(db, skip=skip, limit=limit, user_id=user_id)
+
+@app.delete("/recurring-tasks/{recurring_task_id}")
+def delete_recurring_task(recurring_task_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
+    """Delete a recurring task template"""
+    deleted = crud.delete_recurring_task(db=db, recurring_task_id=recurring_task_id, user_id=user_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Recurring task not found")
+    return {"message": "Recurring task deleted successfully"}
+
+@app.put("/recurring-tasks/{recurring_task_id}/occurrences/{occurrence_start}", response_model=schemas.TaskResponse)
+def update_occurrence(recurring_task_id: int, occurrence_start: datetime, task_update: schemas.TaskUpdate,
+                      db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
+    """Start, complete or edit one occurrence, materializing it as a task"""
+    try:
+        task = crud.materialize_occurrence(db, recurring_task_id, occurrence_start, user_id=user_id)
+    except crud.OccurrenceArchived:
+        raise HTTPException(status_code=409, detail="Occurrence has been archived")
+    if task is None:
+        raise HTTPException(status_code=404, detail="Occurrence not found")
+    return crud.update_task(db=db, task_id=task.id, task_update=task_update, user_id=user_id)
+
 @app.get("/schedule/daily", response_model=schemas.DailySchedule)
-def get_daily_schedule(date: str = None, db: Session = Depends(get_db)):
+def get_daily_schedule(date: str = None, db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
     """Generate daily schedule based on Eisenhower matrix"""
     target_date = datetime.now().date()
     if date:
@@ -58,26 +266,114 @@ def get_daily_schedule(date: str = None, db: Session = Depends(get_db)):
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
-    return crud.generate_daily_schedule(db, target_date)
+    if config.FAST_JSON_RESPONSES:
+        return FastJSONResponse(crud.generate_daily_schedule_rows(db, target_date, user_id=user_id))
+    return crud.generate_daily_schedule(db, target_date, user_id=user_id)
+
+@app.post("/schedule/simulate", response_model=schemas.ScheduleSimulation)
+def simulate_daily_schedule(request: schemas.ScheduleSimulationRequest, db: Session = Depends(get_db),
+                            user_id: int = Depends(get_user_id)):
+    """Compare schedule scenarios for a day without changing any task"""
+    target_date = datetime.now().date()
+    if request.date:
+        try:
+            target_date = datetime.strptime(request.date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if not request.scenarios:
+        raise HTTPException(status_code=400, detail="At least one scenario is required")
+    if len(request.scenarios) > config.SIMULATION_MAX_SCENARIOS:
+        raise HTTPException(status_code=400,
+                            detail=f"At most {config.SIMULATION_MAX_SCENARIOS} scenarios per request")
+
+    scenarios = [scenario.model_dump() for scenario in request.scenarios]
+    return simulate_schedule(db, target_date, scenarios, user_id=user_id)
+
+@app.get("/analytics/timeseries", response_model=schemas.TimeSeries)
+def get_timeseries(bucket: str = "day", days: int = 30, metric: Optional[List[str]] = Query(None),
+                   include_archived: bool = False, db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
+    """Get task metrics per day or week as compact arrays"""
+    if bucket not in crud.TIMESERIES_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(crud.TIMESERIES_BUCKETS)}")
+    if not 1 <= days <= 366:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 366")
+    metrics = metric or list(crud.TIMESERIES_METRICS)
+    unknown = sorted(set(metrics) - set(crud.TIMESERIES_METRICS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown metric: {', '.join(unknown)}")
+    return crud.get_productivity_timeseries(db, bucket, days, metrics, user_id=user_id,
+                                            include_archived=include_archived)
+
+@app.get("/analytics/durations", response_model=List[schemas.DurationEstimateBucket])
+def get_duration_estimates(db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
+    """Get how actual durations compare to estimates, per source and priority"""
+    return crud.get_duration_estimates(db, user_id=user_id)
 
 @app.get("/analytics/productivity", response_model=schemas.ProductivityReport)
-def get_productivity_report(days: int = 7, db: Session = Depends(get_db)):
+def get_productivity_report(days: int = 7, include_archived: bool = False,
+                            db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
     """Get productivity analytics report"""
-    return crud.get_productivity_report(db, days)
-
-@app.post("/integrations/google-calendar/import")
-def import_from_google_calendar(credentials: schemas.GoogleCalendarCredentials, db: Session = Depends(get_db)):
-    """Import tasks from Google Calendar"""
-    # Implementation would connect to Google Calendar API
-    # This is a placeholder for now
-    return {"status": "import started", "credentials": credentials}
-
-@app.post("/integrations/todoist/import")
-def import_from_todoist(token: str, db: Session = Depends(get_db)):
-    """Import tasks from Todoist"""
-    # Implementation would connect to Todoist API
-    # This is a placeholder for now
-    return {"status": "import started", "token": token}
+    return crud.get_productivity_report(db, days, user_id=user_id, include_archived=include_archived)
+
+@app.get("/pomodoro", response_model=schemas.PomodoroTimer)
+def get_pomodoro():
+    """Get the Pomodoro timer state"""
+    return pomodoro_manager.get_status()
+
+@app.post("/pomodoro/{action}", response_model=schemas.PomodoroTimer)
+def control_pomodoro(action: str):
+    """Start, pause, stop or reset the Pomodoro timer"""
+    actions = {
+        "start": pomodoro_manager.start_timer,
+        "pause": pomodoro_manager.pause_timer,
+        "stop": pomodoro_manager.stop_timer,
+        "reset": pomodoro_manager.reset_timer,
+    }
+    if action not in actions:
+        raise HTTPException(status_code=404, detail=f"Unknown action, use one of {', '.join(actions)}")
+    actions[action]()
+    return pomodoro_manager.get_status()
+
+@app.get("/pomodoro/stream")
+async def stream_pomodoro():
+    """Stream Pomodoro state changes and periodic ticks as Server-Sent Events"""
+    if pomodoro_broadcaster.full:
+        raise HTTPException(status_code=503, detail="Too many event streams, retry later")
+    return StreamingResponse(
+        pomodoro_broadcaster.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _start_job(response: Response, kind: str, account: str, fn, user_id: int) -> schemas.JobResponse:
+    """Queue a background job (or join the running one) and point the client at its status"""
+    try:
+        job, _ = job_runner.submit(kind, account, fn, user_id=user_id)
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Too many imports in progress, retry later")
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job
+
+@app.post("/integrations/google-calendar/import", status_code=202, response_model=schemas.JobResponse)
+def import_from_google_calendar(credentials: schemas.GoogleCalendarCredentials, response: Response,
+                                user_id: int = Depends(get_user_id)):
+    """Import tasks from Google Calendar in the background"""
+    return _start_job(response, "google_calendar_import", f"{credentials.refresh_token}:{credentials.calendar_id}",
+                      google_calendar_import(credentials, user_id), user_id)
+
+@app.post("/integrations/todoist/import", status_code=202, response_model=schemas.JobResponse)
+def import_from_todoist(token: str, response: Response, user_id: int = Depends(get_user_id)):
+    """Import tasks from Todoist in the background"""
+    return _start_job(response, "todoist_import", token, todoist_import(token, user_id), user_id)
+
+@app.get("/jobs/{job_id}", response_model=schemas.JobResponse)
+def read_job(job_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_user_id)):
+    """Get the status and progress of a background job"""
+    job = crud.get_job(db, job_id=job_id, user_id=user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
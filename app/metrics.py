@@ -0,0 +1,257 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Tuple
+
+# Latency buckets in seconds and payload buckets in bytes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labelvalues, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}"
+
+
+class Histogram:
+    """Fixed-bucket histogram; buckets are made cumulative only when rendered"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labelvalues -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labelvalues, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {_format_value(series[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Gauge:
+    """Gauge set directly or read from a callback at scrape time"""
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float] = None):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float):
+        self._value = value
+
+    def value(self) -> float:
+        if self.callback is not None:
+            return self.callback()
+        return self._value
+
+    def collect(self):
+        try:
+            value = self.value()
+        except Exception:
+            # A broken callback must not take the whole scrape down
+            return
+        if value is None:
+            return
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """Holds all metrics of the process and renders the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, callback: Callable[[], float] = None) -> Gauge:
+        return self._register(Gauge(name, documentation, callback))
+
+    def render(self) -> str:
+        lines = []
+        # Snapshot: a gauge callback may import a module that registers metrics
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry for use throughout the application
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP requests by route and status code", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency in seconds", ("method", "route")
+)
+http_response_size_bytes = registry.histogram(
+    "http_response_size_bytes", "HTTP response body size in bytes", ("method", "route"), SIZE_BUCKETS
+)
+http_request_size_bytes = registry.histogram(
+    "http_request_size_bytes", "HTTP request body size in bytes", ("method", "route"), SIZE_BUCKETS
+)
+http_requests_in_progress = registry.gauge(
+    "http_requests_in_progress", "HTTP requests currently being served"
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and payload size per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        response_size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        started = time.perf_counter()
+        http_requests_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_progress.dec()
+
+            # Label by route template so /tasks/1 and /tasks/2 share a series
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            request_size = 0
+            for name, value in scope.get("headers", ()):
+                if name == b"content-length":
+                    request_size = int(value or 0)
+                    break
+
+            http_requests_total.inc(method, path, str(status_code))
+            http_request_duration_seconds.observe(elapsed, method, path)
+            http_response_size_bytes.observe(response_size, method, path)
+            http_request_size_bytes.observe(request_size, method, path)
+
+
+def register_app_gauges(engine):
+    """Register gauges for the DB pool, the Pomodoro timer and notifications"""
+    pool = engine.pool
+
+    registry.gauge(
+        "db_pool_checked_out", "Database connections currently checked out",
+        lambda: pool.checkedout() if hasattr(pool, "checkedout") else None
+    )
+    registry.gauge(
+        "db_pool_size", "Configured database connection pool size",
+        lambda: pool.size() if hasattr(pool, "size") else None
+    )
+
+    def pomodoro_status():
+        from .utils.pomodoro_timer import pomodoro_manager
+        return pomodoro_manager.get_status()
+
+    registry.gauge(
+        "pomodoro_timer_active", "Whether the Pomodoro timer is running",
+        lambda: int(pomodoro_status().is_active)
+    )
+    registry.gauge(
+        "pomodoro_remaining_seconds", "Seconds left in the current Pomodoro session",
+        lambda: pomodoro_status().remaining_time
+    )
+
+    def notification_queue_depth():
+        from .notifications import pending_notification_count
+        return pending_notification_count()
+
+    registry.gauge(
+        "notification_queue_depth", "Notifications queued or being sent",
+        notification_queue_depth
+    )
@@ -1 +1 @@
-from .database import Task, Base
\ No newline at end of file
+from .database import Task, TaskArchive, RecurringTask, PomodoroState, PlannerCheckpoint, TaskDependency, TaskEvent, Job, Base
\ No newline at end of file
@@ -1,15 +1,198 @@
 import asyncio
-from typing import Optional
-from telegram import Bot
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
 from datetime import datetime
+from . import config
+from .metrics import registry
 from .models import Task
 
+# Notifications queued on the event loop or currently being sent
+_pending_lock = threading.Lock()
+_pending_count = 0
+
+def _adjust_pending(delta: int):
+    global _pending_count
+    with _pending_lock:
+        _pending_count += delta
+
+def pending_notification_count() -> int:
+    """Number of notifications queued or in flight"""
+    return _pending_count
+
+notifications_dropped_total = registry.counter(
+    "notifications_dropped_total",
+    "Queued task notifications not sent: superseded by a newer one or the task was finished", ("reason",)
+)
+notification_messages_total = registry.counter(
+    "notification_messages_total", "Messages handed to a channel after coalescing", ("channel",)
+)
+
+# Longest message each channel accepts; longer digests are split
+MAX_MESSAGE_LENGTH = {"telegram": 4096, "slack": 40000}
+# A reminder for a task in one of these states is no longer worth sending
+FINISHED_STATUSES = ("completed", "cancelled")
+
+class TaskNotification(NamedTuple):
+    """A task notification waiting to be sent; rendered when its batch is flushed"""
+    kind: str  # "upcoming" or "reminder"
+    task_id: int
+    title: str
+    priority: int
+    deadline: Optional[datetime]
+    scheduled_start: Optional[datetime] = None
+
+    @classmethod
+    def from_task(cls, kind: str, task: Task) -> "TaskNotification":
+        return cls(kind, task.id, task.title, task.priority, task.deadline, task.scheduled_start)
+
+def render_notification(notification: TaskNotification, now: datetime) -> str:
+    """The standalone message of one notification"""
+    if notification.kind == "upcoming":
+        minutes_to_start = int((notification.scheduled_start - now).total_seconds() / 60)
+        message = f"⏰ Upcoming Task: {notification.title}\n"
+        message += f"Starts in: {minutes_to_start} minutes\n"
+    else:
+        message = f"🔔 Reminder: It's time to work on '{notification.title}'\n"
+    message += f"Priority: {notification.priority}/5\n"
+    if notification.deadline:
+        message += f"Deadline: {notification.deadline.strftime('%Y-%m-%d %H:%M')}"
+    return message
+
+def _digest_line(notification: TaskNotification, now: datetime) -> str:
+    if notification.kind == "upcoming":
+        minutes_to_start = int((notification.scheduled_start - now).total_seconds() / 60)
+        line = f"⏰ {notification.title} - starts in {minutes_to_start} min"
+    else:
+        line = f"🔔 {notification.title}"
+    line += f", priority {notification.priority}/5"
+    if notification.deadline:
+        line += f", due {notification.deadline.strftime('%Y-%m-%d %H:%M')}"
+    return line
+
+def render_digest(notifications: List[TaskNotification], now: datetime, max_length: int) -> List[str]:
+    """One message for a single notification, else a digest split into messages of at most max_length"""
+    if len(notifications) == 1:
+        return [render_notification(notifications[0], now)]
+    # Upcoming tasks first, soonest start first; reminders after in arrival order
+    upcoming = sorted((n for n in notifications if n.kind == "upcoming"), key=lambda n: n.scheduled_start)
+    lines = [_digest_line(n, now) for n in upcoming + [n for n in notifications if n.kind != "upcoming"]]
+    messages = []
+    current = f"📋 {len(notifications)} task notifications"
+    for line in lines:
+        if len(current) + 1 + len(line) > max_length:
+            messages.append(current)
+            current = line[:max_length]
+        else:
+            current += "\n" + line
+    messages.append(current)
+    return messages
+
+def load_task_states(task_ids: Iterable[int]) -> Dict[int, str]:
+    """Current status of the given tasks; deleted tasks are missing"""
+    from sqlalchemy import select
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return dict(db.execute(select(Task.id, Task.status).where(Task.id.in_(list(task_ids)))).all())
+    finally:
+        db.close()
+
+# (channel, address), e.g. ("slack", "#general")
+Recipient = Tuple[str, str]
+
+class NotificationCoalescer:
+    """
+    Holds task notifications per recipient for `window` seconds after the
+    first one arrives, then hands the whole batch to `deliver` at once.
+    A newer notification of the same kind about a task replaces the queued
+    one (an upcoming notice and a reminder are both kept), and tasks
+    that were finished or deleted meanwhile are dropped at flush time.
+    """
+
+    def __init__(self, window: float, deliver: Callable[[Recipient, List[TaskNotification], object], None],
+                 task_states: Callable[[Iterable[int]], Dict[int, str]] = load_task_states):
+        self.window = window
+        self.deliver = deliver
+        self.task_states = task_states
+        # recipient -> ((task id, kind) -> notification, event loop of the first caller, flush timer)
+        self._batches: Dict[Recipient, Tuple["OrderedDict[Tuple[int, str], TaskNotification]", object,
+                                             threading.Timer]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, recipient: Recipient, notification: TaskNotification):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        with self._lock:
+            batch = self._batches.get(recipient)
+            if batch is None:
+                timer = threading.Timer(self.window, self.flush, (recipient,))
+                timer.daemon = True
+                batch = self._batches[recipient] = (OrderedDict(), loop, timer)
+                timer.start()
+            pending = batch[0]
+            key = (notification.task_id, notification.kind)
+            if key in pending:
+                del pending[key]  # the newer one takes its place at the end
+                notifications_dropped_total.inc("superseded")
+            else:
+                _adjust_pending(1)
+            pending[key] = notification
+
+    def discard(self, task_id: int):
+        """Drop queued notifications about a task, e.g. one that was just completed"""
+        with self._lock:
+            for pending, _, _ in self._batches.values():
+                for key in [key for key in pending if key[0] == task_id]:
+                    del pending[key]
+                    _adjust_pending(-1)
+                    notifications_dropped_total.inc("finished")
+
+    def flush(self, recipient: Recipient = None):
+        """Send the batch of a recipient (all batches by default) now"""
+        with self._lock:
+            recipients = [recipient] if recipient is not None else list(self._batches)
+            batches = [(r, self._batches.pop(r)) for r in recipients if r in self._batches]
+        for recipient, (pending, loop, timer) in batches:
+            timer.cancel()
+            notifications = list(pending.values())
+            _adjust_pending(-len(notifications))
+            if not notifications:
+                continue
+            try:
+                states = self.task_states(n.task_id for n in notifications)
+            except Exception as e:
+                # Better a stale reminder than none at all
+                print(f"Failed to check task states, sending all notifications: {e}")
+                states = None
+            if states is not None:
+                current = [n for n in notifications if states.get(n.task_id) not in FINISHED_STATUSES + (None,)]
+                if len(current) < len(notifications):
+                    notifications_dropped_total.inc("finished", amount=len(notifications) - len(current))
+                notifications = current
+            if notifications:
+                self.deliver(recipient, notifications, loop)
+
 class NotificationService:
-    def __init__(self, telegram_token: Optional[str] = None, slack_token: Optional[str] = None):
-        self.telegram_bot = Bot(token=telegram_token) if telegram_token else None
-        self.slack_client = WebClient(token=slack_token) if slack_token else None
+    def __init__(self, telegram_token: Optional[str] = None, slack_token: Optional[str] = None,
+                 coalesce_window: float = None, task_states: Callable[[Iterable[int]], Dict[int, str]] = None):
+        # Client libraries are imported only when the channel is configured
+        self.telegram_bot = None
+        self.slack_client = None
+        if telegram_token:
+            from telegram import Bot
+            self.telegram_bot = Bot(token=telegram_token)
+        if slack_token:
+            from slack_sdk import WebClient
+            self.slack_client = WebClient(token=slack_token)
+        # Task notifications are batched into digests unless the window is 0
+        window = config.NOTIFICATION_COALESCE_SECONDS if coalesce_window is None else coalesce_window
+        self.coalescer = None
+        if window > 0:
+            self.coalescer = NotificationCoalescer(window, self._deliver_digest, task_states or load_task_states)
 
     async def send_telegram_notification(self, chat_id: str, message: str):
         """Send notification via Telegram"""
@@ -29,62 +212,75 @@ class NotificationService:
             print("Slack client not configured")
             return
         
+        from slack_sdk.errors import SlackApiError
+        
+        _adjust_pending(1)
         try:
             response = self.slack_client.chat_postMessage(channel=channel, text=message)
             print(f"Slack notification sent to {channel}")
         except SlackApiError as e:
             print(f"Failed to send Slack notification: {e.response['error']}")
+        finally:
+            _adjust_pending(-1)
+
+    def _queue_telegram_notification(self, chat_id: str, message: str):
+        """Schedule a Telegram notification on the running event loop"""
+        _adjust_pending(1)
+        task = asyncio.create_task(self.send_telegram_notification(chat_id=chat_id, message=message))
+        task.add_done_callback(lambda _: _adjust_pending(-1))
+
+    def _deliver_digest(self, recipient: Recipient, notifications: List[TaskNotification], loop):
+        """Send a flushed batch; runs on the coalescer's timer thread"""
+        channel, address = recipient
+        for message in render_digest(notifications, datetime.now(), MAX_MESSAGE_LENGTH[channel]):
+            notification_messages_total.inc(channel)
+            if channel == "slack":
+                self.send_slack_notification(channel=address, message=message)
+            elif loop is not None:
+                # The Telegram client belongs to the event loop the notification came from
+                loop.call_soon_threadsafe(self._queue_telegram_notification, address, message)
+            else:
+                asyncio.run(self.send_telegram_notification(chat_id=address, message=message))
+
+    def _notify(self, notification: TaskNotification, user_preferences: dict):
+        """Send or queue a task notification based on user preferences"""
+        recipients = []
+        if user_preferences.get('telegram_chat_id'):
+            recipients.append(("telegram", user_preferences['telegram_chat_id']))
+        if user_preferences.get('slack_channel'):
+            recipients.append(("slack", user_preferences['slack_channel']))
+        
+        for recipient in recipients:
+            if self.coalescer is not None:
+                self.coalescer.add(recipient, notification)
+                continue
+            channel, address = recipient
+            message = render_notification(notification, datetime.now())
+            notification_messages_total.inc(channel)
+            if channel == "telegram":
+                self._queue_telegram_notification(chat_id=address, message=message)
+            else:
+                self.send_slack_notification(channel=address, message=message)
 
     def notify_upcoming_task(self, task: Task, user_preferences: dict):
         """Notify user about upcoming task"""
         if not task.scheduled_start:
             return
-        
-        time_to_start = task.scheduled_start - datetime.now()
-        minutes_to_start = int(time_to_start.total_seconds() / 60)
-        
-        message = f"⏰ Upcoming Task: {task.title}\n"
-        message += f"Starts in: {minutes_to_start} minutes\n"
-        message += f"Priority: {task.priority}/5\n"
-        if task.deadline:
-            message += f"Deadline: {task.deadline.strftime('%Y-%m-%d %H:%M')}"
-        
-        # Send notifications based on user preferences
-        if user_preferences.get('telegram_chat_id'):
-            asyncio.create_task(
-                self.send_telegram_notification(
-                    chat_id=user_preferences['telegram_chat_id'],
-                    message=message
-                )
-            )
-        
-        if user_preferences.get('slack_channel'):
-            self.send_slack_notification(
-                channel=user_preferences['slack_channel'],
-                message=message
-            )
+        self._notify(TaskNotification.from_task("upcoming", task), user_preferences)
 
     def notify_task_reminder(self, task: Task, user_preferences: dict):
         """Send reminder for a task"""
-        message = f"🔔 Reminder: It's time to work on '{task.title}'\n"
-        message += f"Priority: {task.priority}/5\n"
-        if task.deadline:
-            message += f"Deadline: {task.deadline.strftime('%Y-%m-%d %H:%M')}"
-        
-        # Send notifications based on user preferences
-        if user_preferences.get('telegram_chat_id'):
-            asyncio.create_task(
-                self.send_telegram_notification(
-                    chat_id=user_preferences['telegram_chat_id'],
-                    message=message
-                )
-            )
-        
-        if user_preferences.get('slack_channel'):
-            self.send_slack_notification(
-                channel=user_preferences['slack_channel'],
-                message=message
-            )
+        self._notify(TaskNotification.from_task("reminder", task), user_preferences)
+
+    def cancel_task_notifications(self, task_id: int):
+        """Don't send queued notifications about a task, e.g. after it was completed"""
+        if self.coalescer is not None:
+            self.coalescer.discard(task_id)
+
+    def flush(self):
+        """Send all queued digests now, e.g. before shutting down"""
+        if self.coalescer is not None:
+            self.coalescer.flush()
 
     def notify_pomodoro_session_change(self, is_work_session: bool, user_preferences: dict):
         """Notify user about Pomodoro session change"""
@@ -95,11 +291,9 @@ class NotificationService:
         
         # Send notifications based on user preferences
         if user_preferences.get('telegram_chat_id'):
-            asyncio.create_task(
-                self.send_telegram_notification(
-                    chat_id=user_preferences['telegram_chat_id'],
-                    message=message
-                )
+            self._queue_telegram_notification(
+                chat_id=user_preferences['telegram_chat_id'],
+                message=message
             )
         
         if user_preferences.get('slack_channel'):
@@ -0,0 +1,219 @@
+"""
+Nightly batch planner.
+
+Computes the daily schedule of every user with tasks due on a date and writes
+the placements back to tasks.scheduled_start / scheduled_end.
+
+Usage: python -m app.planner [--date YYYY-MM-DD] [--workers N] [--partition-size N] [--restart]
+
+Users are split into partitions that run in a process pool. Each partition
+reads its tasks and their dependencies in one query each, runs the scheduler
+and, in a single transaction, writes the changed placements with one
+executemany UPDATE that also bumps each task's version, a task event per
+changed task, and its checkpoint rows. Tasks edited or finished while their
+partition is planned keep their state and are skipped. A rerun skips users
+that already have a checkpoint for the date, so an interrupted run resumes
+where it stopped.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import bindparam, create_engine, delete, or_, select, update
+from sqlalchemy.orm import sessionmaker
+
+from . import config
+from .crud import (DAILY_SCHEDULE_ORDER, daily_schedule_conditions, get_blocking_dependencies,
+                   get_recurring_occurrences, learned_durations, load_task_records, record_task_events)
+from .database import SessionLocal, init_db
+from .models import PlannerCheckpoint, Task
+from .serialization import TASK_RESPONSE_FIELDS
+from .task_index import OPEN_STATUSES
+from .utils.duration_estimator import duration_estimator
+from .utils.scheduler import merge_occurrences, plan_daily_schedule
+
+logger = logging.getLogger(__name__)
+
+# Session factory of a pool worker process, created by _init_worker
+_worker_sessions = None
+
+
+def _init_worker(database_url: str):
+    """Give each worker process its own engine instead of a forked pool"""
+    global _worker_sessions
+    connect_args = {"check_same_thread": False, "timeout": 30} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, connect_args=connect_args)
+    _worker_sessions = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def pending_users(db, target_date) -> List[int]:
+    """Users with tasks due on the date that have not been planned yet"""
+    planned = select(PlannerCheckpoint.user_id).where(
+        PlannerCheckpoint.plan_date == target_date.isoformat()
+    )
+    return db.execute(
+        select(Task.user_id).distinct()
+        .where(daily_schedule_conditions(target_date), Task.user_id.not_in(planned))
+        .order_by(Task.user_id)
+    ).scalars().all()
+
+
+def plan_partition(db, target_date, user_ids: List[int]) -> Tuple[int, int]:
+    """Schedule and persist one partition of users; returns (users, tasks placed)"""
+    partition = (Task.user_id.in_(user_ids), daily_schedule_conditions(target_date))
+    # Read before the tasks themselves: a task edited after this point fails
+    # the version check below instead of being overwritten
+    stored = {
+        task_id: (start_time, end_time, version)
+        for task_id, start_time, end_time, version in db.execute(
+            select(Task.id, Task.scheduled_start, Task.scheduled_end, Task.version).where(*partition)
+        )
+    }
+    records = load_task_records(
+        db, Task.user_id.in_(user_ids), daily_schedule_conditions(target_date),
+        order_by=(Task.user_id, *DAILY_SCHEDULE_ORDER)
+    )
+    tasks_by_user = defaultdict(list)
+    for record in records:
+        tasks_by_user[record.user_id].append(record)
+
+    # Unsaved recurring occurrences take up time but have no row to update
+    occurrences = get_recurring_occurrences(
+        db, datetime.combine(target_date, datetime.min.time()),
+        datetime.combine(target_date, datetime.max.time()), user_ids
+    )
+
+    blocked_by = get_blocking_dependencies(db, user_ids)
+    duration_estimator.load(db, user_ids)  # one history query for the whole partition
+
+    placements = {}
+    for user_id, user_tasks in tasks_by_user.items():
+        slots = plan_daily_schedule(merge_occurrences(user_tasks, occurrences.get(user_id, [])), target_date,
+                                    blocked_by.get(user_id), learned_durations(db, user_id))
+        placed = {task.id: (start_time, end_time) for task, start_time, end_time, _ in slots if task.id is not None}
+        for task in user_tasks:
+            # Tasks that no longer fit lose any placement from an earlier run
+            placements[task.id] = placed.get(task.id, (None, None))
+
+    # Only rows whose placement changes get a new version and a task event
+    changes = [
+        {"task_id": task_id, "new_start": placement[0], "new_end": placement[1],
+         "old_version": stored[task_id][2]}
+        for task_id, placement in placements.items()
+        if task_id in stored and placement != stored[task_id][:2]
+    ]
+
+    now = datetime.utcnow()
+    skipped = set()
+    try:
+        if changes:
+            # Like PATCH with a version: tasks edited, completed or cancelled
+            # since they were read keep their state and are skipped
+            db.connection().execute(
+                update(Task).where(
+                    Task.id == bindparam("task_id"), Task.version == bindparam("old_version"),
+                    or_(*(Task.status == status for status in OPEN_STATUSES)),  # no IN: executemany
+                ).values(
+                    scheduled_start=bindparam("new_start"), scheduled_end=bindparam("new_end"),
+                    updated_at=now, version=Task.version + 1,
+                ),
+                changes,
+            )
+            expected = {change["task_id"]: (change["new_start"], change["new_end"], change["old_version"] + 1)
+                        for change in changes}
+            columns = [getattr(Task, field) for field in TASK_RESPONSE_FIELDS]
+            updated = [
+                row for row in db.execute(select(*columns).where(*partition))
+                if expected.get(row.id) == (row.scheduled_start, row.scheduled_end, row.version)
+            ]
+            record_task_events(db, "updated", updated)
+            skipped = set(expected) - {row.id for row in updated}
+        db.add_all([
+            PlannerCheckpoint(plan_date=target_date.isoformat(), user_id=user_id, planned_at=now)
+            for user_id in user_ids
+        ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if skipped:
+        logger.warning("Skipped %d tasks changed while planning %s: %s",
+                       len(skipped), target_date.isoformat(), sorted(skipped))
+    return len(user_ids), sum(1 for task_id, (start_time, _) in placements.items()
+                              if start_time is not None and task_id not in skipped)
+
+
+def _run_partition(target_date, user_ids: List[int]) -> Tuple[int, int]:
+    db = _worker_sessions()
+    try:
+        return plan_partition(db, target_date, user_ids)
+    finally:
+        db.close()
+
+
+def run_planner(target_date, workers: int = None, partition_size: int = 500, restart: bool = False,
+                progress=print) -> Tuple[int, int]:
+    """Plan all pending users for the date; returns (users planned, tasks placed)"""
+    init_db()
+    db = SessionLocal()
+    try:
+        if restart:
+            db.execute(delete(PlannerCheckpoint).where(PlannerCheckpoint.plan_date == target_date.isoformat()))
+            db.commit()
+        user_ids = pending_users(db, target_date)
+    finally:
+        db.close()
+
+    if not user_ids:
+        progress(f"Nothing to plan for {target_date.isoformat()}")
+        return 0, 0
+
+    partitions = [user_ids[i:i + partition_size] for i in range(0, len(user_ids), partition_size)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(partitions)))
+    progress(f"Planning {len(user_ids)} users for {target_date.isoformat()} "
+             f"in {len(partitions)} partitions on {workers} workers")
+
+    started = time.perf_counter()
+    users_done = tasks_placed = partitions_done = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(config.DATABASE_URL,)) as pool:
+        futures = [pool.submit(_run_partition, target_date, partition) for partition in partitions]
+        for future in as_completed(futures):
+            users, placed = future.result()
+            users_done += users
+            tasks_placed += placed
+            partitions_done += 1
+            progress(f"[{partitions_done}/{len(partitions)}] {users_done}/{len(user_ids)} users, "
+                     f"{tasks_placed} tasks placed, {time.perf_counter() - started:.1f}s")
+
+    return users_done, tasks_placed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Persist daily schedules for all users")
+    parser.add_argument("--date", default=None, help="Day to plan (YYYY-MM-DD), defaults to today")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, defaults to the CPU count")
+    parser.add_argument("--partition-size", type=int, default=500, help="Users per partition")
+    parser.add_argument("--restart", action="store_true", help="Ignore checkpoints and plan every user again")
+    args = parser.parse_args(argv)
+
+    target_date = datetime.now().date()
+    if args.date:
+        try:
+            target_date = datetime.strptime(args.date, "%Y-%m-%d").date()
+        except ValueError:
+            parser.error("Invalid date format. Use YYYY-MM-DD")
+
+    run_planner(target_date, args.workers, args.partition_size, args.restart)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import contextvars
+import logging
+import re
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from sqlalchemy import event
+
+from . import config
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Collapse "IN (?, ?, ?)" lists so different list lengths share one shape
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request", ("method", "route"),
+    (1, 2, 3, 5, 10, 20, 50, 100)
+)
+db_time_per_request_seconds = registry.histogram(
+    "db_time_per_request_seconds", "Time spent in SQL statements per HTTP request", ("method", "route")
+)
+db_slow_queries_total = registry.counter(
+    "db_slow_queries_total", "SQL statements slower than the slow query threshold"
+)
+db_repeated_statements_total = registry.counter(
+    "db_repeated_statements_total", "Requests that repeated an identical statement shape", ("method", "route")
+)
+
+
+class QueryStats:
+    """SQL statements executed within one request (or one tracked block)"""
+    __slots__ = ("count", "total_time", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Dict[str, int] = {}
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        shape = statement_shape(statement)
+        self.shapes[shape] = self.shapes.get(shape, 0) + 1
+
+    def repeated(self, threshold: int = None) -> Dict[str, int]:
+        """Statement shapes executed at least `threshold` times"""
+        threshold = threshold or config.REPEATED_QUERY_THRESHOLD
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+
+_current_stats: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("query_stats", default=None)
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a SQL statement so repeated executions compare equal"""
+    return _IN_LIST.sub("(?...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def parameter_shape(parameters, executemany: bool = False) -> str:
+    """Describe bound parameters by type only, never by value"""
+    if executemany and parameters:
+        return f"{len(parameters)} x {parameter_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def stop_tracking():
+    """Detach the current context (e.g. a background task) from request statistics"""
+    _current_stats.set(None)
+
+
+@contextmanager
+def track_queries():
+    """Collect QueryStats for all statements executed inside the block"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def install_query_hooks(engine):
+    """Attach statement timing hooks to the engine (idempotent)"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+    if elapsed * 1000 >= config.SLOW_QUERY_THRESHOLD_MS:
+        db_slow_queries_total.inc()
+        logger.warning(
+            "Slow query (%.1f ms): %s params=%s",
+            elapsed * 1000, statement_shape(statement), parameter_shape(parameters, executemany)
+        )
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware collecting per-request SQL statistics"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and config.DEBUG:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.total_time * 1000:.2f}".encode()))
+                headers.append((b"x-db-repeated-statements", str(len(stats.repeated())).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            method = scope["method"]
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            db_queries_per_request.observe(stats.count, method, route)
+            db_time_per_request_seconds.observe(stats.total_time, method, route)
+
+            repeated = stats.repeated()
+            if repeated:
+                db_repeated_statements_total.inc(method, route)
+                for shape, count in repeated.items():
+                    logger.warning("Possible N+1 on %s %s: %d x %s", method, route, count, shape)
@@ -1,7 +1,9 @@
-from pydantic import BaseModel
+import json
+from pydantic import BaseModel, field_validator
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Union
 from enum import Enum
+from .utils.recurrence import parse_rrule
 
 class TaskStatus(str, Enum):
     PENDING = "pending"
@@ -41,6 +43,7 @@ class TaskUpdate(BaseModel):
     important: Optional[bool] = None
     status: Optional[TaskStatus] = None
     estimated_duration: Optional[int] = None
+    actual_duration: Optional[int] = None  # in minutes, reported when completing
 
     class Config:
         from_attributes = True
@@ -48,8 +51,30 @@ class TaskUpdate(BaseModel):
             datetime: lambda v: v.isoformat()
         }
 
+class TaskPatch(TaskUpdate):
+    version: Optional[int] = None  # expected current version; omit to update unconditionally
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
+class TaskBulkAction(BaseModel):
+    task_ids: List[int]
+    action: str  # "update" or "delete"
+    update: Optional[TaskUpdate] = None  # fields to set on every task when action is "update"
+
+    @field_validator("action")
+    @classmethod
+    def validate_action(cls, value: str) -> str:
+        if value not in ("update", "delete"):
+            raise ValueError("action must be 'update' or 'delete'")
+        return value
+
 class TaskResponse(TaskBase):
     id: int
+    user_id: int
     status: TaskStatus
     actual_duration: Optional[int] = None
     scheduled_start: Optional[datetime] = None
@@ -57,6 +82,20 @@ class TaskResponse(TaskBase):
     completed_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
+    recurring_task_id: Optional[int] = None
+    occurrence_start: Optional[datetime] = None
+    version: int = 1  # send it back in a PATCH to detect concurrent changes
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
+class TaskBulkResult(BaseModel):
+    updated: List[TaskResponse] = []
+    deleted: List[int] = []
+    not_found: List[int] = []  # requested ids that don't exist or belong to another user
 
     class Config:
         from_attributes = True
@@ -65,11 +104,13 @@ class TaskResponse(TaskBase):
         }
 
 class DailyScheduleItem(BaseModel):
-    task_id: int
+    task_id: Optional[int] = None  # None for occurrences that aren't materialized yet
     title: str
     start_time: datetime
     end_time: datetime
     duration: int  # in minutes
+    recurring_task_id: Optional[int] = None
+    occurrence_start: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -87,6 +128,212 @@ class DailySchedule(BaseModel):
             datetime: lambda v: v.isoformat()
         }
 
+class ScheduleScenario(BaseModel):
+    name: Optional[str] = None
+    start_hour: int = 9  # first slot starts at this hour
+    end_hour: int = 18  # slots may run until end_hour:59
+    break_minutes: int = 5  # between consecutive tasks
+    defer_task_ids: List[int] = []  # left out of this scenario's day
+
+    @field_validator("start_hour", "end_hour")
+    @classmethod
+    def validate_hour(cls, value: int) -> int:
+        if not 0 <= value <= 23:
+            raise ValueError("Hours must be between 0 and 23")
+        return value
+
+    @field_validator("end_hour")
+    @classmethod
+    def validate_window(cls, value: int, info) -> int:
+        if value < info.data.get("start_hour", 0):
+            raise ValueError("end_hour must not be before start_hour")
+        return value
+
+    @field_validator("break_minutes")
+    @classmethod
+    def validate_break(cls, value: int) -> int:
+        if not 0 <= value <= 240:
+            raise ValueError("break_minutes must be between 0 and 240")
+        return value
+
+class ScheduleSimulationRequest(BaseModel):
+    date: Optional[str] = None  # YYYY-MM-DD, defaults to today
+    scenarios: List[ScheduleScenario]
+
+class ScenarioResult(BaseModel):
+    name: Optional[str] = None
+    scheduled_tasks: int
+    scheduled_minutes: int
+    priority_weight: int  # sum of the priorities of scheduled tasks
+    priority_coverage: float  # share of the day's total priority weight that got scheduled
+    overflow_tasks: int  # not scheduled: out of time, or waiting on a deferred task
+    overflow_task_ids: List[int]  # the ones with a task row
+    deferred_tasks: int
+    finishes_at: Optional[datetime] = None  # end of the last slot
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
+class ScheduleSimulation(BaseModel):
+    date: str
+    tasks: int  # pending tasks and occurrences due that day
+    scenarios: List[ScenarioResult]
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
+class RecurringTaskCreate(BaseModel):
+    title: str
+    description: Optional[str] = None
+    priority: int = 3  # 1-5 scale
+    important: bool = False
+    estimated_duration: int = 30  # in minutes
+    source: str = "manual"
+    rrule: str  # e.g. FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10
+    dtstart: datetime
+
+    @field_validator("rrule")
+    @classmethod
+    def validate_rrule(cls, value: str) -> str:
+        parse_rrule(value)
+        return value.strip().upper()
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
+class RecurringTaskResponse(RecurringTaskCreate):
+    id: int
+    user_id: int
+    until: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
+class TaskOccurrence(BaseModel):
+    recurring_task_id: int
+    occurrence_start: datetime
+    title: str
+    description: Optional[str] = None
+    deadline: datetime
+    priority: int
+    urgent: bool
+    important: bool
+    estimated_duration: int
+    source: str
+    status: TaskStatus = TaskStatus.PENDING
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
+class TaskRange(BaseModel):
+    start: datetime
+    end: datetime
+    tasks: List[TaskResponse]
+    occurrences: List[TaskOccurrence]  # Recurring occurrences without a task row
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
+class TaskDependencyCreate(BaseModel):
+    depends_on_id: int  # The task that has to be done first
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
+class TaskDependencies(BaseModel):
+    task_id: int
+    depends_on: List[int]
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
+class CriticalPath(BaseModel):
+    task_ids: List[int]  # In the order they have to be done
+    duration: int  # Total remaining minutes along the path
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
+class DurationEstimateBucket(BaseModel):
+    source: Optional[str] = None  # None for the bucket covering all sources
+    priority: Optional[int] = None  # None for the bucket covering all priorities
+    samples: int
+    mean_ratio: float  # actual / estimated duration
+    stddev: float
+    applied: bool  # Whether there are enough samples to correct estimates
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
+class TaskEventResponse(BaseModel):
+    id: int
+    type: str  # created, updated, deleted, archived
+    task_id: int
+    created_at: datetime
+    task: Optional[Dict[str, Any]] = None  # The task after the change, None when deleted
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
+class TaskEventLog(BaseModel):
+    last_id: int  # Pass as `since` on the next call
+    reset: bool  # Too many changes to replay; refetch the full state
+    events: List[TaskEventResponse]
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
+class TimeSeries(BaseModel):
+    bucket: str  # day or week
+    start: str  # First bucket, YYYY-MM-DD
+    end: str
+    buckets: List[str]  # Start date of every bucket
+    series: Dict[str, List[Optional[Union[int, float]]]]  # metric -> one value per bucket
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
 class ProductivityReport(BaseModel):
     period: str
     total_tasks: int
@@ -112,6 +359,30 @@ class GoogleCalendarCredentials(BaseModel):
             datetime: lambda v: v.isoformat()
         }
 
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str  # queued, running, succeeded, failed
+    progress: int = 0
+    total: Optional[int] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @field_validator("result", mode="before")
+    @classmethod
+    def parse_result(cls, value):
+        # Stored as JSON text in the jobs table
+        return json.loads(value) if isinstance(value, str) else value
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
 class PomodoroTimer(BaseModel):
     work_duration: int = 25  # in minutes
     break_duration: int = 5  # in minutes
@@ -0,0 +1,49 @@
+# Fast JSON path: build response dicts from column-only rows and encode them
+# with orjson, producing the same bytes as FastAPI's default response path.
+import json
+from typing import Any, Dict, Iterable, List
+
+from fastapi.responses import Response
+
+from . import schemas
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+# Keys in the same order as schemas.TaskResponse so the output is identical
+TASK_RESPONSE_FIELDS = tuple(schemas.TaskResponse.model_fields)
+
+
+def rows_to_dicts(rows: Iterable[Any], fields=TASK_RESPONSE_FIELDS) -> List[Dict[str, Any]]:
+    """Convert column-only query rows into response dicts"""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content the same way FastAPI's JSONResponse would"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+        default=_default,
+    ).encode("utf-8")
+
+
+def _default(value: Any):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(Response):
+    """JSON response for pre-built dicts that skips Pydantic validation"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,102 @@
+"""
+Production launcher for the API.
+
+Usage: python -m app.server [--host 0.0.0.0] [--port 8000] [--workers N] [--graceful-timeout SECONDS]
+                            [--server auto|gunicorn|uvicorn]
+
+Creates and migrates the database once in this process, then starts N worker
+processes that share one listening socket. With gunicorn the workers run the
+uvicorn worker class: SIGHUP starts fresh workers and lets the old ones drain,
+SIGTERM stops accepting connections and drains before exiting, both within
+--graceful-timeout. Without gunicorn (e.g. on Windows) uvicorn's own process
+manager is used, which drains on SIGTERM but can't reload.
+
+Each worker keeps its own caches. Dependency graphs and task responses are
+checked against the database before use, but learned duration statistics
+may lag other workers' changes by up to five minutes and notifications are
+batched per process, so the default is a single worker; pass --workers (or
+API_WORKERS) to run more.
+"""
+import argparse
+import os
+import sys
+
+from . import config
+
+
+def prepare_database():
+    """Create missing tables and columns once, before any worker starts"""
+    from .database import engine, init_db
+
+    init_db()
+    # Forked workers must not share the connections opened here
+    engine.dispose()
+    # Workers skip their own init_db(): forked ones inherit the flag, spawned ones the variable
+    config.INIT_DB_ON_STARTUP = False
+    os.environ["INIT_DB_ON_STARTUP"] = "0"
+
+
+def _run_gunicorn(host: str, port: int, workers: int, graceful_timeout: int):
+    from gunicorn.app.base import BaseApplication
+
+    class APIApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("graceful_timeout", graceful_timeout)
+
+        def load(self):
+            # Imported in each worker after the fork, not in the master
+            from .main import app
+            return app
+
+    APIApplication().run()
+
+
+def _run_uvicorn(host: str, port: int, workers: int, graceful_timeout: int):
+    import uvicorn
+
+    uvicorn.run("app.main:app", host=host, port=port, workers=workers,
+                timeout_graceful_shutdown=graceful_timeout)
+
+
+def serve(host: str = "0.0.0.0", port: int = 8000, workers: int = None, graceful_timeout: int = None,
+          server: str = "auto"):
+    """Initialize the database, then run the API on `workers` processes until stopped"""
+    workers = workers or config.API_WORKERS
+    graceful_timeout = config.GRACEFUL_TIMEOUT if graceful_timeout is None else graceful_timeout
+    if server == "auto":
+        try:
+            import gunicorn  # noqa: F401
+            server = "uvicorn" if os.name == "nt" else "gunicorn"
+        except ImportError:
+            server = "uvicorn"
+
+    prepare_database()
+    print(f"Starting API on {host}:{port} with {workers} {server} workers")
+    if server == "gunicorn":
+        _run_gunicorn(host, port, workers, graceful_timeout)
+    else:
+        _run_uvicorn(host, port, workers, graceful_timeout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Smart Task Scheduler API with several worker processes")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=config.API_WORKERS, help="Worker processes (default: API_WORKERS, 1)")
+    parser.add_argument("--graceful-timeout", type=int, default=config.GRACEFUL_TIMEOUT,
+                        help="Seconds a stopping worker gets to finish in-flight requests")
+    parser.add_argument("--server", choices=["auto", "gunicorn", "uvicorn"], default="auto",
+                        help="Process manager; auto prefers gunicorn when it is installed")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    serve(args.host, args.port, args.workers, args.graceful_timeout, args.server)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
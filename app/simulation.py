@@ -0,0 +1,116 @@
+"""
+What-if schedule simulation.
+
+Evaluates several scenarios (working window, break length, deferred tasks)
+against one load of a user's day. With more than one scenario and enough
+tasks, the scenarios are split into one chunk per worker of a process pool;
+each chunk receives the task list once.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Set
+
+from . import config
+from .utils.scheduler import plan_daily_schedule
+
+logger = logging.getLogger(__name__)
+
+
+def evaluate_scenario(tasks: List[Any], target_date, blocked_by: Dict[int, Set[int]],
+                      scenario: Dict[str, Any]) -> Dict[str, Any]:
+    """Plan the day under one scenario and summarize the result as a ScenarioResult dict"""
+    deferred = set(scenario["defer_task_ids"])
+    candidates = [task for task in tasks if task.id is None or task.id not in deferred]
+    slots = plan_daily_schedule(candidates, target_date, blocked_by, start_hour=scenario["start_hour"],
+                                end_hour=scenario["end_hour"], break_minutes=scenario["break_minutes"])
+
+    placed = {id(task) for task, _, _, _ in slots}
+    overflow = [task for task in candidates if id(task) not in placed]
+    priority_weight = sum(task.priority or 0 for task, _, _, _ in slots)
+    total_weight = sum(task.priority or 0 for task in tasks)
+    return {
+        "name": scenario["name"],
+        "scheduled_tasks": len(slots),
+        "scheduled_minutes": sum(duration for _, _, _, duration in slots),
+        "priority_weight": priority_weight,
+        "priority_coverage": priority_weight / total_weight if total_weight else 1.0,
+        "overflow_tasks": len(overflow),
+        "overflow_task_ids": [task.id for task in overflow if task.id is not None],
+        "deferred_tasks": len(tasks) - len(candidates),
+        "finishes_at": slots[-1][2] if slots else None,
+    }
+
+
+def _evaluate_chunk(tasks, target_date, blocked_by, scenarios) -> List[Dict[str, Any]]:
+    return [evaluate_scenario(tasks, target_date, blocked_by, scenario) for scenario in scenarios]
+
+
+class ScheduleSimulator:
+    """Runs scenario evaluations in a lazily started process pool"""
+
+    def __init__(self, workers: int = None, parallel_threshold: int = None):
+        self.workers = workers or config.SIMULATION_WORKERS
+        self.parallel_threshold = (config.SIMULATION_PARALLEL_THRESHOLD
+                                   if parallel_threshold is None else parallel_threshold)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Spawned, not forked: the API process has threads that may hold locks
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def run(self, tasks: List[Any], target_date, blocked_by: Dict[int, Set[int]],
+            scenarios: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Evaluate every scenario, in input order"""
+        chunks = min(self.workers, len(scenarios))
+        if chunks < 2 or len(tasks) * len(scenarios) < self.parallel_threshold:
+            # Pickling the tasks would cost more than planning them here
+            return _evaluate_chunk(tasks, target_date, blocked_by, scenarios)
+
+        pool = self._get_pool()
+        try:
+            futures = [pool.submit(_evaluate_chunk, tasks, target_date, blocked_by, scenarios[i::chunks])
+                       for i in range(chunks)]
+            results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            logger.exception("Simulation worker died, evaluating in process")
+            self.shutdown()
+            return _evaluate_chunk(tasks, target_date, blocked_by, scenarios)
+        # Chunk i holds scenarios i, i + chunks, ...; interleave them back
+        ordered = [None] * len(scenarios)
+        for i, chunk in enumerate(results):
+            ordered[i::chunks] = chunk
+        return ordered
+
+    def shutdown(self):
+        """Stop the worker processes; the next parallel run starts new ones"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def simulate_schedule(db, target_date, scenarios: List[Dict[str, Any]], user_id: int = config.DEFAULT_USER_ID):
+    """Load a user's day once and evaluate all scenarios; returns a ScheduleSimulation dict"""
+    from .crud import daily_schedule_inputs
+
+    tasks, blocked_by, duration_of = daily_schedule_inputs(db, target_date, user_id)
+    if duration_of:
+        # Bake learned durations in, so workers don't need the estimator
+        tasks = [task._replace(estimated_duration=duration_of(task)) for task in tasks]
+    return {
+        "date": target_date.isoformat(),
+        "tasks": len(tasks),
+        "scenarios": schedule_simulator.run(tasks, target_date, blocked_by, scenarios),
+    }
+
+
+# Global instance for use throughout the application
+schedule_simulator = ScheduleSimulator()
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from . import config
+from .metrics import registry
+
+task_cache_requests_total = registry.counter(
+    "task_cache_requests_total", "Single-task cache lookups by result (hit, miss, stale)", ("result",)
+)
+task_cache_evictions_total = registry.counter(
+    "task_cache_evictions_total", "Entries dropped from the single-task cache by reason", ("reason",)
+)
+
+
+class TaskCache:
+    """
+    Bounded LRU of serialized TaskResponse payloads with an optional TTL.
+
+    Each entry remembers the version (updated_at) it was built from. Readers
+    compare it with a cheap probe of the row, so an update made by another
+    worker process is never served stale; writes in this process refresh or
+    evict the entry directly.
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None):
+        self.max_size = config.TASK_CACHE_SIZE if max_size is None else max_size
+        self.ttl = config.TASK_CACHE_TTL if ttl is None else ttl
+        # key -> (version, payload, expires_at)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def has(self, key: Hashable) -> bool:
+        """Whether a payload is cached for key; checked before probing its version"""
+        if key in self._entries:
+            return True
+        task_cache_requests_total.inc("miss")
+        return False
+
+    def get(self, key: Hashable, version: Any) -> Optional[bytes]:
+        """Cached payload if it was built from `version` and hasn't expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                # Evicted since has() was checked
+                task_cache_requests_total.inc("miss")
+                return None
+            cached_version, payload, expires_at = entry
+            if cached_version != version or (expires_at is not None and expires_at < time.monotonic()):
+                del self._entries[key]
+                task_cache_requests_total.inc("stale")
+                return None
+            self._entries.move_to_end(key)
+        task_cache_requests_total.inc("hit")
+        return payload
+
+    def put(self, key: Hashable, version: Any, payload: bytes):
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (version, payload, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                task_cache_evictions_total.inc("size")
+
+    def evict(self, key: Hashable):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                task_cache_evictions_total.inc("write")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Global instance for use throughout the application
+task_cache = TaskCache()
+
+registry.gauge("task_cache_entries", "Payloads held in the single-task cache", lambda: len(task_cache))
@@ -0,0 +1,209 @@
+import json
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from .metrics import registry
+from .models import Task, TaskEvent
+
+# Statuses of tasks that can still be worked on
+OPEN_STATUSES = ("pending", "in_progress")
+# Eisenhower quadrants by (urgent, important), do first (0) to eliminate (3)
+QUADRANT_RANK = {(True, True): 0, (False, True): 1, (True, False): 2, (False, False): 3}
+
+
+def next_task_key(task_id: int, urgent: bool, important: bool, deadline: Optional[datetime], priority: int) -> tuple:
+    """Order of prioritize_by_eisenhower: quadrant, earliest deadline, highest priority; id breaks ties"""
+    return (QUADRANT_RANK[bool(urgent), bool(important)], deadline or datetime.max, -(priority or 0), task_id)
+
+
+class IndexedHeap:
+    """Binary min-heap of (key, item) that can update or remove any item in O(log n)"""
+
+    def __init__(self):
+        self._heap: List[Tuple[tuple, Any]] = []
+        self._position: Dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, item) -> bool:
+        return item in self._position
+
+    def peek(self) -> Optional[Any]:
+        return self._heap[0][1] if self._heap else None
+
+    def set(self, item, key: tuple):
+        index = self._position.get(item)
+        if index is None:
+            self._heap.append((key, item))
+            self._position[item] = len(self._heap) - 1
+            self._sift_up(len(self._heap) - 1)
+        else:
+            self._heap[index] = (key, item)
+            self._sift_up(index)
+            self._sift_down(self._position[item])
+
+    def remove(self, item):
+        index = self._position.pop(item, None)
+        if index is None:
+            return
+        last = self._heap.pop()
+        if index < len(self._heap):
+            self._heap[index] = last
+            self._position[last[1]] = index
+            self._sift_up(index)
+            self._sift_down(self._position[last[1]])
+
+    def _swap(self, i: int, j: int):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._position[heap[i][1]] = i
+        self._position[heap[j][1]] = j
+
+    def _sift_up(self, index: int):
+        while index:
+            parent = (index - 1) // 2
+            if self._heap[index][0] >= self._heap[parent][0]:
+                break
+            self._swap(index, parent)
+            index = parent
+
+    def _sift_down(self, index: int):
+        size = len(self._heap)
+        while True:
+            smallest = index
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < size and self._heap[child][0] < self._heap[smallest][0]:
+                    smallest = child
+            if smallest == index:
+                return
+            self._swap(index, smallest)
+            index = smallest
+
+
+class TaskPriorityIndex:
+    """
+    Open tasks of every user in an indexed heap, so the next task to work on
+    is read without touching the tasks table.
+
+    crud updates the heaps of this process as it writes. Changes made by
+    other worker processes, imports or the archiver are applied by tailing
+    the task_events log before each read; every event carries the task's
+    full state, so replaying one twice is harmless.
+    """
+
+    def __init__(self, sync_limit: int = 1000):
+        self.sync_limit = sync_limit
+        self.last_event_id = 0
+        self._heaps: Dict[int, IndexedHeap] = {}
+        # Set by rebuild(): a user without a heap has no open tasks
+        self._complete = False
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return sum(len(heap) for heap in list(self._heaps.values()))
+
+    def set_task(self, user_id: int, task_id: int, status: str, urgent: bool, important: bool,
+                 deadline: Optional[datetime], priority: int):
+        """Add, move or drop a task of a user whose heap is loaded"""
+        with self._lock:
+            heap = self._heaps.get(user_id)
+            if heap is None:
+                if not self._complete:
+                    return  # loaded from the database on first use
+                heap = self._heaps[user_id] = IndexedHeap()
+            if status in OPEN_STATUSES:
+                heap.set(task_id, next_task_key(task_id, urgent, important, deadline, priority))
+            else:
+                heap.remove(task_id)
+
+    def update(self, task):
+        """set_task from a Task or a row with its columns"""
+        status = getattr(task.status, "value", task.status)
+        self.set_task(task.user_id, task.id, status, task.urgent, task.important, task.deadline, task.priority)
+
+    def remove_task(self, user_id: int, task_id: int):
+        with self._lock:
+            heap = self._heaps.get(user_id)
+            if heap is not None:
+                heap.remove(task_id)
+
+    def clear(self):
+        """Forget all heaps; users are loaded from the table again on first use"""
+        with self._lock:
+            self._heaps.clear()
+            self._complete = False
+            self.last_event_id = 0
+
+    @staticmethod
+    def _open_tasks(db, *conditions):
+        return db.execute(
+            select(Task.user_id, Task.id, Task.urgent, Task.important, Task.deadline, Task.priority)
+            .where(Task.status.in_(OPEN_STATUSES), *conditions)
+        ).all()
+
+    def rebuild(self, db):
+        """Load the open tasks of all users, e.g. at startup"""
+        with self._lock:
+            # Events from here on are replayed on top of the snapshot
+            self.last_event_id = db.execute(select(func.max(TaskEvent.id))).scalar() or 0
+            heaps: Dict[int, IndexedHeap] = {}
+            for user_id, task_id, urgent, important, deadline, priority in self._open_tasks(db):
+                heaps.setdefault(user_id, IndexedHeap()).set(
+                    task_id, next_task_key(task_id, urgent, important, deadline, priority)
+                )
+            self._heaps = heaps
+            self._complete = True
+
+    def _load_user(self, db, user_id: int) -> IndexedHeap:
+        heap = IndexedHeap()
+        for _, task_id, urgent, important, deadline, priority in self._open_tasks(db, Task.user_id == user_id):
+            heap.set(task_id, next_task_key(task_id, urgent, important, deadline, priority))
+        return heap
+
+    def sync(self, db):
+        """Apply task events written since the last sync"""
+        with self._lock:
+            if not self.last_event_id and not self._heaps and not self._complete:
+                # Nothing loaded yet: start at the end of the log
+                self.last_event_id = db.execute(select(func.max(TaskEvent.id))).scalar() or 0
+                return
+            rows = db.execute(
+                select(TaskEvent.id, TaskEvent.user_id, TaskEvent.task_id, TaskEvent.event_type, TaskEvent.payload)
+                .where(TaskEvent.id > self.last_event_id).order_by(TaskEvent.id).limit(self.sync_limit + 1)
+            ).all()
+            if len(rows) > self.sync_limit:
+                # Too far behind to replay: reload users from the table as they are needed
+                self.clear()
+                self.last_event_id = db.execute(select(func.max(TaskEvent.id))).scalar() or 0
+                return
+            for event_id, user_id, task_id, event_type, payload in rows:
+                self.last_event_id = event_id
+                if event_type in ("deleted", "archived") or payload is None:
+                    self.remove_task(user_id, task_id)
+                    continue
+                task = json.loads(payload)
+                deadline = datetime.fromisoformat(task["deadline"]) if task["deadline"] else None
+                self.set_task(user_id, task_id, task["status"], task["urgent"], task["important"],
+                              deadline, task["priority"])
+
+    def next_task_id(self, db, user_id: int) -> Optional[int]:
+        """Id of the user's most pressing open task, None if there is none"""
+        with self._lock:
+            self.sync(db)
+            heap = self._heaps.get(user_id)
+            if heap is None:
+                if self._complete:
+                    return None
+                heap = self._heaps[user_id] = self._load_user(db, user_id)
+            return heap.peek()
+
+
+# Global instance for use throughout the application
+task_priority_index = TaskPriorityIndex()
+
+registry.gauge("task_index_entries", "Open tasks held in the /tasks/next index of this process",
+               lambda: len(task_priority_index))
@@ -0,0 +1,318 @@
+import heapq
+import json
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DependencyCycleError(ValueError):
+    """Raised when a new dependency would make the graph cyclic"""
+
+
+class DependencyGraph:
+    """
+    In-memory DAG of task dependencies ("task depends on depends_on") for one user.
+
+    Alongside the edges it keeps the earliest finish time of every task
+    (its remaining duration plus the longest chain of unfinished work before
+    it). Edge and duration changes only propagate to the affected successors,
+    and a lazy max-heap gives the critical path without a full recomputation.
+    """
+
+    def __init__(self):
+        self._predecessors: Dict[int, Set[int]] = defaultdict(set)
+        self._successors: Dict[int, Set[int]] = defaultdict(set)
+        self._durations: Dict[int, int] = {}
+        self._done: Set[int] = set()
+        self._finish: Dict[int, int] = {}
+        self._critical_predecessor: Dict[int, Optional[int]] = {}
+        self._finish_heap: List[Tuple[int, int]] = []
+        self._lock = threading.RLock()
+
+    def __contains__(self, task_id: int) -> bool:
+        return task_id in self._finish
+
+    def _ensure_node(self, task_id: int):
+        if task_id not in self._finish:
+            self._finish[task_id] = self._remaining(task_id)
+            self._critical_predecessor[task_id] = None
+            heapq.heappush(self._finish_heap, (-self._finish[task_id], task_id))
+
+    def _remaining(self, task_id: int) -> int:
+        return 0 if task_id in self._done else self._durations.get(task_id, 0)
+
+    def _reaches(self, start: int, target: int) -> bool:
+        """Whether target can be reached from start by following successors"""
+        stack = [start]
+        seen = {start}
+        while stack:
+            node = stack.pop()
+            if node == target:
+                return True
+            for successor in self._successors.get(node, ()):
+                if successor not in seen:
+                    seen.add(successor)
+                    stack.append(successor)
+        return False
+
+    def _propagate(self, start: Iterable[int]):
+        """Recompute finish times from the given nodes towards their successors"""
+        queue = deque(start)
+        while queue:
+            node = queue.popleft()
+            if node not in self._finish:
+                continue
+            best, best_predecessor = 0, None
+            for predecessor in self._predecessors.get(node, ()):
+                if self._finish[predecessor] > best:
+                    best, best_predecessor = self._finish[predecessor], predecessor
+            finish = best + self._remaining(node)
+            changed = finish != self._finish[node]
+            self._finish[node] = finish
+            self._critical_predecessor[node] = best_predecessor
+            if changed:
+                heapq.heappush(self._finish_heap, (-finish, node))
+                queue.extend(self._successors.get(node, ()))
+
+    def set_task(self, task_id: int, duration: int, done: bool = False):
+        """Record or update a task's duration and completion state"""
+        with self._lock:
+            self._durations[task_id] = duration or 0
+            if done:
+                self._done.add(task_id)
+            else:
+                self._done.discard(task_id)
+            self._ensure_node(task_id)
+            self._propagate([task_id])
+
+    def add_edge(self, task_id: int, depends_on_id: int):
+        """Make task_id depend on depends_on_id, rejecting cycles"""
+        with self._lock:
+            if task_id == depends_on_id or self._reaches(task_id, depends_on_id):
+                raise DependencyCycleError(f"Task {task_id} can't depend on {depends_on_id}: that creates a cycle")
+            self._ensure_node(task_id)
+            self._ensure_node(depends_on_id)
+            self._predecessors[task_id].add(depends_on_id)
+            self._successors[depends_on_id].add(task_id)
+            self._propagate([task_id])
+
+    def remove_edge(self, task_id: int, depends_on_id: int):
+        with self._lock:
+            self._predecessors.get(task_id, set()).discard(depends_on_id)
+            self._successors.get(depends_on_id, set()).discard(task_id)
+            self._propagate([task_id])
+
+    def remove_task(self, task_id: int):
+        """Drop a task and all of its edges"""
+        with self._lock:
+            successors = self._successors.pop(task_id, set())
+            for successor in successors:
+                self._predecessors[successor].discard(task_id)
+            for predecessor in self._predecessors.pop(task_id, set()):
+                self._successors[predecessor].discard(task_id)
+            self._finish.pop(task_id, None)
+            self._critical_predecessor.pop(task_id, None)
+            self._durations.pop(task_id, None)
+            self._done.discard(task_id)
+            self._propagate(successors)
+
+    def edges(self) -> Set[Tuple[int, int]]:
+        """All (task_id, depends_on_id) pairs"""
+        with self._lock:
+            return {(task_id, depends_on_id) for task_id, predecessors in self._predecessors.items()
+                    for depends_on_id in predecessors}
+
+    def dependencies(self, task_id: int) -> List[int]:
+        return sorted(self._predecessors.get(task_id, ()))
+
+    def unfinished_predecessors(self, task_ids: Iterable[int]) -> Dict[int, Set[int]]:
+        """Predecessors that still block each of the given tasks"""
+        with self._lock:
+            blocked = {}
+            for task_id in task_ids:
+                pending = {p for p in self._predecessors.get(task_id, ()) if p not in self._done}
+                if pending:
+                    blocked[task_id] = pending
+            return blocked
+
+    def critical_path(self) -> Tuple[List[int], int]:
+        """Longest chain of unfinished work as (task ids in order, total minutes)"""
+        with self._lock:
+            while self._finish_heap:
+                finish, node = self._finish_heap[0]
+                if self._finish.get(node) == -finish:
+                    break
+                heapq.heappop(self._finish_heap)  # stale entry
+            if not self._finish_heap or self._finish_heap[0][0] == 0:
+                return [], 0
+            finish, node = self._finish_heap[0]
+            path = []
+            while node is not None:
+                if self._remaining(node):
+                    path.append(node)
+                node = self._critical_predecessor.get(node)
+            path.reverse()
+            return path, -finish
+
+
+def order_by_dependencies(tasks: List[Any], blocked_by: Dict[int, Set[int]]) -> List[Any]:
+    """
+    Reorder tasks (already sorted by priority) so every task comes after the
+    tasks it depends on. Tasks waiting on work outside the list are dropped.
+    """
+    if not blocked_by:
+        return tasks
+
+    position = {task.id: index for index, task in enumerate(tasks) if task.id is not None}
+    waiting = {}
+    dependents = defaultdict(list)
+    for task_id, predecessors in blocked_by.items():
+        if task_id not in position:
+            continue
+        if any(predecessor not in position for predecessor in predecessors):
+            waiting[task_id] = None  # blocked by a task that isn't schedulable today
+            continue
+        waiting[task_id] = len(predecessors)
+        for predecessor in predecessors:
+            dependents[predecessor].append(task_id)
+
+    ready = [(index, index) for index, task in enumerate(tasks)
+             if task.id is None or task.id not in waiting]
+    heapq.heapify(ready)
+    ordered = []
+    while ready:
+        _, index = heapq.heappop(ready)
+        task = tasks[index]
+        ordered.append(task)
+        for dependent in dependents.get(task.id, ()):
+            if waiting[dependent] is None:
+                continue
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                heapq.heappush(ready, (position[dependent], position[dependent]))
+    return ordered
+
+
+class DependencyGraphRegistry:
+    """
+    One lazily loaded DependencyGraph per user.
+
+    Other worker processes change tasks and edges too, so every get() first
+    applies the task events written since the last call (completions,
+    duration changes, deletions) and then diffs the graph's edges against
+    task_dependencies. Edges that would make a graph cyclic or point at
+    missing tasks are skipped with a warning instead of failing the user's
+    requests.
+    """
+
+    def __init__(self, sync_limit: int = 1000):
+        self.sync_limit = sync_limit
+        self.last_event_id = 0
+        self._graphs: Dict[int, DependencyGraph] = {}
+        # Persisted edges each graph leaves out, so they aren't retried on every sync
+        self._skipped: Dict[int, Set[Tuple[int, int]]] = {}
+        self._lock = threading.RLock()
+
+    def get(self, db, user_id: int) -> DependencyGraph:
+        """The user's graph, brought up to date with changes made by any process"""
+        with self._lock:
+            self._sync_tasks(db)
+            graph = self._graphs.get(user_id)
+            if graph is None:
+                graph = self._graphs[user_id] = DependencyGraph()
+                self._skipped[user_id] = set()
+            self._sync_edges(db, user_id, graph)
+            return graph
+
+    def loaded(self, user_id: int) -> Optional[DependencyGraph]:
+        """The user's graph if it has been loaded, without touching the database"""
+        return self._graphs.get(user_id)
+
+    def discard(self, user_id: int):
+        """Forget a user's graph; it is loaded again on next use"""
+        with self._lock:
+            self._graphs.pop(user_id, None)
+            self._skipped.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._graphs.clear()
+            self._skipped.clear()
+            self.last_event_id = 0
+
+    def _sync_tasks(self, db):
+        """Apply task events written since the last sync to the loaded graphs"""
+        from sqlalchemy import func, select
+        from ..models import TaskEvent
+
+        if not self._graphs:
+            # Nothing loaded: graphs loaded from here on start at the end of the log
+            self.last_event_id = db.execute(select(func.max(TaskEvent.id))).scalar() or 0
+            return
+        rows = db.execute(
+            select(TaskEvent.id, TaskEvent.user_id, TaskEvent.task_id, TaskEvent.event_type, TaskEvent.payload)
+            .where(TaskEvent.id > self.last_event_id).order_by(TaskEvent.id).limit(self.sync_limit + 1)
+        ).all()
+        if len(rows) > self.sync_limit:
+            # Too far behind to replay: reload graphs as they are needed
+            self.clear()
+            self.last_event_id = db.execute(select(func.max(TaskEvent.id))).scalar() or 0
+            return
+        for event_id, user_id, task_id, event_type, payload in rows:
+            self.last_event_id = event_id
+            graph = self._graphs.get(user_id)
+            if graph is None or task_id not in graph:
+                continue
+            if event_type in ("deleted", "archived") or payload is None:
+                graph.remove_task(task_id)
+            else:
+                task = json.loads(payload)
+                graph.set_task(task_id, task["estimated_duration"], task["status"] in DONE_STATUSES)
+
+    def _sync_edges(self, db, user_id: int, graph: DependencyGraph):
+        """Make the graph's edges match task_dependencies"""
+        from sqlalchemy import select
+        from ..models import Task, TaskDependency
+
+        persisted = set(map(tuple, db.execute(
+            select(TaskDependency.task_id, TaskDependency.depends_on_id).where(TaskDependency.user_id == user_id)
+        ).all()))
+        skipped = self._skipped[user_id]
+        skipped &= persisted
+        current = graph.edges()
+        for task_id, depends_on_id in current - persisted:
+            graph.remove_edge(task_id, depends_on_id)
+        added = persisted - current - skipped
+        if not added:
+            return
+
+        missing = {task_id for edge in added for task_id in edge if task_id not in graph}
+        found = set()
+        if missing:
+            for task_id, duration, status in db.execute(
+                select(Task.id, Task.estimated_duration, Task.status)
+                .where(Task.id.in_(missing), Task.user_id == user_id)
+            ).all():
+                graph.set_task(task_id, duration, status in DONE_STATUSES)
+                found.add(task_id)
+        for task_id, depends_on_id in sorted(added):
+            if (task_id in missing and task_id not in found) or (depends_on_id in missing and depends_on_id not in found):
+                logger.warning("Skipping dependency %s -> %s of user %s: task not found", task_id, depends_on_id, user_id)
+                skipped.add((task_id, depends_on_id))
+                continue
+            try:
+                graph.add_edge(task_id, depends_on_id)
+            except DependencyCycleError:
+                logger.warning("Skipping dependency %s -> %s of user %s: it closes a cycle",
+                               task_id, depends_on_id, user_id)
+                skipped.add((task_id, depends_on_id))
+
+
+# A finished or cancelled task no longer blocks its dependents
+DONE_STATUSES = ("completed", "cancelled")
+
+# Global instance for use throughout the application
+dependency_graphs = DependencyGraphRegistry()
@@ -0,0 +1,142 @@
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Samples a bucket needs before its correction is trusted
+MIN_SAMPLES = 5
+# actual / estimated ratios outside this range are clamped (tasks left open for days, typos)
+MIN_RATIO, MAX_RATIO = 0.1, 10.0
+# Seconds a user's statistics are used before they are read again, so
+# changes made by other processes are picked up
+STATS_TTL = 300.0
+
+
+class RunningStats:
+    """Online mean and variance (Welford's algorithm)"""
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+
+def _ratio(estimated: int, actual: int) -> Optional[float]:
+    if not estimated or not actual or estimated <= 0 or actual <= 0:
+        return None
+    return min(MAX_RATIO, max(MIN_RATIO, actual / estimated))
+
+
+class DurationEstimator:
+    """
+    Learns how far actual durations drift from estimates, per user.
+
+    Statistics of the actual/estimated ratio are kept for the buckets
+    (source, priority), (source,) and () of every user, so a lookup is a few
+    dict reads and the most specific bucket with enough samples wins.
+    A user's history (live and archived tasks) is read again once it is
+    older than `ttl` seconds, or on next use after invalidate().
+    """
+
+    def __init__(self, min_samples: int = MIN_SAMPLES, ttl: float = STATS_TTL):
+        self.min_samples = min_samples
+        self.ttl = ttl
+        self._stats: Dict[int, Dict[Tuple, RunningStats]] = {}
+        self._loaded_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _buckets(source: str, priority: int) -> Tuple[Tuple, ...]:
+        return (source, priority), (source,), ()
+
+    def _record(self, user_stats: Dict[Tuple, RunningStats], source: str, priority: int, ratio: float):
+        for bucket in self._buckets(source, priority):
+            stats = user_stats.get(bucket)
+            if stats is None:
+                stats = user_stats[bucket] = RunningStats()
+            stats.update(ratio)
+
+    def load(self, db, user_ids: Iterable[int]):
+        """Read the completion history of users not loaded or stale, in one query"""
+        from sqlalchemy import select, union_all
+        from ..models import Task, TaskArchive
+
+        now = time.monotonic()
+        missing = [user_id for user_id in set(user_ids)
+                   if user_id not in self._loaded_at or now - self._loaded_at[user_id] >= self.ttl]
+        if not missing:
+            return
+        rows = db.execute(union_all(*(
+            select(table.user_id, table.source, table.priority, table.estimated_duration, table.actual_duration)
+            .where(table.user_id.in_(missing), table.status == "completed", table.actual_duration.is_not(None))
+            for table in (Task, TaskArchive)
+        ))).all()
+        loaded = {user_id: {} for user_id in missing}
+        for user_id, source, priority, estimated, actual in rows:
+            ratio = _ratio(estimated, actual)
+            if ratio is not None:
+                self._record(loaded[user_id], source, priority, ratio)
+        with self._lock:
+            for user_id, user_stats in loaded.items():
+                self._stats[user_id] = user_stats
+                self._loaded_at[user_id] = now
+
+    def invalidate(self, user_id: int):
+        """Read the user's history again on next use, e.g. after a completion"""
+        with self._lock:
+            self._loaded_at.pop(user_id, None)
+
+    def correction(self, user_id: int, source: str, priority: int) -> float:
+        """Expected actual/estimated ratio for a task, 1.0 without enough history"""
+        user_stats = self._stats.get(user_id)
+        if user_stats:
+            for bucket in self._buckets(source, priority):
+                stats = user_stats.get(bucket)
+                if stats is not None and stats.count >= self.min_samples:
+                    return stats.mean
+        return 1.0
+
+    def estimate(self, user_id: int, task) -> int:
+        """Corrected duration in minutes for a task, occurrence or row"""
+        estimated = task.estimated_duration
+        if not estimated:
+            return estimated
+        return max(1, round(estimated * self.correction(user_id, task.source, task.priority)))
+
+    def summary(self, user_id: int) -> List[dict]:
+        """Per-bucket statistics of a loaded user"""
+        buckets = []
+        for bucket, stats in sorted(self._stats.get(user_id, {}).items(), key=lambda item: (len(item[0]), str(item[0]))):
+            buckets.append({
+                "source": bucket[0] if len(bucket) > 0 else None,
+                "priority": bucket[1] if len(bucket) > 1 else None,
+                "samples": stats.count,
+                "mean_ratio": stats.mean,
+                "stddev": stats.stddev,
+                "applied": stats.count >= self.min_samples,
+            })
+        return buckets
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+            self._loaded_at.clear()
+
+
+# Global instance for use throughout the application
+duration_estimator = DurationEstimator()
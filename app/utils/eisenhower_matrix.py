@@ -1,9 +1,13 @@
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Union
 from ..models import Task
 from ..schemas import TaskResponse
+from .task_record import TaskRecord
 
-def categorize_task(task: Task) -> str:
+# Read-only callers can pass TaskRecords instead of loading Task objects
+TaskLike = Union[Task, TaskRecord]
+
+def categorize_task(task: TaskLike) -> str:
     """
     Categorize a task based on the Eisenhower Matrix:
     - Urgent and Important (Do First)
@@ -20,7 +24,7 @@ def categorize_task(task: Task) -> str:
     else:
         return "eliminate"
 
-def prioritize_by_eisenhower(tasks: List[Task]) -> List[Task]:
+def prioritize_by_eisenhower(tasks: List[TaskLike]) -> List[TaskLike]:
     """
     Sort tasks based on Eisenhower matrix priority:
     1. Do First (Urgent and Important)
@@ -28,7 +32,7 @@ def prioritize_by_eisenhower(tasks: List[Task]) -> List[Task]:
     3. Delegate (Urgent but Not Important)
     4. Eliminate (Neither Urgent nor Important)
     """
-    def get_priority_score(task: Task) -> int:
+    def get_priority_score(task: TaskLike) -> int:
         category = categorize_task(task)
         if category == "do_first":
             return 4  # Highest priority
@@ -45,7 +49,7 @@ def prioritize_by_eisenhower(tasks: List[Task]) -> List[Task]:
                                                -t.priority))
     return sorted_tasks
 
-def calculate_urgency(task: Task) -> bool:
+def calculate_urgency(task: TaskLike) -> bool:
     """
     Calculate if a task is urgent based on deadline proximity
     A task is considered urgent if it's due within 24 hours
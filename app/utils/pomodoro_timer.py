@@ -1,102 +1,196 @@
-import time
-import threading
+import logging
+import math
 from datetime import datetime, timedelta
-from typing import Callable, Optional
+from typing import Callable, List, Optional
 
 # Import using absolute paths since Streamlit runs the script directly
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal
+from app.models import PomodoroState
 from app.schemas import PomodoroTimer
 
+logger = logging.getLogger(__name__)
+
+# The timer is a single row
+STATE_ID = 1
+# State of a timer nobody has used yet
+INITIAL_STATE = {"version": 0, "is_working": True, "current_session": 1, "remaining_time": 0, "ends_at": None}
+
+
 class PomodoroTimerManager:
-    def __init__(self):
+    """
+    Pomodoro timer stored in the pomodoro_state table, so every API process
+    serves the same timer. A running session records when it ends instead of
+    counting down in a thread; the first process to read it after that moves
+    it on to the next session.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
         self.timer = PomodoroTimer()
-        self.timer_thread: Optional[threading.Thread] = None
-        self.stop_event = threading.Event()
         self.on_session_complete: Optional[Callable] = None
+        self._state = INITIAL_STATE  # As last read by this process
+        self._listeners: List[Callable[[dict], None]] = []
 
     def start_timer(self):
         """Start the Pomodoro timer"""
-        if self.timer.is_active:
-            return False  # Timer already running
-        
-        self.timer.is_active = True
-        self.stop_event.clear()
-        
-        # Set initial remaining time based on current mode
-        if self.timer.is_working:
-            self.timer.remaining_time = self.timer.work_duration * 60
-        else:
-            if self.timer.current_session % self.timer.sessions_before_long_break == 0:
-                self.timer.remaining_time = self.timer.long_break_duration * 60
-            else:
-                self.timer.remaining_time = self.timer.break_duration * 60
-        
-        self.timer_thread = threading.Thread(target=self._timer_worker)
-        self.timer_thread.daemon = True
-        self.timer_thread.start()
-        
-        return True
+        def start(state):
+            if state["ends_at"] is not None:
+                return None  # Timer already running
+            # Set initial remaining time based on current mode
+            return dict(state, ends_at=datetime.utcnow() + timedelta(seconds=self._phase_seconds(state)))
+        return self._change(start)
 
     def pause_timer(self):
         """Pause the Pomodoro timer"""
-        self.timer.is_active = False
-        self.stop_event.set()
-        if self.timer_thread and self.timer_thread.is_alive():
-            self.timer_thread.join()
+        self._change(lambda state: dict(state, ends_at=None, remaining_time=self._remaining(state)))
 
     def stop_timer(self):
         """Stop and reset the Pomodoro timer"""
-        self.timer.is_active = False
-        self.timer.remaining_time = 0
-        self.stop_event.set()
-        if self.timer_thread and self.timer_thread.is_alive():
-            self.timer_thread.join()
-
-    def _timer_worker(self):
-        """Internal worker function that runs in a separate thread"""
-        while self.timer.remaining_time > 0 and not self.stop_event.is_set():
-            time.sleep(1)
-            if self.timer.is_active:
-                self.timer.remaining_time -= 1
-        
-        if self.timer.remaining_time <= 0 and not self.stop_event.is_set():
-            # Session completed
-            self._complete_session()
-
-    def _complete_session(self):
-        """Handle session completion"""
-        if self.timer.is_working:
+        self._change(lambda state: dict(state, ends_at=None, remaining_time=0))
+
+    def reset_timer(self):
+        """Reset the timer to initial state"""
+        self._change(lambda state: dict(
+            state, ends_at=None, current_session=1, is_working=True, remaining_time=self.timer.work_duration * 60
+        ))
+
+    def _complete_session(self, state):
+        """The state after the running session, or None if it hasn't ended yet"""
+        if state["ends_at"] is None or state["ends_at"] > datetime.utcnow():
+            return None
+        # The next session waits for start_timer
+        state = dict(state, ends_at=None)
+        if state["is_working"]:
             # Work session completed, switch to break
-            self.timer.is_working = False
-            self.timer.current_session += 1
-            if self.timer.current_session % self.timer.sessions_before_long_break == 0:
-                self.timer.remaining_time = self.timer.long_break_duration * 60
-            else:
-                self.timer.remaining_time = self.timer.break_duration * 60
+            state.update(is_working=False, current_session=state["current_session"] + 1)
         else:
             # Break session completed, switch to work
-            self.timer.is_working = True
-            self.timer.remaining_time = self.timer.work_duration * 60
-        
-        # Call the callback if registered
-        if self.on_session_complete:
-            self.on_session_complete(self.timer.is_working)
+            state.update(is_working=True)
+        state["remaining_time"] = self._phase_seconds(state)
+        return state
 
-    def reset_timer(self):
-        """Reset the timer to initial state"""
-        self.pause_timer()
-        self.timer.current_session = 1
-        self.timer.is_working = True
-        self.timer.remaining_time = self.timer.work_duration * 60
-        self.timer.is_active = False
+    def refresh(self):
+        """Read the shared state, completing a session that has ended; listeners hear about changes"""
+        if self._change(self._complete_session) and self.on_session_complete:
+            self.on_session_complete(self.timer.is_working)
 
     def get_status(self):
         """Get current timer status"""
+        self.refresh()
         return self.timer
 
+    @staticmethod
+    def _read(db) -> dict:
+        columns = [getattr(PomodoroState, name) for name in INITIAL_STATE]
+        row = db.execute(select(*columns).where(PomodoroState.id == STATE_ID)).first()
+        return dict(row._mapping) if row is not None else INITIAL_STATE
+
+    @staticmethod
+    def _write(db, version: int, state: dict) -> bool:
+        """Store the state if the row is still at version; returns whether it was"""
+        values = {name: state[name] for name in INITIAL_STATE if name != "version"}
+        try:
+            if version == 0:
+                db.add(PomodoroState(id=STATE_ID, version=1, **values))
+                db.commit()
+                return True
+            written = db.execute(
+                update(PomodoroState)
+                .where(PomodoroState.id == STATE_ID, PomodoroState.version == version)
+                .values(version=PomodoroState.version + 1, **values)
+            ).rowcount == 1
+            db.commit()
+            return written
+        except IntegrityError:
+            db.rollback()  # Another process created the row first
+            return False
+
+    def _change(self, transition: Callable[[dict], Optional[dict]]) -> bool:
+        """
+        Apply transition to the current state unless another process changed it
+        first (then try again on the newer state); returns whether it applied.
+        """
+        db = self.session_factory()
+        try:
+            while True:
+                state = self._read(db)
+                changed = transition(state)
+                if changed is None:
+                    break
+                if self._write(db, state["version"], changed):
+                    state = dict(changed, version=state["version"] + 1)
+                    break
+                # Another process changed the timer meanwhile
+        finally:
+            db.close()
+        self._apply(state)
+        return changed is not None
+
+    def _apply(self, state: dict):
+        """Serve the state from this process, notifying listeners if it is new"""
+        is_new = state["version"] != self._state["version"]
+        self._state = state
+        self.timer.is_working = state["is_working"]
+        self.timer.current_session = state["current_session"]
+        self.timer.is_active = state["ends_at"] is not None
+        self.timer.remaining_time = self._remaining(state)
+        if is_new:
+            self._notify()
+
+    def _remaining(self, state: dict) -> int:
+        if state["ends_at"] is None:
+            return state["remaining_time"]
+        return max(0, math.ceil((state["ends_at"] - datetime.utcnow()).total_seconds()))
+
+    def _phase_seconds(self, state: dict) -> int:
+        """Full length of the state's work or break session"""
+        if state["is_working"]:
+            return self.timer.work_duration * 60
+        if state["current_session"] % self.timer.sessions_before_long_break == 0:
+            return self.timer.long_break_duration * 60
+        return self.timer.break_duration * 60
+
+    def snapshot(self, refresh: bool = True) -> dict:
+        """
+        Compact state for clients that render the countdown themselves; without
+        refresh, from the state this process read last
+        """
+        if refresh:
+            self.refresh()
+        else:
+            self.timer.remaining_time = self._remaining(self._state)
+        return {
+            "working": self.timer.is_working,
+            "active": self.timer.is_active,
+            "remaining": self.timer.remaining_time,
+            "phase_seconds": self._phase_seconds(self._state),
+            "session": self.timer.current_session,
+            "sessions_before_long_break": self.timer.sessions_before_long_break,
+        }
+
+    def add_listener(self, listener: Callable[[dict], None]):
+        """Call listener with a snapshot whenever this process sees a new state (from any thread)"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[dict], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self):
+        state = self.snapshot(refresh=False)
+        for listener in list(self._listeners):
+            try:
+                listener(state)
+            except Exception:
+                logger.exception("Pomodoro listener failed")
+
 
 # Global instance for use throughout the application
-pomodoro_manager = PomodoroTimerManager()
\ No newline at end of file
+pomodoro_manager = PomodoroTimerManager()
@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+
+class RecurrenceRule(NamedTuple):
+    freq: str
+    interval: int = 1
+    byday: Tuple[int, ...] = ()  # weekday numbers, Monday is 0
+    count: Optional[int] = None
+    until: Optional[datetime] = None
+
+
+class Occurrence(NamedTuple):
+    """A not yet materialized occurrence of a recurring task"""
+    recurring_task_id: int
+    user_id: int
+    occurrence_start: datetime
+    title: str
+    description: Optional[str]
+    priority: int
+    urgent: bool
+    important: bool
+    estimated_duration: int
+    source: str
+    status: str = "pending"
+
+    @property
+    def id(self):
+        # Occurrences have no task row until they are materialized
+        return None
+
+    @property
+    def deadline(self):
+        return self.occurrence_start
+
+
+def parse_rrule(text: str) -> RecurrenceRule:
+    """
+    Parse an RRULE-style string such as "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE".
+    Supports FREQ (DAILY, WEEKLY, MONTHLY), INTERVAL, BYDAY, COUNT and UNTIL.
+    """
+    parts = {}
+    for part in text.strip().upper().removeprefix("RRULE:").split(";"):
+        if not part:
+            continue
+        key, sep, value = part.partition("=")
+        if not sep or not value:
+            raise ValueError(f"Invalid rule part: {part!r}")
+        parts[key] = value
+
+    freq = parts.pop("FREQ", None)
+    if freq not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+
+    try:
+        interval = int(parts.pop("INTERVAL", "1"))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+    except ValueError:
+        raise ValueError("INTERVAL and COUNT must be integers")
+    parts.pop("COUNT", None)
+    if interval < 1 or (count is not None and count < 1):
+        raise ValueError("INTERVAL and COUNT must be positive")
+
+    byday = ()
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise ValueError("BYDAY is only supported with FREQ=WEEKLY")
+        try:
+            byday = tuple(sorted({WEEKDAYS.index(day) for day in parts.pop("BYDAY").split(",")}))
+        except ValueError:
+            raise ValueError(f"BYDAY values must be in {', '.join(WEEKDAYS)}")
+
+    until = None
+    if "UNTIL" in parts:
+        value = parts.pop("UNTIL").rstrip("Z")
+        for fmt in ("%Y%m%dT%H%M%S", "%Y%m%d"):
+            try:
+                until = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError("UNTIL must look like 20300131 or 20300131T170000")
+        if until.time() == datetime.min.time() and "T" not in value:
+            until = until.replace(hour=23, minute=59, second=59)
+
+    if parts:
+        raise ValueError(f"Unsupported rule parts: {', '.join(sorted(parts))}")
+    return RecurrenceRule(freq, interval, byday, count, until)
+
+
+def _add_months(value: datetime, months: int) -> Optional[datetime]:
+    """Same day-of-month `months` later, None if that month is too short"""
+    month_index = value.month - 1 + months
+    try:
+        return value.replace(year=value.year + month_index // 12, month=month_index % 12 + 1)
+    except ValueError:
+        return None
+
+
+def _periods(rule: RecurrenceRule, dtstart: datetime, first_period: int) -> Iterator[datetime]:
+    """Occurrences from period `first_period` onwards, in order, without end"""
+    period = first_period
+    if rule.freq == "DAILY":
+        while True:
+            yield dtstart + timedelta(days=period * rule.interval)
+            period += 1
+    elif rule.freq == "WEEKLY":
+        days = rule.byday or (dtstart.weekday(),)
+        week_start = dtstart - timedelta(days=dtstart.weekday())
+        while True:
+            base = week_start + timedelta(weeks=period * rule.interval)
+            for day in days:
+                occurrence = base + timedelta(days=day)
+                if occurrence >= dtstart:
+                    yield occurrence
+            period += 1
+    else:  # MONTHLY
+        while True:
+            occurrence = _add_months(dtstart, period * rule.interval)
+            if occurrence is not None:
+                yield occurrence
+            period += 1
+
+
+def iter_occurrences(rule: RecurrenceRule, dtstart: datetime,
+                     window_start: datetime, window_end: datetime) -> Iterator[datetime]:
+    """
+    Lazily yield the occurrences that fall inside [window_start, window_end].
+    Rules without COUNT jump straight to the period containing window_start,
+    so the cost depends on the window rather than on how old the rule is.
+    """
+    end = min(window_end, rule.until) if rule.until else window_end
+    if end < dtstart or end < window_start:
+        return
+
+    first_period = 0
+    if rule.count is None and window_start > dtstart:
+        if rule.freq == "DAILY":
+            first_period = (window_start - dtstart).days // rule.interval
+        elif rule.freq == "WEEKLY":
+            first_period = (window_start - dtstart).days // (7 * rule.interval)
+        else:
+            months = (window_start.year - dtstart.year) * 12 + window_start.month - dtstart.month
+            first_period = max(0, months // rule.interval - 1)
+
+    for index, occurrence in enumerate(_periods(rule, dtstart, first_period)):
+        if rule.count is not None and index >= rule.count:
+            return
+        if occurrence > end:
+            return
+        if occurrence >= window_start:
+            yield occurrence
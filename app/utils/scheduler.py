@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+from .dependency_graph import order_by_dependencies
+
+
+def plan_daily_schedule(tasks: List[Any], target_date, blocked_by: Dict[int, Set[int]] = None,
+                        duration_of: Callable[[Any], int] = None, start_hour: int = 9, end_hour: int = 18,
+                        break_minutes: int = 5) -> List[Tuple[Any, datetime, datetime, int]]:
+    """
+    Assign tasks to consecutive time slots starting at start_hour, with
+    break_minutes between them, until a slot would run past end_hour:59.
+    blocked_by maps task ids to their unfinished dependencies; those tasks are
+    moved after their dependencies, or left out if a dependency isn't in the list.
+    duration_of overrides task.estimated_duration, e.g. with learned estimates.
+    Returns (task, start_time, end_time, duration) tuples in schedule order.
+    """
+    if blocked_by:
+        tasks = order_by_dependencies(tasks, blocked_by)
+
+    # Starting from 9 AM to 6 PM with breaks by default
+    day = datetime.combine(target_date, datetime.min.time())
+    start_time = day + timedelta(hours=start_hour)
+    day_end = day + timedelta(hours=end_hour + 1)
+    slots = []
+
+    for i, task in enumerate(tasks):
+        # Calculate slot duration (minimum 15 minutes, rounded to 15-min intervals)
+        estimated = duration_of(task) if duration_of else task.estimated_duration
+        duration = max(15, ((estimated + 14) // 15) * 15)  # Round up to nearest 15 min
+
+        # Add some buffer time between tasks
+        if i > 0:
+            start_time += timedelta(minutes=break_minutes)  # break between tasks
+
+        end_time = start_time + timedelta(minutes=duration)
+
+        # Skip if we go beyond the end hour
+        if end_time >= day_end:
+            break
+
+        slots.append((task, start_time, end_time, duration))
+        start_time = end_time
+
+    return slots
+
+
+def schedule_order_key(task):
+    """Python equivalent of crud.DAILY_SCHEDULE_ORDER; unsaved occurrences sort after rows"""
+    return (-(task.priority or 0), -int(bool(task.urgent)), task.id is None, task.id or 0, task.deadline)
+
+
+def merge_occurrences(tasks: List[Any], occurrences: List[Any]) -> List[Any]:
+    """Merge recurring occurrences into tasks already sorted in schedule order"""
+    if not occurrences:
+        return tasks
+    return sorted(list(tasks) + list(occurrences), key=schedule_order_key)
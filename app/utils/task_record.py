@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+
+class TaskRecord(NamedTuple):
+    """
+    Read-only view of a task row for the scheduler and prioritization.
+    Loaded with column-only selects (crud.load_task_records), so it skips the
+    session's identity map and attribute tracking; a tuple instead of an ORM
+    object per row.
+    """
+    id: int
+    user_id: int
+    title: str
+    priority: int
+    urgent: bool
+    important: bool
+    deadline: Optional[datetime]
+    status: str
+    estimated_duration: int
+    source: str
+    recurring_task_id: Optional[int]
+    occurrence_start: Optional[datetime]
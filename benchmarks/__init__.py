@@ -0,0 +1 @@
+# Benchmarks for Smart Task Scheduler
@@ -0,0 +1,118 @@
+"""
+Compare loading tasks as ORM objects with loading TaskRecords.
+
+Usage: python -m benchmarks.bench_records [--rows 100000] [--repeat 3]
+
+Runs against a throwaway SQLite database and reports, for all rows:
+- load time and memory (peak while loading, and retained by the result list)
+  of session.query(Task).all() versus crud.load_task_records()
+- prioritize_by_eisenhower and plan_daily_schedule time on both results
+It also checks that the daily schedule is the same on both paths.
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.workload import WorkloadConfig, generate_tasks, insert_tasks
+
+
+def best_time(fn, repeat: int) -> float:
+    """Best wall time of fn over repeat runs, each in a fresh state"""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def measure_memory(load):
+    """(peak bytes while loading, bytes still held by the result)"""
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the TaskRecord read model against ORM objects")
+    parser.add_argument("--rows", type=int, default=100_000, help="Number of tasks to seed")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs per case, best is reported")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="sts-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    from app import crud, models
+    from app.database import SessionLocal, init_db
+    from app.utils.eisenhower_matrix import prioritize_by_eisenhower
+    from app.utils.scheduler import plan_daily_schedule
+
+    workload = WorkloadConfig(rows=args.rows, deadline_distribution="target_day")
+    init_db()
+    session = SessionLocal()
+    insert_tasks(session, generate_tasks(workload))
+    session.close()
+
+    def load_orm():
+        db = SessionLocal()
+        try:
+            return db.query(models.Task).all()
+        finally:
+            db.close()
+
+    def load_records():
+        db = SessionLocal()
+        try:
+            return crud.load_task_records(db)
+        finally:
+            db.close()
+
+    orm_tasks = load_orm()
+    records = load_records()
+    target_date = workload.target_date.date()
+
+    print(f"{'':32s} {'ORM objects':>14s} {'TaskRecords':>14s} {'ratio':>7s}")
+
+    def report(name, orm_value, record_value, unit):
+        print(f"  {name:30s} {orm_value:11.1f} {unit:2s} {record_value:11.1f} {unit:2s} "
+              f"{orm_value / record_value:6.2f}x")
+
+    report(f"load {args.rows:,} rows", best_time(load_orm, args.repeat) * 1000,
+           best_time(load_records, args.repeat) * 1000, "ms")
+    orm_peak, orm_retained = measure_memory(load_orm)
+    record_peak, record_retained = measure_memory(load_records)
+    report("peak memory while loading", orm_peak / 2**20, record_peak / 2**20, "MB")
+    report("memory held by the result", orm_retained / 2**20, record_retained / 2**20, "MB")
+    report("prioritize_by_eisenhower", best_time(lambda: prioritize_by_eisenhower(orm_tasks), args.repeat) * 1000,
+           best_time(lambda: prioritize_by_eisenhower(records), args.repeat) * 1000, "ms")
+    report("plan_daily_schedule", best_time(lambda: plan_daily_schedule(orm_tasks, target_date), args.repeat) * 1000,
+           best_time(lambda: plan_daily_schedule(records, target_date), args.repeat) * 1000, "ms")
+
+    # The schedule endpoint's tasks, loaded both ways, must plan identically
+    db = SessionLocal()
+    try:
+        conditions = (models.Task.user_id == 1, crud.daily_schedule_conditions(target_date))
+        orm_pending = db.query(models.Task).filter(*conditions).order_by(*crud.DAILY_SCHEDULE_ORDER).all()
+        record_pending = crud.load_task_records(db, *conditions, order_by=crud.DAILY_SCHEDULE_ORDER)
+    finally:
+        db.close()
+
+    def slots(tasks):
+        return [(task.id, start, end, duration) for task, start, end, duration in plan_daily_schedule(tasks, target_date)]
+
+    identical = slots(orm_pending) == slots(record_pending)
+    print(f"\nidentical schedule ({len(record_pending):,} pending tasks due that day): {identical}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
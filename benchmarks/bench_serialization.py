@@ -0,0 +1,82 @@
+"""
+Compare the default Pydantic response path with the fast JSON path.
+
+Usage: python -m benchmarks.bench_serialization [--rows 5000] [--repeat 5]
+
+Runs against a throwaway SQLite database, reports rows/second for
+GET /tasks/ and GET /schedule/daily on both paths and checks that the
+response bodies are byte-for-byte identical.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.workload import WorkloadConfig, generate_tasks, insert_tasks
+
+
+def time_request(client, url: str, repeat: int):
+    """Return (best seconds, response body) for repeated GETs"""
+    best = float("inf")
+    body = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url)
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.text
+        best = min(best, elapsed)
+        body = response.content
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fast JSON response path")
+    parser.add_argument("--rows", type=int, default=5000, help="Number of tasks to seed")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per endpoint")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="sts-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    from fastapi.testclient import TestClient
+    from app import config
+    from app.database import SessionLocal, init_db
+    from app.main import app
+
+    workload = WorkloadConfig(rows=args.rows, deadline_distribution="target_day")
+    day = workload.target_date
+    init_db()
+    session = SessionLocal()
+    insert_tasks(session, generate_tasks(workload))
+    session.close()
+
+    client = TestClient(app)
+    endpoints = [
+        ("GET /tasks/", f"/tasks/?limit={args.rows}", args.rows),
+        ("GET /schedule/daily", f"/schedule/daily?date={day.date().isoformat()}", None),
+    ]
+
+    ok = True
+    for name, url, rows in endpoints:
+        config.FAST_JSON_RESPONSES = False
+        default_time, default_body = time_request(client, url, args.repeat)
+        config.FAST_JSON_RESPONSES = True
+        fast_time, fast_body = time_request(client, url, args.repeat)
+
+        identical = default_body == fast_body
+        ok = ok and identical
+        print(f"{name}")
+        if rows:
+            print(f"  default: {rows / default_time:12,.0f} rows/s ({default_time * 1000:.1f} ms)")
+            print(f"  fast:    {rows / fast_time:12,.0f} rows/s ({fast_time * 1000:.1f} ms)")
+        else:
+            print(f"  default: {default_time * 1000:.1f} ms")
+            print(f"  fast:    {fast_time * 1000:.1f} ms")
+        print(f"  speedup: {default_time / fast_time:.2f}x, identical output: {identical}")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Per-user query latency as the total number of tasks grows.
+
+Usage: python -m benchmarks.bench_tenancy [--users 1000 4000 16000] [--tasks-per-user 50]
+
+Every user owns the same number of tasks, so the table grows with the user
+count. With user_id leading the indexes, the per-user timings should stay
+flat while the total row count grows.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+from benchmarks.run import measure
+from benchmarks.workload import WorkloadConfig, create_database
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark per-user query latency")
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 4000, 16000], help="User counts")
+    parser.add_argument("--tasks-per-user", type=int, default=50, help="Tasks owned by every user")
+    parser.add_argument("--samples", type=int, default=200, help="Users sampled per measurement")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="sts-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'app.db')}"
+    from app import crud
+
+    print(f"{'users':>8} {'total rows':>12} {'get_tasks':>12} {'schedule':>12} {'report':>12}   (median ms per user)")
+    for users in args.users:
+        config = WorkloadConfig(
+            rows=users * args.tasks_per_user, users=users, deadline_distribution="target_day"
+        )
+        engine, Session, _ = create_database(config, workdir)
+        rng = random.Random(7)
+        sample = [rng.randint(1, users) for _ in range(args.samples)]
+        target_date = config.target_date.date()
+        session = Session()
+
+        def per_user(fn):
+            def run():
+                for user_id in sample:
+                    fn(user_id)
+            stats = measure(run, repeat=3)
+            return stats["median_ms"] / len(sample)
+
+        get_tasks = per_user(lambda user_id: crud.get_tasks(session, user_id=user_id))
+        schedule = per_user(lambda user_id: crud.generate_daily_schedule(session, target_date, user_id=user_id))
+        report = per_user(lambda user_id: crud.get_productivity_report(session, 30, user_id=user_id))
+        print(f"{users:>8} {config.rows:>12,} {get_tasks:>12.3f} {schedule:>12.3f} {report:>12.3f}")
+
+        session.close()
+        engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Compare read-modify-write task updates with the single-statement path.
+
+Usage: python -m benchmarks.bench_writes [--rows 1000] [--threads 8] [--ops 200] [--hot 4]
+
+Runs against a throwaway SQLite database and reports:
+- SQL statements per update / delete (counted with track_queries)
+- update throughput with several threads writing to a few hot tasks
+- lost updates when the threads increment a counter concurrently: the
+  read-modify-write path silently drops some, the versioned PATCH path
+  retries on conflict and keeps them all
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.workload import WorkloadConfig, generate_tasks, insert_tasks
+
+
+def read_modify_write_update(db, task_id, task_update, user_id):
+    """The previous crud.update_task: SELECT, set attributes, commit, refresh"""
+    from app import crud
+
+    db_task = crud.get_task(db, task_id, user_id)
+    if db_task is None:
+        return None
+    for field, value in task_update.dict(exclude_unset=True).items():
+        setattr(db_task, field, value)
+    db_task.version += 1
+    db.flush()
+    crud.record_task_event(db, "updated", db_task)
+    db.commit()
+    db.refresh(db_task)
+    return db_task
+
+
+def read_then_delete(db, task_id, user_id):
+    """The previous crud.delete_task: SELECT, then delete through the session"""
+    from app import crud, models
+
+    db_task = crud.get_task(db, task_id, user_id)
+    if db_task is None:
+        return False
+    db.delete(db_task)
+    crud.record_task_event(db, "deleted", db_task)
+    db.query(models.TaskDependency).filter(
+        (models.TaskDependency.task_id == task_id) | (models.TaskDependency.depends_on_id == task_id)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return True
+
+
+def count_statements(fn) -> int:
+    from app.query_stats import track_queries
+
+    with track_queries() as stats:
+        fn()
+    return stats.count
+
+
+def run_threads(threads: int, worker) -> float:
+    """Run worker(index) on several threads; returns the elapsed seconds"""
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-statement task updates")
+    parser.add_argument("--rows", type=int, default=1000, help="Number of tasks to seed")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent writers")
+    parser.add_argument("--ops", type=int, default=200, help="Updates per writer")
+    parser.add_argument("--hot", type=int, default=4, help="Tasks the writers contend on")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="sts-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    from sqlalchemy import select
+    from app import config, crud, models, schemas
+    from app.database import SessionLocal, engine, init_db
+    from app.query_stats import install_query_hooks
+
+    # Writers waiting on SQLite's lock would all be logged as slow queries
+    config.SLOW_QUERY_THRESHOLD_MS = float("inf")
+    init_db()
+    install_query_hooks(engine)
+    session = SessionLocal()
+    insert_tasks(session, generate_tasks(WorkloadConfig(rows=args.rows)))
+    user_id = session.execute(select(models.Task.user_id).limit(1)).scalar()
+    task_ids = session.execute(
+        select(models.Task.id).where(models.Task.user_id == user_id).order_by(models.Task.id)
+    ).scalars().all()
+    session.close()
+    hot_ids = task_ids[:args.hot]
+
+    print("Statements per operation")
+    db = SessionLocal()
+    change = schemas.TaskUpdate(priority=4)
+    rows = [
+        ("update (read-modify-write)", lambda: read_modify_write_update(db, hot_ids[0], change, user_id)),
+        ("update (single statement)", lambda: crud.update_task(db, hot_ids[0], change, user_id)),
+    ]
+    version = db.execute(select(models.Task.version).where(models.Task.id == hot_ids[0])).scalar()
+    rows.append(("update (with version)",
+                 lambda: crud.update_task(db, hot_ids[0], change, user_id, expected_version=version + 2)))
+    rows.append(("delete (read first)", lambda: read_then_delete(db, task_ids[-1], user_id)))
+    rows.append(("delete (single statement)", lambda: crud.delete_task(db, task_ids[-2], user_id)))
+    for name, fn in rows:
+        print(f"  {name:28s} {count_statements(fn)}")
+    db.close()
+
+    print(f"\nThroughput: {args.threads} threads x {args.ops} updates on {len(hot_ids)} tasks")
+    results = {}
+    for name, update in (("read-modify-write", read_modify_write_update), ("single statement", crud.update_task)):
+        def worker(index):
+            rng = random.Random(index)
+            worker_db = SessionLocal()
+            try:
+                for _ in range(args.ops):
+                    update(worker_db, rng.choice(hot_ids), schemas.TaskUpdate(priority=rng.randint(1, 5)), user_id)
+            finally:
+                worker_db.close()
+
+        elapsed = run_threads(args.threads, worker)
+        results[name] = args.threads * args.ops / elapsed
+        print(f"  {name:28s} {results[name]:10,.0f} updates/s")
+    print(f"  speedup: {results['single statement'] / results['read-modify-write']:.2f}x")
+
+    print(f"\nLost updates: {args.threads} threads x {args.ops} increments of one task")
+    counter_id = hot_ids[0]
+
+    def reset_counter():
+        reset_db = SessionLocal()
+        crud.update_task(reset_db, counter_id, schemas.TaskUpdate(estimated_duration=0), user_id)
+        reset_db.close()
+
+    def read_counter():
+        read_db = SessionLocal()
+        value = read_db.execute(select(models.Task.estimated_duration).where(models.Task.id == counter_id)).scalar()
+        read_db.close()
+        return value
+
+    def blind_increment(index):
+        worker_db = SessionLocal()
+        try:
+            for _ in range(args.ops):
+                task = crud.get_task(worker_db, counter_id, user_id)
+                worker_db.commit()
+                read_modify_write_update(
+                    worker_db, counter_id, schemas.TaskUpdate(estimated_duration=task.estimated_duration + 1), user_id
+                )
+        finally:
+            worker_db.close()
+
+    conflicts = [0] * args.threads
+
+    def versioned_increment(index):
+        worker_db = SessionLocal()
+        try:
+            for _ in range(args.ops):
+                while True:
+                    current, version = worker_db.execute(
+                        select(models.Task.estimated_duration, models.Task.version).where(models.Task.id == counter_id)
+                    ).one()
+                    worker_db.commit()
+                    try:
+                        crud.update_task(worker_db, counter_id, schemas.TaskUpdate(estimated_duration=current + 1),
+                                         user_id, expected_version=version)
+                        break
+                    except crud.TaskVersionConflict:
+                        worker_db.rollback()
+                        conflicts[index] += 1
+        finally:
+            worker_db.close()
+
+    expected = args.threads * args.ops
+    for name, worker in (("read-modify-write", blind_increment), ("versioned PATCH", versioned_increment)):
+        reset_counter()
+        elapsed = run_threads(args.threads, worker)
+        value = read_counter()
+        print(f"  {name:28s} {expected - value:6d} of {expected} lost ({elapsed:.2f}s)")
+    print(f"  conflicts retried by the versioned path: {sum(conflicts)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
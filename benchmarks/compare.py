@@ -0,0 +1,58 @@
+"""
+Compare two benchmark result files.
+
+Usage: python -m benchmarks.compare baseline.json candidate.json [--threshold 0.10]
+
+Exits with status 1 when any case's median got slower than the threshold.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        report = json.load(fh)
+    return {(r["name"], r["size"]): r for r in report["results"]}
+
+
+def compare(baseline: dict, candidate: dict, threshold: float):
+    """Yield (name, size, base_ms, new_ms, ratio, verdict) for shared cases"""
+    for key in sorted(baseline.keys() & candidate.keys(), key=lambda k: (k[1], k[0])):
+        base_ms = baseline[key]["median_ms"]
+        new_ms = candidate[key]["median_ms"]
+        ratio = new_ms / base_ms if base_ms else float("inf")
+        if ratio > 1 + threshold:
+            verdict = "slower"
+        elif ratio < 1 - threshold:
+            verdict = "faster"
+        else:
+            verdict = "same"
+        yield key[0], key[1], base_ms, new_ms, ratio, verdict
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change treated as noise")
+    args = parser.parse_args(argv)
+
+    baseline = load(args.baseline)
+    candidate = load(args.candidate)
+
+    regressions = 0
+    print(f"{'case':<40} {'size':>8} {'base ms':>10} {'new ms':>10} {'ratio':>7}")
+    for name, size, base_ms, new_ms, ratio, verdict in compare(baseline, candidate, args.threshold):
+        marker = {"slower": "  <-- slower", "faster": "  faster", "same": ""}[verdict]
+        print(f"{name:<40} {size:>8} {base_ms:>10.2f} {new_ms:>10.2f} {ratio:>6.2f}x{marker}")
+        regressions += verdict == "slower"
+
+    missing = baseline.keys() ^ candidate.keys()
+    if missing:
+        print(f"{len(missing)} case(s) only present in one of the files")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
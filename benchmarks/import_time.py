@@ -0,0 +1,91 @@
+"""
+Import-time budget check for the API worker.
+
+Usage: python -m benchmarks.import_time [--module app.main] [--budget-ms 1500]
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+fails (exit status 1) when the cumulative import time is over budget, when
+a heavy integration library is imported eagerly, or when importing created
+the database file.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+# Libraries that must only load when an integration is actually used
+LAZY_MODULES = ("telegram", "slack_sdk", "googleapiclient", "google_auth_oauthlib", "google.oauth2")
+# Cumulative import time of app.main allowed for a cold worker start
+BUDGET_MS = 1500
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Map module name -> cumulative import time in microseconds"""
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        try:
+            timings[name.strip()] = int(cumulative)
+        except ValueError:
+            continue  # header line
+    return timings
+
+
+def measure_import(module: str, runs: int = 3) -> tuple:
+    """Import module in fresh interpreters, returning (best ms, timings, db_created)"""
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best = None
+    for _ in range(runs):
+        workdir = tempfile.mkdtemp(prefix="sts-import-")
+        db_path = os.path.join(workdir, "import_check.db")
+        env = dict(os.environ, PYTHONPATH=repo_root, DATABASE_URL=f"sqlite:///{db_path}")
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=workdir, env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+        timings = parse_importtime(result.stderr)
+        total_ms = timings.get(module, 0) / 1000
+        if best is None or total_ms < best[0]:
+            best = (total_ms, timings, os.path.exists(db_path))
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the API worker's import-time budget")
+    parser.add_argument("--module", default="app.main", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="Maximum cumulative import time")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to try, best run counts")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args(argv)
+
+    total_ms, timings, db_created = measure_import(args.module, args.runs)
+
+    print(f"import {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    top_level = sorted(
+        ((name, us) for name, us in timings.items() if "." not in name and name != args.module),
+        key=lambda item: item[1], reverse=True
+    )
+    for name, us in top_level[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import took {total_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    eager = [name for name in timings if name.split(".")[0] in LAZY_MODULES or name in LAZY_MODULES]
+    if eager:
+        failures.append(f"heavy integration libraries imported eagerly: {', '.join(sorted(eager))}")
+    if db_created:
+        failures.append("importing created the database file; schema creation must be a startup step")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Benchmark suite runner.
+
+Usage:
+    python -m benchmarks.run --sizes 1000 10000 --output bench.json
+    python -m benchmarks.compare baseline.json bench.json
+
+Each size gets its own throwaway SQLite database filled by the seeded
+workload generator. CRUD functions are timed directly, endpoints through an
+in-process TestClient, and the Eisenhower utilities on the loaded tasks.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def measure(fn, repeat: int = 5, warmup: int = 1) -> dict:
+    """Time fn() and return summary statistics in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "repeat": repeat,
+        "min_ms": samples[0],
+        "median_ms": statistics.median(samples),
+        "mean_ms": statistics.fmean(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+        "max_ms": samples[-1],
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def crud_cases(Session, config):
+    """Benchmarks for the functions in app.crud"""
+    from sqlalchemy import select
+    from app import crud, models, schemas
+
+    target_date = config.target_date.date()
+    session = Session()
+    task_ids = session.execute(select(models.Task.id).limit(100)).scalars().all()
+
+    def create_task():
+        crud.create_task(session, schemas.TaskCreate(
+            title="Benchmark task", deadline=config.target_date + timedelta(hours=3), priority=4
+        ))
+
+    def update_task():
+        crud.update_task(session, task_ids[0], schemas.TaskUpdate(priority=5))
+
+    cases = {
+        "crud.get_tasks": lambda: crud.get_tasks(session, limit=100),
+        "crud.get_tasks_all": lambda: crud.get_tasks(session, limit=config.rows),
+        "crud.get_task": lambda: [crud.get_task(session, task_id) for task_id in task_ids[:20]],
+        "crud.create_task": create_task,
+        "crud.update_task": update_task,
+        "crud.generate_daily_schedule": lambda: crud.generate_daily_schedule(session, target_date),
+        "crud.get_productivity_report": lambda: crud.get_productivity_report(session, 7),
+    }
+    return session, cases
+
+
+def endpoint_cases(Session, config):
+    """Benchmarks for the API endpoints through an in-process client"""
+    from fastapi.testclient import TestClient
+    from sqlalchemy import select
+    from app import models
+    from app.database import get_db
+    from app.main import app
+    from app.task_index import task_priority_index
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    client = TestClient(app)
+    day = config.target_date.date().isoformat()
+
+    def get(url):
+        def call():
+            response = client.get(url)
+            assert response.status_code == 200, response.text
+        return call
+
+    session = Session()
+    hot_ids = session.execute(select(models.Task.id).limit(20)).scalars().all()
+    # Each size has its own database; index it like the API does at startup
+    task_priority_index.rebuild(session)
+    session.close()
+
+    def get_hot_tasks():
+        # The same 20 tasks every round, so repeats are served from the task cache
+        for task_id in hot_ids:
+            get(f"/tasks/{task_id}")()
+
+    cases = {
+        "GET /tasks/": get("/tasks/?limit=100"),
+        "GET /tasks/{id} (hot)": get_hot_tasks,
+        "GET /tasks/next": get("/tasks/next"),
+        "GET /tasks/ (all)": get(f"/tasks/?limit={config.rows}"),
+        "GET /schedule/daily": get(f"/schedule/daily?date={day}"),
+        "GET /analytics/productivity": get("/analytics/productivity?days=30"),
+    }
+    return client, cases
+
+
+def eisenhower_cases(Session, config):
+    """Benchmarks for the Eisenhower matrix utilities"""
+    from app.crud import load_task_records
+    from app.utils.eisenhower_matrix import prioritize_by_eisenhower, categorize_task, calculate_urgency
+
+    session = Session()
+    tasks = load_task_records(session)
+    session.close()
+
+    cases = {
+        "eisenhower.prioritize_by_eisenhower": lambda: prioritize_by_eisenhower(tasks),
+        "eisenhower.categorize_task": lambda: [categorize_task(task) for task in tasks],
+        "eisenhower.calculate_urgency": lambda: [calculate_urgency(task) for task in tasks],
+    }
+    return cases
+
+
+def run_size(size: int, args, workdir: str) -> list:
+    from benchmarks.workload import WorkloadConfig, create_database
+
+    config = WorkloadConfig(rows=size, seed=args.seed, deadline_distribution=args.distribution)
+    started = time.perf_counter()
+    engine, Session, _ = create_database(config, workdir)
+    print(f"[{size} rows] database ready in {time.perf_counter() - started:.1f}s")
+
+    results = []
+
+    def record(group, cases):
+        for name, fn in cases.items():
+            if args.filter and args.filter not in name:
+                continue
+            stats = measure(fn, repeat=args.repeat, warmup=args.warmup)
+            results.append({"name": name, "group": group, "size": size, **stats})
+            print(f"  {name:<40} median {stats['median_ms']:9.2f} ms   p95 {stats['p95_ms']:9.2f} ms")
+
+    session, cases = crud_cases(Session, config)
+    record("crud", cases)
+    session.close()
+
+    client, cases = endpoint_cases(Session, config)
+    record("endpoints", cases)
+    client.app.dependency_overrides.clear()
+
+    record("eisenhower", eisenhower_cases(Session, config))
+
+    engine.dispose()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Smart Task Scheduler benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Task counts to benchmark")
+    parser.add_argument("--seed", type=int, default=42, help="Workload generator seed")
+    parser.add_argument("--distribution", default="target_day", help="Deadline distribution")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per case")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed warmup runs per case")
+    parser.add_argument("--filter", default=None, help="Only run cases whose name contains this string")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="sts-bench-")
+    # Keep the app's own engine away from the real database
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'app.db')}"
+
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(size, args, workdir))
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "distribution": args.distribution,
+            "sizes": args.sizes,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
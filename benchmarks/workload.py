@@ -0,0 +1,145 @@
+"""
+Seeded synthetic workload generator.
+
+The same WorkloadConfig always produces the same rows, so two benchmark runs
+on different commits see identical data.
+"""
+import os
+import random
+import tempfile
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+DEADLINE_DISTRIBUTIONS = ("uniform", "target_day", "clustered")
+
+TITLE_WORDS = ["Review", "Write", "Plan", "Call", "Fix", "Prepare", "Email", "Design", "Test", "Deploy"]
+TITLE_OBJECTS = ["report", "slides", "budget", "client", "bug", "meeting", "résumé", "roadmap", "invoice", "release"]
+
+
+@dataclass
+class WorkloadConfig:
+    rows: int = 1000
+    seed: int = 42
+    # Tasks are spread evenly over user ids 1..users
+    users: int = 1
+    # Day the schedule and analytics benchmarks look at
+    target_date: datetime = datetime(2030, 1, 15)
+    # uniform: spread over [-days_back, +days_ahead]; target_day: half of all
+    # deadlines on target_date; clustered: bunched around a few busy days
+    deadline_distribution: str = "uniform"
+    days_back: int = 30
+    days_ahead: int = 30
+    no_deadline_ratio: float = 0.1
+    status_mix: Dict[str, float] = field(default_factory=lambda: {
+        "pending": 0.5, "in_progress": 0.15, "completed": 0.3, "cancelled": 0.05
+    })
+    source_mix: Dict[str, float] = field(default_factory=lambda: {
+        "manual": 0.6, "google_calendar": 0.25, "todoist": 0.15
+    })
+
+    def to_dict(self):
+        data = asdict(self)
+        data["target_date"] = self.target_date.isoformat()
+        return data
+
+
+def _weighted(rng: random.Random, mix: Dict[str, float]) -> str:
+    return rng.choices(list(mix), weights=list(mix.values()))[0]
+
+
+def _deadline(rng: random.Random, config: WorkloadConfig, clusters) -> datetime:
+    day = config.target_date
+    if config.deadline_distribution == "target_day" and rng.random() < 0.5:
+        return day + timedelta(minutes=rng.randint(0, 24 * 60 - 1))
+    if config.deadline_distribution == "clustered":
+        center = rng.choice(clusters)
+        return center + timedelta(minutes=int(rng.gauss(0, 180)))
+    span = (config.days_back + config.days_ahead) * 24 * 60
+    return day - timedelta(days=config.days_back) + timedelta(minutes=rng.randint(0, span))
+
+
+def generate_tasks(config: WorkloadConfig) -> Iterator[dict]:
+    """Yield task column dicts for the configured workload"""
+    if config.deadline_distribution not in DEADLINE_DISTRIBUTIONS:
+        raise ValueError(f"Unknown deadline distribution: {config.deadline_distribution}")
+
+    rng = random.Random(config.seed)
+    clusters = [
+        config.target_date + timedelta(days=offset, hours=12)
+        for offset in rng.sample(range(-config.days_back, config.days_ahead + 1), 5)
+    ]
+
+    for i in range(config.rows):
+        status = _weighted(rng, config.status_mix)
+        created_at = config.target_date - timedelta(
+            days=rng.randint(0, config.days_back), seconds=rng.randint(0, 86399)
+        )
+        deadline = None if rng.random() < config.no_deadline_ratio else _deadline(rng, config, clusters)
+        estimated_duration = rng.choice([15, 25, 30, 45, 60, 90, 120])
+
+        completed_at = None
+        actual_duration = None
+        if status == "completed":
+            completed_at = created_at + timedelta(hours=rng.randint(1, 72))
+            actual_duration = max(5, int(estimated_duration * rng.uniform(0.5, 1.8)))
+
+        yield dict(
+            user_id=i % config.users + 1,
+            title=f"{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_OBJECTS)} #{i}",
+            description=rng.choice([None, "", "Follow up with the team", "Line one\nline \"two\""]),
+            deadline=deadline,
+            priority=rng.randint(1, 5),
+            urgent=rng.random() < 0.3,
+            important=rng.random() < 0.5,
+            status=status,
+            estimated_duration=estimated_duration,
+            actual_duration=actual_duration,
+            completed_at=completed_at,
+            created_at=created_at,
+            updated_at=completed_at or created_at,
+            source=_weighted(rng, config.source_mix),
+        )
+
+
+def insert_tasks(session, rows, batch_size: int = 5000) -> int:
+    """Bulk insert generated rows, returning the number inserted"""
+    from app.models import Task
+
+    batch = []
+    inserted = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            session.bulk_insert_mappings(Task, batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        session.bulk_insert_mappings(Task, batch)
+        inserted += len(batch)
+    session.commit()
+    return inserted
+
+
+def create_database(config: WorkloadConfig, directory: str = None) -> Tuple[object, sessionmaker, str]:
+    """Create a throwaway SQLite database filled with the configured workload"""
+    from app.database import Base
+
+    directory = directory or tempfile.mkdtemp(prefix="sts-bench-")
+    path = os.path.join(directory, f"workload-{config.rows}-{config.seed}.db")
+    if os.path.exists(path):
+        os.remove(path)
+
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    session = Session()
+    try:
+        insert_tasks(session, generate_tasks(config))
+    finally:
+        session.close()
+    return engine, Session, path
@@ -1,55 +1,82 @@
+import os
 import subprocess
 import sys
-import threading
 import time
 import argparse
-from pathlib import Path
+import urllib.error
+import urllib.request
 
-def run_api():
-    """Run the FastAPI backend"""
-    import uvicorn
-    from app.main import app
-    
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+from app import config
 
-def run_frontend():
+def run_api(args):
+    """Run the FastAPI backend on one or more worker processes"""
+    from app.server import serve
+
+    serve(args.host, args.port, args.workers)
+
+def run_frontend(api_url: str = None):
     """Run the Streamlit frontend"""
-    import subprocess
-    subprocess.run([sys.executable, "-m", "streamlit", "run", "app/frontend.py", "--server.port", "8501"])
+    env = dict(os.environ)
+    if api_url:
+        env.setdefault("API_BASE_URL", api_url)
+        env.setdefault("PUBLIC_API_URL", api_url)
+    subprocess.run([sys.executable, "-m", "streamlit", "run", "app/frontend.py", "--server.port", "8501"], env=env)
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 60) -> bool:
+    """Poll the API's /health endpoint until it answers 200; False if it exited or timed out"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.2)
+    return False
 
 def main():
     parser = argparse.ArgumentParser(description="Run Smart Task Scheduler")
-    parser.add_argument("--mode", choices=["api", "frontend", "both"], default="both", 
+    parser.add_argument("--mode", choices=["api", "frontend", "both"], default="both",
                        help="Run mode: api only, frontend only, or both")
-    
+    parser.add_argument("--host", default="0.0.0.0", help="API bind address")
+    parser.add_argument("--port", type=int, default=8000, help="API port")
+    parser.add_argument("--workers", type=int, default=config.API_WORKERS,
+                        help="API worker processes (default: API_WORKERS, 1)")
+
     args = parser.parse_args()
-    
+
     if args.mode == "api":
         print("Starting API server...")
-        run_api()
+        run_api(args)
     elif args.mode == "frontend":
         print("Starting frontend...")
         run_frontend()
     else:  # both
         print("Starting both API and frontend...")
-        
-        # Create the database file if it doesn't exist
-        db_path = Path("smart_task_scheduler.db")
-        if not db_path.exists():
-            print("Creating database...")
-            from app.database import Base, engine
-            Base.metadata.create_all(bind=engine)
-        
-        # Start API in a separate thread
-        api_thread = threading.Thread(target=run_api)
-        api_thread.daemon = True
-        api_thread.start()
-        
-        # Wait a moment for API to start
-        time.sleep(2)
-        
-        # Run frontend in main thread
-        run_frontend()
+
+        # The API runs in its own process so it can drain on shutdown
+        api = subprocess.Popen([
+            sys.executable, "-m", "app.server",
+            "--host", args.host, "--port", str(args.port), "--workers", str(args.workers)
+        ])
+        api_url = f"http://localhost:{args.port}"
+        try:
+            if not wait_until_ready(api_url, api):
+                print("API did not become ready, see its output above")
+                sys.exit(1)
+
+            # Run frontend in main thread
+            run_frontend(api_url)
+        finally:
+            # SIGTERM lets the workers finish in-flight requests
+            api.terminate()
+            try:
+                api.wait(timeout=config.GRACEFUL_TIMEOUT + 5)
+            except subprocess.TimeoutExpired:
+                api.kill()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,35 @@
+"""Shared fixtures: each test gets an empty database and fresh per-process state"""
+import os
+import tempfile
+
+import pytest
+
+# Set before anything imports app.config
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='sts-tests-'), 'test.db')}"
+
+
+@pytest.fixture
+def db():
+    from app.database import Base, SessionLocal, engine, init_db
+    from app.task_cache import task_cache
+    from app.task_index import task_priority_index
+    from app.utils.dependency_graph import dependency_graphs
+
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    task_priority_index.clear()
+    task_cache.clear()
+    dependency_graphs.clear()
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,37 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app import models
+
+
+@pytest.fixture
+def server_timezone(monkeypatch):
+    """Run the server clock in a given zone: local = UTC + hours"""
+    def set_zone(hours):
+        # POSIX TZ offsets are west of UTC, hence the sign flip
+        monkeypatch.setenv("TZ", f"UTC{-hours:+d}")
+        time.tzset()
+    yield set_zone
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.mark.parametrize("hours, completed_local, on_time", [
+    (5, 13, 0.0),   # an hour late; UTC says 08:00, before the 12:00 deadline
+    (-5, 11, 1.0),  # an hour early; UTC says 16:00, after the 12:00 deadline
+])
+def test_on_time_rate_compares_on_one_clock(client, db, server_timezone, hours, completed_local, on_time):
+    server_timezone(hours)
+    today = datetime.now().replace(minute=0, second=0, microsecond=0)
+    deadline = today.replace(hour=12)
+    task = client.post("/tasks/", json={"title": "Due at noon", "deadline": deadline.isoformat()}).json()
+    completed_at = today.replace(hour=completed_local) - timedelta(hours=hours)  # stored in UTC
+    db.execute(update(models.Task).where(models.Task.id == task["id"])
+               .values(status="completed", completed_at=completed_at))
+    db.commit()
+
+    series = client.get("/analytics/timeseries", params={"days": 3, "metric": "on_time_rate"}).json()["series"]
+    assert [rate for rate in series["on_time_rate"] if rate is not None] == [on_time]
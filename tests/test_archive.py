@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import MetaData, text, update
+
+from app import models
+from app.archive import archive_batch, prune_events_batch
+from app.events import TaskEventBroker
+from app.database import Base, engine, init_db
+
+
+def finish(client, task_id):
+    client.put(f"/tasks/{task_id}", json={"status": "completed"})
+
+
+def archive_all(db):
+    return archive_batch(db, datetime.utcnow() + timedelta(seconds=1), 100)
+
+
+def test_ids_of_archived_tasks_are_not_reused(client, db):
+    ids = [client.post("/tasks/", json={"title": f"Task {i}"}).json()["id"] for i in range(3)]
+    finish(client, ids[0])
+    finish(client, ids[1])
+    assert archive_all(db) == 2
+
+    # Deleting the newest task must not let the next one take an archived id
+    assert client.delete(f"/tasks/{ids[2]}").status_code == 200
+    new_id = client.post("/tasks/", json={"title": "After delete"}).json()["id"]
+    assert new_id not in ids
+
+    finish(client, new_id)
+    assert archive_all(db) == 1
+    listed = [task["id"] for task in client.get("/tasks/", params={"include_archived": True}).json()]
+    assert sorted(listed) == sorted([ids[0], ids[1], new_id])
+
+
+def test_init_db_adds_autoincrement_to_an_existing_tasks_table(db):
+    # A tasks table as created before ids were reserved, plus an archived task above its ids
+    Base.metadata.drop_all(bind=engine)
+    legacy = Base.metadata.tables["tasks"].to_metadata(MetaData())
+    legacy.dialect_options["sqlite"]["autoincrement"] = False
+    legacy.create(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db.add(models.Task(title="Live"))
+    db.add(models.TaskArchive(id=50, user_id=1, title="Archived", status="completed", archived_at=datetime.utcnow()))
+    db.commit()
+
+    init_db()
+
+    with engine.connect() as conn:
+        ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tasks'")).scalar()
+    assert "AUTOINCREMENT" in ddl
+    assert [task.title for task in db.query(models.Task)] == ["Live"]
+    new_task = models.Task(title="New")
+    db.add(new_task)
+    db.commit()
+    assert new_task.id == 51
+
+
+def test_old_events_are_pruned_and_resuming_clients_reset(client, db):
+    ids = [client.post("/tasks/", json={"title": f"Task {i}"}).json()["id"] for i in range(3)]
+    before = client.get("/events/tasks").json()["last_id"]
+    db.execute(update(models.TaskEvent).values(created_at=datetime.utcnow() - timedelta(days=30)))
+    db.commit()
+
+    assert prune_events_batch(db, datetime.utcnow() - timedelta(days=7), 1) == 1
+    assert prune_events_batch(db, datetime.utcnow() - timedelta(days=7), 100) == 1
+    # The newest event stays so ids keep increasing
+    assert [event.id for event in db.query(models.TaskEvent)] == [before]
+
+    assert client.get("/events/tasks", params={"since": 0}).json()["reset"] is True
+    assert TaskEventBroker().replay(1, 0, 1000) is None
+    client.put(f"/tasks/{ids[0]}", json={"title": "Renamed"})
+    log = client.get("/events/tasks", params={"since": before - 1}).json()
+    assert log["reset"] is False
+    assert [event["type"] for event in log["events"]] == ["created", "updated"]
+    assert len(TaskEventBroker().replay(1, before, 1000)) == 1
+
+
+def test_archived_occurrences_are_not_expanded_or_materialized_again(client, db):
+    dtstart = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    template = client.post("/recurring-tasks/", json={
+        "title": "Standup", "rrule": "FREQ=DAILY;COUNT=2", "dtstart": dtstart.isoformat()
+    }).json()
+    url = f"/recurring-tasks/{template['id']}/occurrences/{dtstart.isoformat()}"
+    assert client.put(url, json={"status": "completed"}).status_code == 200
+    assert archive_all(db) == 1
+
+    window = {"start": dtstart.isoformat(), "end": (dtstart + timedelta(days=2)).isoformat()}
+    for include_archived, archived_tasks in ((False, 0), (True, 1)):
+        listed = client.get("/tasks/range", params=dict(window, include_archived=include_archived)).json()
+        assert len(listed["tasks"]) == archived_tasks
+        assert [occurrence["occurrence_start"] for occurrence in listed["occurrences"]] == \
+            [(dtstart + timedelta(days=1)).isoformat()]
+
+    assert client.put(url, json={"status": "pending"}).status_code == 409
+    assert db.query(models.Task).count() == 0
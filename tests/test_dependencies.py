@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app import crud, models
+
+
+def make_tasks(client, count, deadline=None):
+    deadline = deadline or datetime.now().replace(hour=17, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return [
+        client.post("/tasks/", json={"title": f"Task {i}", "deadline": deadline.isoformat(),
+                                     "estimated_duration": 30}).json()["id"]
+        for i in range(count)
+    ]
+
+
+def test_cycle_through_an_edge_added_by_another_worker_is_rejected(client, db):
+    first, second, third = make_tasks(client, 3)
+    assert client.post(f"/tasks/{first}/dependencies", json={"depends_on_id": second}).status_code == 200
+
+    # Another worker adds second -> third; this process's graph is now stale
+    db.add(models.TaskDependency(task_id=second, depends_on_id=third, user_id=1))
+    db.commit()
+
+    response = client.post(f"/tasks/{third}/dependencies", json={"depends_on_id": first})
+    assert response.status_code == 409
+    assert db.query(models.TaskDependency).filter_by(task_id=third).count() == 0
+    assert client.get(f"/tasks/{second}/dependencies").json()["depends_on"] == [third]
+
+
+def test_completion_on_another_worker_unblocks_dependents(client, db):
+    first, second = make_tasks(client, 2)
+    client.post(f"/tasks/{second}/dependencies", json={"depends_on_id": first})
+    day = (datetime.now() + timedelta(days=1)).date().isoformat()
+    schedule = client.get("/schedule/daily", params={"date": day}).json()["schedule"]
+    assert [item["task_id"] for item in schedule] == [first, second]
+
+    # Another worker completes the first task: the row changes and an event is logged
+    row = db.execute(
+        update(models.Task).where(models.Task.id == first).values(status="completed", version=models.Task.version + 1)
+        .returning(*(getattr(models.Task, field) for field in crud.TASK_RESPONSE_FIELDS))
+    ).first()
+    crud.record_task_event(db, "updated", row)
+    db.commit()
+
+    assert crud.get_blocking_dependencies(db, [1]) == {}
+    assert crud.dependency_graphs.get(db, 1).unfinished_predecessors([second]) == {}
+    schedule = client.get("/schedule/daily", params={"date": day}).json()["schedule"]
+    assert [item["task_id"] for item in schedule] == [second]
+
+
+def test_persisted_cycle_does_not_break_reads(client, db):
+    first, second = make_tasks(client, 2)
+    db.add_all([models.TaskDependency(task_id=first, depends_on_id=second, user_id=1),
+                models.TaskDependency(task_id=second, depends_on_id=first, user_id=1)])
+    db.commit()
+
+    day = (datetime.now() + timedelta(days=1)).date().isoformat()
+    assert client.get("/schedule/daily", params={"date": day}).status_code == 200
+    assert client.get("/tasks/critical-path").status_code == 200
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import MetaData, text
+
+from app import export, models
+from app.database import Base, engine, init_db
+from app.export import export_snapshot, read_snapshot
+
+pytest.importorskip("pyarrow")
+
+
+def add_tasks(db, user_id, count):
+    tasks = [models.Task(user_id=user_id, title=f"User {user_id} task {i}") for i in range(count)]
+    db.add_all(tasks)
+    db.commit()
+    return tasks
+
+
+def test_incremental_export_pages_each_user_on_the_index(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "SAFETY_LAG", timedelta(0))
+    add_tasks(db, 1, 3)
+    changed = add_tasks(db, 2, 2)[0]
+    assert export_snapshot(db, str(tmp_path), "arrow", chunk_size=2, progress=lambda _: None) == 5
+
+    changed.title = "Renamed"
+    db.commit()
+    add_tasks(db, 1, 1)
+    assert export_snapshot(db, str(tmp_path), "arrow", chunk_size=2, progress=lambda _: None) == 2
+
+    snapshot = read_snapshot(str(tmp_path))
+    assert snapshot.num_rows == 6
+    assert "Renamed" in snapshot["title"].to_pylist()
+
+    with engine.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM tasks WHERE user_id = 1 AND updated_at <= :until "
+            "ORDER BY updated_at, id LIMIT 2"
+        ), {"until": datetime.utcnow()}).all()
+    assert "ix_tasks_user_updated_at" in " ".join(row[-1] for row in plan)
+
+
+def test_init_db_backfills_missing_updated_at(db):
+    # A tasks table from before updated_at was required, with a row that never got one
+    Base.metadata.drop_all(bind=engine)
+    legacy = Base.metadata.tables["tasks"].to_metadata(MetaData())
+    legacy.c.updated_at.nullable = True
+    legacy.create(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    created_at = datetime(2024, 1, 2, 3, 4, 5)
+    with engine.begin() as conn:
+        conn.execute(legacy.insert().values(title="Legacy", created_at=created_at, updated_at=None))
+
+    init_db()
+
+    assert [task.updated_at for task in db.query(models.Task)] == [created_at]
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+from benchmarks.import_time import BUDGET_MS, LAZY_MODULES, parse_importtime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_app(tmp_path):
+    """Import app.main in a fresh interpreter: (cumulative ms, lazy modules loaded, db file created)"""
+    db_path = tmp_path / "import_check.db"
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, DATABASE_URL=f"sqlite:///{db_path}")
+    code = ("import sys, app.main; "
+            f"print(' '.join(name for name in {LAZY_MODULES!r} if name in sys.modules))")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
+    return parse_importtime(result.stderr)["app.main"] / 1000, result.stdout.split(), db_path.exists()
+
+
+def test_import_is_within_budget(tmp_path):
+    # Best of three, so one slow run on a busy machine doesn't fail the suite
+    best_ms = min(import_app(tmp_path)[0] for _ in range(3))
+    assert best_ms <= BUDGET_MS
+
+
+def test_import_leaves_integrations_and_database_alone(tmp_path):
+    _, loaded, db_created = import_app(tmp_path)
+    assert loaded == []
+    assert not db_created
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app import config, crud, models
+from app.archive import archive_batch
+from app.utils.duration_estimator import MIN_SAMPLES, DurationEstimator
+
+
+def schedule_with_history(client, monkeypatch):
+    """Tasks that took twice their estimate, then the schedule of a new 30 minute task"""
+    monkeypatch.setattr(crud, "duration_estimator", DurationEstimator())
+    for i in range(MIN_SAMPLES):
+        task = client.post("/tasks/", json={"title": f"Done {i}", "estimated_duration": 30}).json()
+        client.put(f"/tasks/{task['id']}", json={"status": "completed", "actual_duration": 60})
+    deadline = datetime.now().replace(hour=17, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    client.post("/tasks/", json={"title": "New", "deadline": deadline.isoformat(), "estimated_duration": 30})
+    return client.get("/schedule/daily", params={"date": deadline.date().isoformat()}).json()["schedule"]
+
+
+def test_entered_estimates_are_used_by_default(client, monkeypatch):
+    assert config.LEARNED_DURATIONS is False
+    assert [item["duration"] for item in schedule_with_history(client, monkeypatch)] == [30]
+
+
+def test_learned_durations_when_enabled(client, monkeypatch):
+    monkeypatch.setattr(config, "LEARNED_DURATIONS", True)
+    assert [item["duration"] for item in schedule_with_history(client, monkeypatch)] == [60]
+
+
+def complete_tasks(client, actual_duration=None):
+    ids = []
+    for i in range(MIN_SAMPLES):
+        task = client.post("/tasks/", json={"title": f"Done {i}", "estimated_duration": 30}).json()
+        changes = {"status": "completed"}
+        if actual_duration is not None:
+            changes["actual_duration"] = actual_duration
+        client.put(f"/tasks/{task['id']}", json=changes)
+        ids.append(task["id"])
+    return ids
+
+
+def scheduled_durations(client):
+    deadline = datetime.now().replace(hour=17, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    day = deadline.date().isoformat()
+    if not client.get("/schedule/daily", params={"date": day}).json()["schedule"]:
+        client.post("/tasks/", json={"title": "New", "deadline": deadline.isoformat(), "estimated_duration": 30})
+    return [item["duration"] for item in client.get("/schedule/daily", params={"date": day}).json()["schedule"]]
+
+
+def test_late_actual_duration_and_reverted_completion(client, monkeypatch):
+    monkeypatch.setattr(config, "LEARNED_DURATIONS", True)
+    monkeypatch.setattr(crud, "duration_estimator", DurationEstimator())
+    ids = complete_tasks(client)
+    assert scheduled_durations(client) == [30]
+
+    # Actual durations reported after the tasks were completed still count
+    for task_id in ids:
+        client.put(f"/tasks/{task_id}", json={"actual_duration": 60})
+    assert scheduled_durations(client) == [60]
+
+    # Reopening one leaves too few samples
+    client.put(f"/tasks/{ids[0]}", json={"status": "pending"})
+    assert scheduled_durations(client) == [30]
+
+
+def test_archived_history_and_changes_by_other_processes(client, db, monkeypatch):
+    monkeypatch.setattr(config, "LEARNED_DURATIONS", True)
+    monkeypatch.setattr(crud, "duration_estimator", DurationEstimator(ttl=0))
+    ids = complete_tasks(client, actual_duration=60)
+    archive_batch(db, datetime.utcnow() + timedelta(seconds=1), 100)
+    assert scheduled_durations(client) == [60]
+
+    # Another worker's completions are seen once the statistics expire
+    db.execute(update(models.TaskArchive).where(models.TaskArchive.id.in_(ids)).values(actual_duration=90))
+    db.commit()
+    assert scheduled_durations(client) == [90]
@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+from app.metrics import MetricsRegistry
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_first_metrics_request_of_a_fresh_process(tmp_path):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, DATABASE_URL=f"sqlite:///{tmp_path / 'metrics.db'}")
+    code = ("from fastapi.testclient import TestClient; from app.main import app; "
+            "response = TestClient(app).get('/metrics'); print(response.status_code); print(response.text)")
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
+    status, body = result.stdout.split("\n", 1)
+    assert status == "200"
+    assert "notification_queue_depth" in body
+    assert "# TYPE notification_messages_total counter" in body
+
+
+def test_render_tolerates_metrics_registered_by_a_gauge():
+    registry = MetricsRegistry()
+
+    def register_more():
+        registry.counter("registered_late_total", "Registered while rendering")
+        return 1
+
+    registry.gauge("registering_gauge", "Registers a metric when read", register_more)
+    assert "registering_gauge 1" in registry.render()
+    assert "registered_late_total" in registry.render()
+
+
+def test_query_histograms_are_labelled_by_method(client):
+    client.post("/tasks/", json={"title": "Labelled"})
+    client.get("/tasks/")
+    body = client.get("/metrics").text
+    assert 'db_queries_per_request_count{method="POST",route="/tasks/"}' in body
+    assert 'db_queries_per_request_count{method="GET",route="/tasks/"}' in body
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from app.notifications import NotificationCoalescer, TaskNotification
+
+RECIPIENT = ("slack", "#general")
+
+
+def make_coalescer():
+    delivered = []
+    coalescer = NotificationCoalescer(
+        3600, lambda recipient, notifications, loop: delivered.append((recipient, notifications)),
+        task_states=lambda task_ids: {task_id: "pending" for task_id in task_ids},
+    )
+    return coalescer, delivered
+
+
+def notification(kind, title, task_id=1):
+    return TaskNotification(kind, task_id, title, 3, None, datetime.now() + timedelta(minutes=15))
+
+
+def test_reminder_does_not_replace_a_queued_upcoming_notice():
+    coalescer, delivered = make_coalescer()
+    coalescer.add(RECIPIENT, notification("upcoming", "Starts soon"))
+    coalescer.add(RECIPIENT, notification("reminder", "First reminder"))
+    coalescer.add(RECIPIENT, notification("reminder", "Second reminder"))
+    coalescer.flush()
+
+    assert [(n.kind, n.title) for _, batch in delivered for n in batch] == [
+        ("upcoming", "Starts soon"), ("reminder", "Second reminder")
+    ]
+
+
+def test_discard_drops_every_kind_for_the_task():
+    coalescer, delivered = make_coalescer()
+    coalescer.add(RECIPIENT, notification("upcoming", "Starts soon"))
+    coalescer.add(RECIPIENT, notification("reminder", "Reminder"))
+    coalescer.add(RECIPIENT, notification("reminder", "Other task", task_id=2))
+    coalescer.discard(1)
+    coalescer.flush()
+
+    assert [n.task_id for _, batch in delivered for n in batch] == [2]
@@ -0,0 +1,67 @@
+import json
+from datetime import datetime, timedelta
+
+from app import crud, models, planner, schemas
+from app.crud import load_task_records
+from app.planner import plan_partition
+
+
+def test_placements_bump_version_and_write_events(client, db):
+    deadline = datetime.now().replace(hour=17, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    task = client.post("/tasks/", json={"title": "Write report", "deadline": deadline.isoformat(),
+                                         "estimated_duration": 60}).json()
+    last_event = db.query(models.TaskEvent).count()
+
+    assert plan_partition(db, deadline.date(), [1]) == (1, 1)
+
+    planned = client.get(f"/tasks/{task['id']}").json()
+    assert planned["scheduled_start"] is not None
+    assert planned["version"] == task["version"] + 1
+    events = db.query(models.TaskEvent).order_by(models.TaskEvent.id).offset(last_event).all()
+    assert [(event.task_id, event.event_type) for event in events] == [(task["id"], "updated")]
+    assert json.loads(events[0].payload)["scheduled_start"] == planned["scheduled_start"]
+
+    # A client still holding the old version must not overwrite the placement
+    response = client.patch(f"/tasks/{task['id']}", json={"title": "Stale", "version": task["version"]})
+    assert response.status_code == 409
+
+
+def test_unchanged_placements_are_not_rewritten(db):
+    deadline = datetime.now().replace(hour=17, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    task = crud.create_task(db, schemas.TaskCreate(title="Review", deadline=deadline))
+    plan_partition(db, deadline.date(), [1])
+    db.query(models.PlannerCheckpoint).delete()
+    db.commit()
+    events = db.query(models.TaskEvent).count()
+
+    plan_partition(db, deadline.date(), [1])
+
+    db.refresh(task)
+    assert task.version == 2
+    assert db.query(models.TaskEvent).count() == events
+
+
+def test_tasks_changed_while_planning_are_not_overwritten(client, db, monkeypatch):
+    deadline = datetime.now().replace(hour=17, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    edited, cancelled, untouched = [
+        client.post("/tasks/", json={"title": title, "deadline": deadline.isoformat()}).json()["id"]
+        for title in ("Edited", "Cancelled", "Untouched")
+    ]
+
+    def load_then_edit(*args, **kwargs):
+        records = load_task_records(*args, **kwargs)
+        # Another client changes two of the tasks after the planner read them
+        client.put(f"/tasks/{edited}", json={"title": "Edited meanwhile"})
+        client.put(f"/tasks/{cancelled}", json={"status": "in_progress"})
+        client.put(f"/tasks/{cancelled}", json={"status": "cancelled"})
+        return records
+
+    monkeypatch.setattr(planner, "load_task_records", load_then_edit)
+    assert plan_partition(db, deadline.date(), [1]) == (1, 1)
+
+    tasks = {task["id"]: task for task in client.get("/tasks/").json()}
+    assert (tasks[edited]["title"], tasks[edited]["version"], tasks[edited]["scheduled_start"]) == \
+        ("Edited meanwhile", 2, None)
+    assert (tasks[cancelled]["status"], tasks[cancelled]["version"], tasks[cancelled]["scheduled_start"]) == \
+        ("cancelled", 3, None)
+    assert tasks[untouched]["scheduled_start"] is not None
@@ -0,0 +1,68 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app import models
+from app.events import PomodoroBroadcaster
+from app.utils.pomodoro_timer import PomodoroTimerManager
+
+
+def test_processes_share_the_timer(db):
+    # One manager per API worker process
+    first, second = PomodoroTimerManager(), PomodoroTimerManager()
+    assert first.start_timer() is True
+    assert second.start_timer() is False  # already running
+    status = second.get_status()
+    assert status.is_active and 1499 <= status.remaining_time <= 1500
+
+    second.pause_timer()
+    assert first.get_status().is_active is False
+
+
+def test_an_ended_session_completes_once(db):
+    first, second = PomodoroTimerManager(), PomodoroTimerManager()
+    completions = []
+    first.on_session_complete = second.on_session_complete = completions.append
+    first.start_timer()
+    db.execute(update(models.PomodoroState).values(ends_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+
+    for manager in (second, first, second):
+        status = manager.get_status()
+        assert (status.is_active, status.is_working, status.current_session, status.remaining_time) == \
+            (False, False, 2, 300)
+    assert completions == [False]
+
+
+def test_streams_follow_changes_made_by_other_processes(db):
+    async def follow():
+        broadcaster = PomodoroBroadcaster(PomodoroTimerManager(), poll_interval=0.05)
+        stream = broadcaster.stream()
+        first = await stream.__anext__()
+        await asyncio.to_thread(PomodoroTimerManager().start_timer)  # on another worker
+        changed = await asyncio.wait_for(stream.__anext__(), 2)
+        await stream.aclose()
+        return first, changed
+
+    first, changed = asyncio.run(follow())
+    assert '"active":false' in first
+    assert changed.startswith("event: state\n")
+    assert json.loads(changed.split("data: ", 1)[1])["active"] is True
+
+
+def test_failing_listener_is_logged(db, caplog):
+    manager = PomodoroTimerManager()
+    heard = []
+
+    def broken(state):
+        raise RuntimeError("listener bug")
+
+    manager.add_listener(broken)
+    manager.add_listener(heard.append)
+    manager.start_timer()
+
+    assert [state["active"] for state in heard] == [True]
+    assert "Pomodoro listener failed" in caplog.text
+    assert "listener bug" in caplog.text
@@ -0,0 +1,79 @@
+from app import config, models
+
+
+def make_tasks(client, count, user_id=1):
+    return [client.post("/tasks/", json={"title": f"Task {i}"}, headers={"X-User-Id": str(user_id)}).json()["id"]
+            for i in range(count)]
+
+
+def test_patch_with_a_stale_version_conflicts(client):
+    task = client.post("/tasks/", json={"title": "Draft"}).json()
+    client.patch(f"/tasks/{task['id']}", json={"title": "Edited elsewhere"})
+
+    response = client.patch(f"/tasks/{task['id']}", json={"title": "Mine", "version": task["version"]})
+
+    assert response.status_code == 409
+    assert client.get(f"/tasks/{task['id']}").json()["title"] == "Edited elsewhere"
+
+
+def test_patch_with_the_current_version_or_none_updates(client):
+    task = client.post("/tasks/", json={"title": "Draft", "priority": 2}).json()
+
+    checked = client.patch(f"/tasks/{task['id']}", json={"title": "Checked", "version": task["version"]}).json()
+    assert (checked["title"], checked["version"]) == ("Checked", task["version"] + 1)
+
+    unconditional = client.patch(f"/tasks/{task['id']}", json={"priority": 5}).json()
+    # Fields left out are untouched
+    assert (unconditional["title"], unconditional["priority"], unconditional["version"]) == \
+        ("Checked", 5, task["version"] + 2)
+
+
+def test_bulk_update_reports_foreign_and_missing_ids(client):
+    mine = make_tasks(client, 2)
+    (theirs,) = make_tasks(client, 1, user_id=2)
+    missing = theirs + 100
+
+    result = client.post("/tasks/bulk", json={
+        "task_ids": [mine[1], theirs, missing, mine[0]], "action": "update", "update": {"priority": 5}
+    }).json()
+
+    assert [(task["id"], task["priority"]) for task in result["updated"]] == [(mine[0], 5), (mine[1], 5)]
+    assert result["not_found"] == [theirs, missing]
+    assert client.get(f"/tasks/{theirs}", headers={"X-User-Id": "2"}).json()["priority"] == 3
+
+
+def test_bulk_ids_are_deduplicated(client, db):
+    (task_id,) = make_tasks(client, 1)
+    events = db.query(models.TaskEvent).count()
+
+    result = client.post("/tasks/bulk", json={
+        "task_ids": [task_id, task_id, task_id + 1, task_id + 1], "action": "update", "update": {"important": True}
+    }).json()
+
+    assert [task["version"] for task in result["updated"]] == [2]
+    assert result["not_found"] == [task_id + 1]
+    assert db.query(models.TaskEvent).count() == events + 1
+
+
+def test_bulk_limit_counts_distinct_ids(client, monkeypatch):
+    monkeypatch.setattr(config, "BULK_MAX_TASKS", 2)
+    first, second, third = make_tasks(client, 3)
+
+    response = client.post("/tasks/bulk", json={"task_ids": [first, second, third], "action": "delete"})
+    assert response.status_code == 400
+    assert len(client.get("/tasks/").json()) == 3
+
+    response = client.post("/tasks/bulk", json={"task_ids": [first, second, first], "action": "delete"})
+    assert response.json()["deleted"] == [first, second]
+
+
+def test_bulk_delete_removes_dependency_edges(client, db):
+    first, second, third = make_tasks(client, 3)
+    client.post(f"/tasks/{second}/dependencies", json={"depends_on_id": first})
+    client.post(f"/tasks/{third}/dependencies", json={"depends_on_id": second})
+
+    result = client.post("/tasks/bulk", json={"task_ids": [second], "action": "delete"}).json()
+
+    assert (result["deleted"], result["not_found"]) == ([second], [])
+    assert db.query(models.TaskDependency).count() == 0
+    assert client.get(f"/tasks/{third}/dependencies").json()["depends_on"] == []